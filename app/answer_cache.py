@@ -0,0 +1,107 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from app.config import (
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_THRESHOLD,
+    ANSWER_CACHE_TTL,
+)
+from app.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+CachedAnswer = namedtuple("CachedAnswer", ["answer", "sources", "similarity"])
+
+_Entry = namedtuple("_Entry", ["scope", "vector", "answer", "sources", "created"])
+
+
+def scope_key(doc_ids, conversation_context=""):
+    """Cache scope for a set of documents, independent of their order.
+
+    The conversation context that goes into the prompt is part of the
+    scope, so a follow-up ("tell me more") only matches the same history.
+    """
+    scope = "\n".join(sorted(doc_ids)) + "\0" + conversation_context
+    return hashlib.sha256(scope.encode("utf-8")).hexdigest()
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype="float32")
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class AnswerCache:
+    """Semantic cache of generated answers, shared across sessions.
+
+    Answers are scoped to a document set and matched by cosine similarity
+    of question embeddings, so paraphrases of an earlier question within
+    ``threshold`` reuse its answer. Entries expire after ``ttl`` seconds
+    and the least recently used are evicted past ``max_entries``.
+    """
+
+    def __init__(
+        self,
+        threshold=ANSWER_CACHE_THRESHOLD,
+        ttl=ANSWER_CACHE_TTL,
+        max_entries=ANSWER_CACHE_MAX_ENTRIES,
+        clock=time.monotonic,
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, scope, embedding):
+        """Return the closest cached answer above the threshold, or ``None``"""
+        query = _unit(embedding)
+        with self._lock:
+            self._expire()
+            candidates = [
+                (entry_id, entry) for entry_id, entry in self._entries.items()
+                if entry.scope == scope
+            ]
+            if candidates:
+                similarities = np.stack([entry.vector for _, entry in candidates]) @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    entry_id, entry = candidates[best]
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return CachedAnswer(entry.answer, entry.sources, float(similarities[best]))
+            self.misses += 1
+            return None
+
+    def store(self, scope, embedding, answer, sources):
+        with self._lock:
+            self._entries[self._next_id] = _Entry(
+                scope, _unit(embedding), answer, list(sources), self._clock()
+            )
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _expire(self):
+        cutoff = self._clock() - self.ttl
+        expired = [entry_id for entry_id, entry in self._entries.items() if entry.created < cutoff]
+        for entry_id in expired:
+            del self._entries[entry_id]
@@ -0,0 +1,248 @@
+"""Headless batch question answering over a PDF or a stored document.
+
+    python -m app.batch_qa --pdf handbook.pdf --questions questions.jsonl \\
+        --output answers.jsonl
+
+Each input line is ``{"id": ..., "question": ...}`` (``id`` defaults to the
+line number). Every finished answer is appended to the output file at
+once, so an interrupted run resumes where it stopped.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.batching import TokenBucket
+from app.context import pack_context
+from app.corpus import Corpus
+from app.config import (
+    BATCH_QA_CONCURRENCY,
+    BATCH_QA_REQUESTS_PER_SECOND,
+    DOCUMENT_STORE_DIR,
+    EMBED_BATCH_SIZE,
+    EMBED_CACHE_DIR,
+    EMBED_CACHE_MAX_ENTRIES,
+    MISTRAL_API_KEY,
+    PDF_WORKERS,
+)
+from app.document_store import DocumentStore, document_hash
+from app.embedding_cache import EmbeddingCache
+from app.embeddings import document_embedding, query_embed_fn
+from app.ingest import ingest
+from app.mistral_client import MistralClient
+from app.pdf import iter_pages, pdf_bytes
+from app.prompts import build_prompt
+
+
+def load_questions(path):
+    """Read ``{"id", "question"}`` records from a JSONL file"""
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError(f"{path}:{line_number}: expected a JSON object")
+            record.setdefault("id", line_number)
+            questions.append(record)
+    return questions
+
+
+def completed_ids(output_path):
+    """IDs already answered successfully in a previous (partial) run"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn final line from an interrupted run
+            if "error" not in record:
+                done.add(record["id"])
+    return done
+
+
+def load_document(client, store, pdf=None, doc_hash=None):
+    """Return ``(doc_hash, chunks, index)`` from the store, processing the PDF if needed"""
+    if pdf is not None:
+        data = pdf_bytes(pdf)
+        doc_hash = document_hash(data)
+    stored = store.load(doc_hash)
+    if stored is not None:
+        return (doc_hash,) + stored
+    if pdf is None:
+        raise FileNotFoundError(f"No stored document with hash {doc_hash}")
+
+    embed_fn, embedding, fallback = document_embedding(client)
+    chunks, index = ingest(
+        (page.text for page in iter_pages(data, PDF_WORKERS)), embed_fn, embedding=embedding, fallback=fallback
+    )
+    store.save(doc_hash, chunks, index)
+    return doc_hash, chunks, index
+
+
+def invalid_reason(record):
+    """Why a question record cannot be answered, or None"""
+    if record.get("id") is None:
+        return "record has no id"
+    question = record.get("question")
+    if not isinstance(question, str) or not question.strip():
+        return "record has no question"
+    return None
+
+
+def failure(record, error):
+    """Output line for a record that could not be answered"""
+    return {"id": record.get("id"), "question": record.get("question"), "error": str(error)}
+
+
+def retrieve_many(records, client, corpus):
+    """``(hits, embed_seconds, retrieve_seconds)`` per question record.
+
+    Questions that need a vector are embedded in one call and every index
+    is searched once for the whole group; the timings are split evenly.
+    """
+    started = time.perf_counter()
+    embed_seconds = 0.0
+    embed_fn = query_embed_fn(client)
+
+    def embed(questions):
+        nonlocal embed_seconds
+        embed_started = time.perf_counter()
+        embeddings = embed_fn(questions)
+        embed_seconds += time.perf_counter() - embed_started
+        return embeddings
+
+    # Confident keyword-style questions skip the embedding call
+    results = corpus.search_batch([record["question"] for record in records], embed)
+    retrieve_seconds = time.perf_counter() - started - embed_seconds
+    return [(hits, embed_seconds / len(records), retrieve_seconds / len(records)) for hits, _ in results]
+
+
+def answer_one(record, client, corpus, retrieved):
+    """Answer a single question record from its ``retrieve_many`` result, timing each stage"""
+    hits, embed_seconds, retrieve_seconds = retrieved
+    started = time.perf_counter()
+    context = [passage.text for passage in pack_context(hits, corpus.chunks)]
+    answer = client.chat(build_prompt(record["question"], context))
+    chat_seconds = time.perf_counter() - started
+    return {
+        "id": record["id"],
+        "question": record["question"],
+        "answer": answer,
+        "sources": [hit.text for hit in hits],
+        "latency": {
+            "embed": embed_seconds,
+            "retrieve": retrieve_seconds,
+            "chat": chat_seconds,
+            "total": embed_seconds + retrieve_seconds + chat_seconds,
+        },
+    }
+
+
+def run_batch(
+    questions,
+    client,
+    chunks,
+    index,
+    output_path,
+    concurrency=BATCH_QA_CONCURRENCY,
+    requests_per_second=BATCH_QA_REQUESTS_PER_SECOND,
+    batch_size=EMBED_BATCH_SIZE,
+):
+    """Answer every unanswered question, appending results to ``output_path``.
+
+    Retrieval runs ``batch_size`` questions at a time; their answers are
+    generated concurrently while the next group is retrieved.
+    """
+    done = completed_ids(output_path)
+    pending, invalid = [], []
+    for record in questions:
+        if invalid_reason(record):
+            invalid.append(record)
+        elif record["id"] not in done:
+            pending.append(record)
+    limiter = TokenBucket(requests_per_second, capacity=1)
+    corpus = Corpus()
+    corpus.add_index("document", chunks, index)
+    write_lock = threading.Lock()
+    summary = {"answered": 0, "failed": 0, "skipped": len(questions) - len(pending) - len(invalid)}
+
+    def write(result):
+        with write_lock:
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            summary["failed" if "error" in result else "answered"] += 1
+
+    def work(record, retrieved):
+        limiter.acquire()
+        try:
+            result = answer_one(record, client, corpus, retrieved)
+        except Exception as e:
+            result = failure(record, e)
+        write(result)
+
+    with open(output_path, "a+", encoding="utf-8") as out:
+        # Terminate a torn final line so new records start on their own line
+        if out.tell() > 0:
+            out.seek(out.tell() - 1)
+            if out.read(1) != "\n":
+                out.write("\n")
+        for record in invalid:
+            write(failure(record, invalid_reason(record)))
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = []
+            for start in range(0, len(pending), batch_size):
+                group = pending[start:start + batch_size]
+                try:
+                    retrieved = retrieve_many(group, client, corpus)
+                except Exception as e:
+                    for record in group:
+                        write(failure(record, e))
+                    continue
+                futures.extend(pool.submit(work, record, result) for record, result in zip(group, retrieved))
+            for future in futures:
+                future.result()
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions about a document.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--pdf", help="PDF to answer questions about")
+    source.add_argument("--doc-hash", help="SHA-256 of a document already in the document store")
+    parser.add_argument("--questions", required=True, help="JSONL file of {id, question} records")
+    parser.add_argument("--output", required=True, help="JSONL file answers are appended to")
+    parser.add_argument("--store", default=DOCUMENT_STORE_DIR, help="document store directory")
+    parser.add_argument("--concurrency", type=int, default=BATCH_QA_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=BATCH_QA_REQUESTS_PER_SECOND,
+                        help="questions started per second")
+    args = parser.parse_args(argv)
+
+    if not MISTRAL_API_KEY:
+        parser.error("MISTRAL_API_KEY not set")
+
+    client = MistralClient(
+        MISTRAL_API_KEY,
+        cache=EmbeddingCache(EMBED_CACHE_DIR, EMBED_CACHE_MAX_ENTRIES)
+    )
+    store = DocumentStore(args.store)
+    _, chunks, index = load_document(client, store, pdf=args.pdf, doc_hash=args.doc_hash)
+    if getattr(chunks, "dedup", None) is not None:
+        print(json.dumps({"dedup": chunks.dedup._asdict()}), file=sys.stderr)
+    summary = run_batch(
+        load_questions(args.questions), client, chunks, index, args.output,
+        concurrency=args.concurrency, requests_per_second=args.rate
+    )
+    print(json.dumps(summary), file=sys.stderr)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from app.config import (
+    EMBED_BATCH_SIZE,
+    EMBED_BATCH_TOKENS,
+    EMBED_CONCURRENCY,
+    EMBED_MAX_RETRIES,
+    EMBED_REQUESTS_PER_SECOND,
+)
+
+TRANSIENT_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token) used for batch sizing"""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def make_batches(texts, max_items=EMBED_BATCH_SIZE, max_tokens=EMBED_BATCH_TOKENS):
+    """Split texts into contiguous (start, end) ranges within both limits"""
+    batches = []
+    start = 0
+    tokens = 0
+    for i, text in enumerate(texts):
+        cost = estimate_tokens(text)
+        if i > start and (i - start >= max_items or tokens + cost > max_tokens):
+            batches.append((start, i))
+            start = i
+            tokens = 0
+        tokens += cost
+    if start < len(texts):
+        batches.append((start, len(texts)))
+    return batches
+
+
+def is_transient(exc):
+    """Whether an API error is worth retrying (rate limits, 5xx, network)"""
+    if isinstance(exc, (httpx.TransportError, ConnectionError, TimeoutError)):
+        return True
+    return getattr(exc, "status_code", None) in TRANSIENT_STATUS_CODES
+
+
+class TokenBucket:
+    """Thread-safe token bucket; ``acquire`` blocks until tokens are available"""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+class BatchEmbedder:
+    """Runs an embedding function over batches concurrently, preserving order.
+
+    ``embed_fn`` takes a list of texts and returns one vector per text. Each
+    batch waits on the shared rate limiter and is retried with jittered
+    exponential backoff when the error is transient.
+    """
+
+    def __init__(
+        self,
+        embed_fn,
+        max_items=EMBED_BATCH_SIZE,
+        max_tokens=EMBED_BATCH_TOKENS,
+        workers=EMBED_CONCURRENCY,
+        rate_limiter=None,
+        max_retries=EMBED_MAX_RETRIES,
+        base_delay=0.5,
+        max_delay=20.0,
+        sleep=time.sleep,
+    ):
+        self.embed_fn = embed_fn
+        self.max_items = max_items
+        self.max_tokens = max_tokens
+        self.workers = workers
+        self.rate_limiter = rate_limiter or TokenBucket(EMBED_REQUESTS_PER_SECOND)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+
+    def embed(self, texts):
+        batches = make_batches(texts, self.max_items, self.max_tokens)
+        if len(batches) <= 1:
+            return self._run_batch(texts)
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(batches))) as pool:
+            futures = [
+                pool.submit(self._run_batch, texts[start:end])
+                for start, end in batches
+            ]
+            results = []
+            for future in futures:
+                results.extend(future.result())
+        return results
+
+    def _run_batch(self, batch):
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            try:
+                return self.embed_fn(batch)
+            except Exception as exc:
+                if attempt >= self.max_retries or not is_transient(exc):
+                    raise
+                delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+                self._sleep(random.uniform(0, delay))
+                attempt += 1
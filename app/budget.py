@@ -0,0 +1,227 @@
+"""Per-request latency and token budgets for answering questions.
+
+``LatencyBudget.plan`` decides, for each question, how many retrieved
+chunks to keep (``k``), how many tokens of context to pack and how long
+the answer may be (``max_tokens``), from:
+
+* the time already spent on the request against ``ANSWER_TARGET_SECONDS``;
+* recent chat latencies, as exponentially weighted first-token latency
+  and per-token decode time measured from finished answers;
+* the relevance gap between retrieved hits, since chunks much less
+  relevant than the best one are not worth their tokens;
+* an optional cap on prompt plus answer tokens (``ANSWER_TOKEN_BUDGET``).
+
+Requests are admitted through ``request()``, which counts answers in
+flight. Beyond half of ``ANSWER_MAX_INFLIGHT`` plans are reduced; beyond
+the limit a request is shed, i.e. answered from BM25 passages without
+embedding or chat calls instead of queueing behind the others.
+"""
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+from app import metrics
+from app.config import (
+    ANSWER_MAX_INFLIGHT,
+    ANSWER_TARGET_SECONDS,
+    ANSWER_TOKEN_BUDGET,
+    CHAT_MAX_TOKENS,
+    CONTEXT_TOKEN_BUDGET,
+    MIN_ANSWER_TOKENS,
+    MIN_CONTEXT_TOKENS,
+    RELEVANCE_GAP,
+    TOP_K,
+    TOP_K_MAX,
+)
+
+FULL = "full"
+REDUCED = "reduced"
+SHED = "shed"
+
+BudgetPlan = namedtuple(
+    "BudgetPlan", ["level", "k", "context_tokens", "max_tokens", "predicted_seconds", "reason"]
+)
+
+# Instructions and template text of the answering prompt, in tokens
+PROMPT_OVERHEAD_TOKENS = 120
+# Floor on the decode estimate: answers streamed in one chunk measure ~0 s/token
+MIN_DECODE_SECONDS = 1e-4
+
+PLANS = metrics.REGISTRY.counter(
+    "mistralqna_budget_plans_total", "Answer plans chosen by the latency budget, by level and reason"
+)
+
+
+class _Ewma:
+    def __init__(self, value, alpha):
+        self.value = value
+        self.alpha = alpha
+
+    def update(self, sample):
+        self.value += self.alpha * (sample - self.value)
+
+
+def describe(plan):
+    """One-line summary of a plan for display"""
+    if plan.level == SHED:
+        return "busy: answered from passages without generation"
+    return (
+        f"{plan.level} ({plan.reason}): k={plan.k}, context ≤{plan.context_tokens} tokens, "
+        f"answer ≤{plan.max_tokens} tokens"
+    )
+
+
+class LatencyBudget:
+    """Chooses retrieval depth, context size and answer length per request.
+
+    ``target_seconds=0`` turns adaptation off: every plan uses ``k``,
+    ``context_tokens`` and ``max_tokens`` as configured, as before the
+    budget existed. Load shedding still applies.
+    """
+
+    def __init__(
+        self,
+        target_seconds=ANSWER_TARGET_SECONDS,
+        token_budget=ANSWER_TOKEN_BUDGET,
+        max_inflight=ANSWER_MAX_INFLIGHT,
+        k=TOP_K,
+        k_max=TOP_K_MAX,
+        context_tokens=CONTEXT_TOKEN_BUDGET,
+        min_context_tokens=MIN_CONTEXT_TOKENS,
+        max_tokens=CHAT_MAX_TOKENS,
+        min_max_tokens=MIN_ANSWER_TOKENS,
+        gap=RELEVANCE_GAP,
+        alpha=0.2,
+    ):
+        self.target_seconds = target_seconds
+        self.token_budget = token_budget
+        self.max_inflight = max_inflight
+        self.k = k
+        self.k_max = max(k, k_max)
+        self.context_tokens = context_tokens
+        self.min_context_tokens = min(min_context_tokens, context_tokens)
+        self.max_tokens = max_tokens
+        self.min_max_tokens = min(min_max_tokens, max_tokens)
+        self.gap = gap
+        # Priors until answers are measured: 0.8s to the first token, ~100 tokens/s after it
+        self.first_token = _Ewma(0.8, alpha)
+        self.decode = _Ewma(0.01, alpha)
+        self.inflight = 0
+        self.last_plan = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def request(self):
+        """Admit an answer for its whole duration; yields its load level"""
+        with self._lock:
+            self.inflight += 1
+            level = self._level(self.inflight)
+        try:
+            yield level
+        finally:
+            with self._lock:
+                self.inflight -= 1
+
+    def _level(self, inflight):
+        if not self.max_inflight:
+            return FULL
+        if inflight > self.max_inflight:
+            return SHED
+        return REDUCED if inflight > self.max_inflight / 2 else FULL
+
+    def depth(self, hits):
+        """Number of leading hits worth packing, stopping at a relevance gap.
+
+        Fused hits are compared by their fusion score, vector hits by
+        distance and lexical hits by score. Fusion scores are coarse (a hit
+        both tiers found scores about twice one found by a single tier), so
+        for fused hits the gap only decides how far past ``k`` to go.
+        """
+        hits = hits[:self.k_max]
+        if hits and all(hit.fused is not None for hit in hits):
+            limit = hits[0].fused / (1 + self.gap)
+            close = [hit.fused >= limit for hit in hits]
+            depth = close.index(False) if False in close else len(close)
+            return max(min(len(hits), self.k), depth)
+        if all(hit.distance is not None for hit in hits):
+            limit = hits[0].distance * (1 + self.gap) if hits else 0.0
+            close = [hit.distance <= limit for hit in hits]
+        elif all(hit.score is not None for hit in hits):
+            limit = hits[0].score / (1 + self.gap)
+            close = [hit.score >= limit for hit in hits]
+        else:
+            return min(len(hits), self.k)
+        return close.index(False) if False in close else len(close)
+
+    def predict(self, max_tokens):
+        """Expected chat seconds for an answer of up to ``max_tokens`` tokens"""
+        return self.first_token.value + self.decode.value * max_tokens
+
+    def plan(self, hits, elapsed=0.0, level=FULL, prompt_tokens=0):
+        """``BudgetPlan`` for answering from ``hits``.
+
+        ``elapsed`` is the time the request has already taken and
+        ``prompt_tokens`` the question and conversation memory going into
+        the prompt besides the context.
+        """
+        if level == SHED:
+            plan = BudgetPlan(SHED, min(len(hits), self.k), self.min_context_tokens, 0, 0.0, "load")
+        elif not self.target_seconds:
+            plan = BudgetPlan(
+                level, min(len(hits), self.k), self.context_tokens, self.max_tokens,
+                self.predict(self.max_tokens), "fixed",
+            )
+        else:
+            plan = self._fit(hits, elapsed, level, prompt_tokens)
+        self.last_plan = plan
+        if metrics.enabled():
+            PLANS.inc(level=plan.level, reason=plan.reason)
+        return plan
+
+    def _fit(self, hits, elapsed, level, prompt_tokens):
+        reason = "ok"
+        k = self.depth(hits)
+        # Answer length the rest of the target pays for after the first token
+        remaining = self.target_seconds - elapsed - self.first_token.value
+        affordable = int(remaining / max(self.decode.value, MIN_DECODE_SECONDS)) if remaining > 0 else 0
+        share = min(1.0, affordable / self.max_tokens)
+        if share < 1.0:
+            reason = "latency"
+        if level == REDUCED:
+            share = min(share, 0.5)
+            k = min(k, self.k)
+            reason = "load"
+        max_tokens = max(self.min_max_tokens, int(self.max_tokens * share))
+        # The context shrinks with the answer, which also shortens prompt processing
+        context = self.min_context_tokens + int((self.context_tokens - self.min_context_tokens) * share)
+
+        if self.token_budget:
+            excess = prompt_tokens + PROMPT_OVERHEAD_TOKENS + context + max_tokens - self.token_budget
+            if excess > 0:
+                reason = "tokens"
+                cut = min(excess, context - self.min_context_tokens)
+                context -= cut
+                max_tokens = max(self.min_max_tokens, max_tokens - (excess - cut))
+
+        if reason != "ok":
+            level = REDUCED
+        return BudgetPlan(level, k, context, max_tokens, self.predict(max_tokens), reason)
+
+    def observe(self, first_token_seconds, total_seconds, completion_tokens):
+        """Fold a finished answer's latency into the estimates"""
+        with self._lock:
+            self.first_token.update(first_token_seconds)
+            if completion_tokens > 1:
+                per_token = (total_seconds - first_token_seconds) / (completion_tokens - 1)
+                self.decode.update(max(MIN_DECODE_SECONDS, per_token))
+
+    def snapshot(self):
+        """Current estimates, load and last decision, for display"""
+        with self._lock:
+            return {
+                "inflight": self.inflight,
+                "first_token_seconds": self.first_token.value,
+                "decode_seconds_per_token": self.decode.value,
+                "tokens_per_second": 1 / max(self.decode.value, MIN_DECODE_SECONDS),
+                "last_plan": self.last_plan._asdict() if self.last_plan is not None else None,
+            }
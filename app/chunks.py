@@ -0,0 +1,105 @@
+from collections.abc import Sequence
+
+from app.config import CHUNK_SIZE, CHUNK_OVERLAP
+from app.lazy import lazy_import
+from app.lexical import LexicalIndex
+
+np = lazy_import("numpy")
+
+
+def chunk_offsets(length, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """Start/end character offsets of the chunks ``chunk_text`` would produce"""
+    starts = np.arange(0, length, size - overlap, dtype="int64")
+    ends = np.minimum(starts + size, length)
+    return starts, ends
+
+
+class ChunkStore(Sequence):
+    """Chunks of one document, stored as the text plus offset arrays.
+
+    The text is held once; ``starts``/``ends`` (and the page each chunk
+    starts on) are NumPy arrays. Indexing materializes a chunk string on
+    demand, so callers can treat the store like a list of chunks. The
+    BM25 index over the chunks travels with them (``lexical_index``).
+
+    Chunks dropped at ingest as near-duplicates are kept as ``duplicates``
+    rows of ``(start, end, page, kept chunk ID)``, so sources can still
+    point at every place the text appears. ``embedding`` records the
+    backend, model and dimension of the document's vectors.
+    """
+
+    def __init__(self, text, starts, ends, pages=None, lexical=None, duplicates=None, dedup=None,
+                 embedding=None):
+        self.text = text
+        self.starts = np.asarray(starts, dtype="int64")
+        self.ends = np.asarray(ends, dtype="int64")
+        if pages is None:
+            pages = np.zeros(len(self.starts), dtype="int32")
+        self.pages = np.asarray(pages, dtype="int32")
+        self.lexical = lexical
+        if duplicates is None:
+            duplicates = np.zeros((0, 4), dtype="int64")
+        self.duplicates = np.asarray(duplicates, dtype="int64")
+        self.dedup = dedup
+        self.embedding = embedding
+
+    @classmethod
+    def from_text(cls, text, page_starts=None, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+        starts, ends = chunk_offsets(len(text), size, overlap)
+        pages = None
+        if page_starts is not None:
+            pages = np.searchsorted(page_starts, starts, side="right") - 1
+        return cls(text, starts, ends, pages)
+
+    @classmethod
+    def from_pages(cls, pages, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+        """Chunk the concatenated page texts, remembering each chunk's page.
+
+        ``pages`` is consumed as it is produced, so a streaming extractor
+        keeps streaming.
+        """
+        parts = []
+        page_starts = []
+        offset = 0
+        for page in pages:
+            page_starts.append(offset)
+            parts.append(page)
+            offset += len(page)
+        return cls.from_text("".join(parts), np.array(page_starts, dtype="int64"), size, overlap)
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """Wrap already-materialized, non-overlapping chunk strings"""
+        lengths = np.array([len(chunk) for chunk in chunks], dtype="int64")
+        ends = np.cumsum(lengths)
+        return cls("".join(chunks), ends - lengths, ends)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self.text[self.starts[i]:self.ends[i]]
+
+    def page(self, i):
+        """Zero-based page number the chunk starts on"""
+        return int(self.pages[i])
+
+    def duplicate_pages(self, i):
+        """Pages of the dropped duplicates of chunk ``i``, in document order"""
+        rows = self.duplicates[self.duplicates[:, 3] == i]
+        return [int(page) for page in rows[:, 2]]
+
+    def lexical_index(self):
+        """BM25 index over the chunks, built on first use unless ingest supplied it"""
+        if self.lexical is None:
+            self.lexical = LexicalIndex.from_texts(self)
+        return self.lexical
+
+    @property
+    def nbytes(self):
+        """Approximate memory held: the text, the offset arrays and any lexical index"""
+        lexical = self.lexical.nbytes if self.lexical is not None else 0
+        offsets = self.starts.nbytes + self.ends.nbytes + self.pages.nbytes + self.duplicates.nbytes
+        return len(self.text) + offsets + lexical
@@ -11,3 +11,88 @@ EMBED_MODEL = "mistral-embed"
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
 TOP_K = 2
+
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", ".cache/embeddings")
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "100000"))
+EMBED_CACHE_DTYPE = os.getenv("EMBED_CACHE_DTYPE", "float32")  # float32, float16
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_BATCH_TOKENS = int(os.getenv("EMBED_BATCH_TOKENS", "16000"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_REQUESTS_PER_SECOND = float(os.getenv("EMBED_REQUESTS_PER_SECOND", "5"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "5"))
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "mistral")  # mistral, local, auto (mistral, local when it struggles)
+LOCAL_EMBED_DIM = int(os.getenv("LOCAL_EMBED_DIM", "1024"))
+EMBED_FALLBACK_SECONDS = float(os.getenv("EMBED_FALLBACK_SECONDS", "10"))  # slower batches trip the fallback
+EMBED_FALLBACK_COOLDOWN = float(os.getenv("EMBED_FALLBACK_COOLDOWN", "300"))
+INGEST_QUEUE_BATCHES = int(os.getenv("INGEST_QUEUE_BATCHES", "8"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))  # 0 = ingest inside the web process
+
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "1").lower() in ("1", "true", "yes")
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))  # estimated Jaccard similarity
+BOILERPLATE_MIN_PAGES = int(os.getenv("BOILERPLATE_MIN_PAGES", "3"))
+BOILERPLATE_MIN_FRACTION = float(os.getenv("BOILERPLATE_MIN_FRACTION", "0.5"))
+BOILERPLATE_WINDOW = int(os.getenv("BOILERPLATE_WINDOW", "10"))  # pages held back to spot repeats
+
+DOCUMENT_STORE_DIR = os.getenv("DOCUMENT_STORE_DIR", ".cache/documents")
+DOCUMENT_REGISTRY_MAX_MB = int(os.getenv("DOCUMENT_REGISTRY_MAX_MB", "1024"))
+
+INDEX_BACKEND = os.getenv("INDEX_BACKEND", "auto")  # auto, flat, ivf_flat, hnsw, ivf_pq
+INDEX_MEMORY_BUDGET_MB = int(os.getenv("INDEX_MEMORY_BUDGET_MB", "512"))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))
+HNSW_M = int(os.getenv("HNSW_M", "32"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+VECTOR_STORAGE = os.getenv("VECTOR_STORAGE", "float32")  # float32, fp16, sq8, pq
+INDEX_RERANK = os.getenv("INDEX_RERANK", "").lower() in ("1", "true", "yes")
+RERANK_FACTOR = int(os.getenv("RERANK_FACTOR", "4"))
+
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")  # semantic, lexical, hybrid
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "10"))  # per tier, before fusion
+LEXICAL_MAX_QUERY_TERMS = int(os.getenv("LEXICAL_MAX_QUERY_TERMS", "6"))
+LEXICAL_CONFIDENCE_MARGIN = float(os.getenv("LEXICAL_CONFIDENCE_MARGIN", "1.5"))
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "50"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+PDF_SLOW_PAGE_SECONDS = float(os.getenv("PDF_SLOW_PAGE_SECONDS", "2.0"))
+
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "4096"))
+
+SUGGESTED_QUESTIONS = [
+    "Summarize the main points",
+    "What are the key findings?",
+    "Explain the methodology",
+    "List the recommendations"
+]
+
+BATCH_QA_CONCURRENCY = int(os.getenv("BATCH_QA_CONCURRENCY", "4"))
+BATCH_QA_REQUESTS_PER_SECOND = float(os.getenv("BATCH_QA_REQUESTS_PER_SECOND", "2"))
+
+MISTRAL_SERVER_URL = os.getenv("MISTRAL_SERVER_URL") or None
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "").lower() in ("1", "true", "yes")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+IMPORT_PROFILE = os.getenv("IMPORT_PROFILE", "").lower() in ("1", "true", "yes")
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+CHAT_MAX_TOKENS = int(os.getenv("CHAT_MAX_TOKENS", "500"))
+
+ANSWER_TARGET_SECONDS = float(os.getenv("ANSWER_TARGET_SECONDS", "8"))  # 0 = fixed TOP_K/context/max_tokens
+ANSWER_TOKEN_BUDGET = int(os.getenv("ANSWER_TOKEN_BUDGET", "0"))  # prompt + answer tokens per request, 0 = no cap
+ANSWER_MAX_INFLIGHT = int(os.getenv("ANSWER_MAX_INFLIGHT", "8"))  # concurrent answers before shedding load
+TOP_K_MAX = int(os.getenv("TOP_K_MAX", "5"))
+MIN_CONTEXT_TOKENS = int(os.getenv("MIN_CONTEXT_TOKENS", "400"))
+MIN_ANSWER_TOKENS = int(os.getenv("MIN_ANSWER_TOKENS", "150"))
+RELEVANCE_GAP = float(os.getenv("RELEVANCE_GAP", "0.25"))  # hits this much worse than the best are dropped
+
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "600"))
+MEMORY_WINDOW_TURNS = int(os.getenv("MEMORY_WINDOW_TURNS", "4"))
+MEMORY_RELEVANCE_THRESHOLD = float(os.getenv("MEMORY_RELEVANCE_THRESHOLD", "0.8"))
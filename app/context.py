@@ -0,0 +1,79 @@
+from collections import namedtuple
+
+from app.batching import CHARS_PER_TOKEN
+from app.config import CONTEXT_TOKEN_BUDGET
+
+Passage = namedtuple("Passage", ["doc_id", "start", "end", "text", "chunk_ids"])
+
+
+def _merge(spans):
+    """Merge overlapping or touching spans, keeping the best rank of each group"""
+    merged = []
+    for start, end, rank, chunk_ids in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            last = merged[-1]
+            last[1] = max(last[1], end)
+            last[2] = min(last[2], rank)
+            last[3] = last[3] + chunk_ids
+        else:
+            merged.append([start, end, rank, list(chunk_ids)])
+    return merged
+
+
+def _uncovered(spans, start, end):
+    """Characters of ``[start, end)`` not already inside one of ``spans``"""
+    covered = 0
+    for span_start, span_end, _, _ in _merge(spans):
+        covered += max(0, min(end, span_end) - max(start, span_start))
+    return (end - start) - covered
+
+
+def pack_context(hits, lookup, token_budget=CONTEXT_TOKEN_BUDGET):
+    """Turn retrieved hits into de-duplicated passages within a token budget.
+
+    ``hits`` are in relevance order and ``lookup(doc_id)`` returns the
+    document's chunk container. When it is a ``ChunkStore``, hits are
+    placed by character offsets, so overlapping or adjacent chunks merge
+    back into one contiguous passage and repeated text is paid for once.
+    Hits are admitted best-first while the new text they add fits the
+    budget; the best hit is always kept. Passages come back in the order of
+    their most relevant chunk.
+    """
+    char_budget = token_budget * CHARS_PER_TOKEN
+    used = 0
+    selected = {}  # doc_id -> [start, end, rank, chunk_ids]
+    loose = {}  # text -> (doc_id, rank, chunk_ids) for chunks without offsets
+
+    for rank, hit in enumerate(hits):
+        chunks = lookup(hit.doc_id)
+        if chunks is not None and hasattr(chunks, "starts"):
+            start, end = int(chunks.starts[hit.chunk_id]), int(chunks.ends[hit.chunk_id])
+            spans = selected.setdefault(hit.doc_id, [])
+            cost = _uncovered(spans, start, end)
+            if cost == 0 or (used and used + cost > char_budget):
+                continue
+            spans.append([start, end, rank, [hit.chunk_id]])
+        else:
+            cost = len(hit.text)
+            if hit.text in loose or (used and used + cost > char_budget):
+                continue
+            loose[hit.text] = (hit.doc_id, rank, [hit.chunk_id])
+        used += cost
+
+    passages = []
+    for doc_id, spans in selected.items():
+        text = lookup(doc_id).text
+        for start, end, rank, chunk_ids in _merge(spans):
+            passages.append((rank, Passage(doc_id, start, end, text[start:end], chunk_ids)))
+    for text, (doc_id, rank, chunk_ids) in loose.items():
+        passages.append((rank, Passage(doc_id, None, None, text, chunk_ids)))
+
+    packed = []
+    seen = set()
+    for _, passage in sorted(passages, key=lambda item: item[0]):
+        # The same text can come from two documents (e.g. shared boilerplate)
+        if passage.text in seen:
+            continue
+        seen.add(passage.text)
+        packed.append(passage)
+    return packed
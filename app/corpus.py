@@ -0,0 +1,237 @@
+import threading
+from collections import namedtuple
+
+from app import metrics
+from app.config import HYBRID_CANDIDATES, RETRIEVAL_MODE, TOP_K
+from app.embeddings import embedder_for, query_backend
+from app.lazy import lazy_import
+from app.lexical import LexicalIndex, is_confident, query_terms, rrf_scores
+
+np = lazy_import("numpy")
+
+# Vector hits carry an L2 ``distance``; lexical hits a ``score`` instead: their BM25
+# score relative to the best in their document, times the share of query terms they contain.
+# ``also_pages`` lists pages whose near-identical chunks ingest folded into this one.
+# Hits from ``fuse_hits`` also carry their reciprocal-rank-fusion score as ``fused``.
+Hit = namedtuple(
+    "Hit", ["doc_id", "chunk_id", "text", "distance", "page", "score", "also_pages", "fused"],
+    defaults=(None, None, (), None),
+)
+LexicalResult = namedtuple("LexicalResult", ["hits", "confident"])
+
+
+def fuse_hits(rankings, k=TOP_K):
+    """Reciprocal-rank fusion of hit lists; the first list's hit wins on duplicates"""
+    by_key = {}
+    for ranking in rankings:
+        for hit in ranking:
+            by_key.setdefault((hit.doc_id, hit.chunk_id), hit)
+    scores = rrf_scores([[(hit.doc_id, hit.chunk_id) for hit in ranking] for ranking in rankings])
+    # sorted() is stable: ties keep the order of the first ranking
+    keys = sorted(scores, key=scores.get, reverse=True)
+    return [by_key[key]._replace(fused=scores[key]) for key in keys[:k]]
+
+
+class Corpus:
+    """Multi-document store that searches each document's own index in place.
+
+    Documents are attached with ``add_index`` by reference to their
+    (typically shared, read-only) index and chunk container; nothing is
+    copied, so adding or removing one document never touches the others.
+    Hits carry the document and chunk IDs; chunk text is only materialized
+    for returned hits, and results across documents are merged by distance.
+
+    Every document also has a BM25 index over its chunks (``search`` and
+    ``retrieve_lexical``), shared with its ``ChunkStore`` when it has one.
+
+    Query embeddings passed in come from ``backend``. Documents whose
+    chunks record another embedding backend (a local fallback) are left out
+    of ``retrieve``; ``search`` embeds the question for them with their own
+    local embedder and fuses the rankings.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or query_backend()
+        self.documents = {}
+        self._texts = {}
+        self._indexes = {}
+        self._lexical = {}
+        self._embeddings = {}  # document -> EmbeddingInfo of a foreign backend
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return sum(index.ntotal for index in self._indexes.values())
+
+    def __contains__(self, doc_id):
+        return doc_id in self.documents
+
+    def chunks(self, doc_id):
+        """Chunk container of a live document, or None"""
+        return self._texts.get(doc_id)
+
+    def add_index(self, doc_id, chunks, index):
+        """Attach a document by reference to its index, replacing any previous version"""
+        with self._lock:
+            self.documents[doc_id] = None
+            self._indexes[doc_id] = index
+            self._texts[doc_id] = chunks
+            self._lexical.pop(doc_id, None)
+            self._embeddings.pop(doc_id, None)
+            embedding = getattr(chunks, "embedding", None)
+            if embedding is not None and embedding.backend != self.backend:
+                self._embeddings[doc_id] = embedding
+
+    def remove_document(self, doc_id):
+        """Detach a document; it stops appearing in results at once"""
+        with self._lock:
+            if doc_id not in self.documents:
+                return False
+            del self.documents[doc_id]
+            self._texts.pop(doc_id, None)
+            self._indexes.pop(doc_id, None)
+            self._lexical.pop(doc_id, None)
+            self._embeddings.pop(doc_id, None)
+            return True
+
+    def retrieve(self, question_embedding, k=TOP_K):
+        """Return the ``k`` nearest chunks across every document"""
+        return self.retrieve_batch([question_embedding], k)[0]
+
+    def retrieve_batch(self, question_embeddings, k=TOP_K):
+        """Hits for several questions at once, with one search call per document index"""
+        with self._lock:
+            doc_ids = [doc_id for doc_id in self._indexes if doc_id not in self._embeddings]
+        return self._retrieve_attached(question_embeddings, doc_ids, k)
+
+    def retrieve_lexical(self, question, k=TOP_K):
+        """BM25 hits for a question across every document, and whether they are confident.
+
+        IDF and chunk lengths are per document, so raw BM25 scores are never
+        compared across documents. Confidence is decided within each
+        document, and holds only when a single document's best chunk
+        contains every query term and is confident there.
+        """
+        terms = query_terms(question)
+        hits = []
+        complete = []
+        with self._lock:
+            for doc_id in self._texts:
+                matches = self._lexical_index(doc_id).search(terms, k)
+                if not len(matches.ids):
+                    continue
+                scores = matches.scores.tolist()
+                if matches.coverage[0] >= 1.0:
+                    complete.append(is_confident(terms, scores, matches.coverage))
+                for chunk_id, score, coverage in zip(matches.ids.tolist(), scores, matches.coverage):
+                    hits.append(self._hit(doc_id, chunk_id, score=float(coverage) * score / scores[0]))
+        hits.sort(key=lambda hit: hit.score, reverse=True)
+        return LexicalResult(hits[:k], complete == [True])
+
+    def search(self, question, embed_fn, question_embedding=None, k=TOP_K, mode=RETRIEVAL_MODE):
+        """Hits for a question and the embedding used (``None`` if none was needed).
+
+        ``mode`` is "semantic" (vectors only), "lexical" (BM25 only) or
+        "hybrid": a confident BM25 result is returned without calling
+        ``embed_fn(question)``; otherwise both tiers are fused by rank. A
+        known ``question_embedding`` always gets the fused result.
+        """
+        embed_many = lambda questions: [embed_fn(question) for question in questions]
+        return self.search_batch([question], embed_many, [question_embedding], k, mode)[0]
+
+    def search_batch(self, questions, embed_fn, question_embeddings=None, k=TOP_K, mode=RETRIEVAL_MODE):
+        """``search`` for several questions: a ``(hits, embedding)`` pair per question.
+
+        ``embed_fn(questions)`` embeds a list and is called at most once, for
+        the questions that need a vector and have no known embedding; every
+        index is searched once per batch.
+        """
+        questions = list(questions)
+        if question_embeddings is None:
+            question_embeddings = [None] * len(questions)
+        question_embeddings = list(question_embeddings)
+        if mode == "semantic":
+            rankings = self._vector_rankings(questions, embed_fn, question_embeddings, k)
+            return [
+                (ranked[0] if len(ranked) == 1 else fuse_hits(ranked, k), embedding)
+                for ranked, embedding in zip(rankings, question_embeddings)
+            ]
+        candidates = max(k, HYBRID_CANDIDATES)
+        with metrics.span("retrieve_lexical"):
+            lexical = [self.retrieve_lexical(question, candidates) for question in questions]
+        results = [
+            (result.hits[:k], embedding) if mode == "lexical" or (embedding is None and result.confident) else None
+            for result, embedding in zip(lexical, question_embeddings)
+        ]
+        vector = [i for i, result in enumerate(results) if result is None]
+        if vector:
+            embeddings = [question_embeddings[i] for i in vector]
+            rankings = self._vector_rankings([questions[i] for i in vector], embed_fn, embeddings, candidates)
+            for i, ranked, embedding in zip(vector, rankings, embeddings):
+                results[i] = (fuse_hits(ranked + [lexical[i].hits], k), embedding)
+        return results
+
+    def _vector_rankings(self, questions, embed_fn, question_embeddings, k):
+        """Vector hit lists per question: one for ``backend`` documents, one per foreign embedding.
+
+        Missing entries of ``question_embeddings`` are filled in place.
+        """
+        rankings = [[] for _ in questions]
+        with self._lock:
+            native = len(self.documents) > len(self._embeddings)
+            foreign = {}
+            for doc_id, embedding in self._embeddings.items():
+                foreign.setdefault(embedding, []).append(doc_id)
+        if native:
+            missing = [i for i, embedding in enumerate(question_embeddings) if embedding is None]
+            if missing:
+                for i, embedding in zip(missing, embed_fn([questions[i] for i in missing])):
+                    question_embeddings[i] = embedding
+            with metrics.span("retrieve"):
+                for ranked, hits in zip(rankings, self.retrieve_batch(question_embeddings, k)):
+                    ranked.append(hits)
+        for embedding, doc_ids in foreign.items():
+            embedder = embedder_for(embedding)
+            if embedder is None:
+                continue  # an API backend this deployment does not query; BM25 still covers it
+            with metrics.span("retrieve_local"):
+                for ranked, hits in zip(rankings, self._retrieve_attached(embedder.embed(questions), doc_ids, k)):
+                    ranked.append(hits)
+        return rankings
+
+    def _retrieve_attached(self, queries, doc_ids, k):
+        """Hits per query row from the attached indexes of ``doc_ids``"""
+        queries = np.atleast_2d(np.asarray(queries, dtype="float32"))
+        results = [[] for _ in queries]
+        with self._lock:
+            for doc_id in doc_ids:
+                index = self._indexes.get(doc_id)
+                if index is None or index.ntotal == 0:
+                    continue
+                distances, ids = index.search(queries, min(k, index.ntotal))
+                for row, row_distances, row_ids in zip(results, distances, ids):
+                    row.extend(
+                        self._hit(doc_id, chunk_id, float(distance))
+                        for distance, chunk_id in zip(row_distances, row_ids.tolist())
+                        if chunk_id >= 0
+                    )
+        return [sorted(row, key=lambda hit: hit.distance)[:k] for row in results]
+
+    def _lexical_index(self, doc_id):
+        index = self._lexical.get(doc_id)
+        if index is None:
+            chunks = self._texts[doc_id]
+            if hasattr(chunks, "lexical_index"):
+                index = chunks.lexical_index()
+            else:
+                index = LexicalIndex.from_texts(chunks)
+            self._lexical[doc_id] = index
+        return index
+
+    def _hit(self, doc_id, chunk_id, distance=None, score=None):
+        chunks = self._texts[doc_id]
+        if not hasattr(chunks, "duplicate_pages"):
+            return Hit(doc_id, chunk_id, chunks[chunk_id], distance, None, score)
+        return Hit(
+            doc_id, chunk_id, chunks[chunk_id], distance, chunks.page(chunk_id), score,
+            tuple(chunks.duplicate_pages(chunk_id)),
+        )
@@ -0,0 +1,182 @@
+"""Boilerplate and near-duplicate removal ahead of embedding.
+
+PDFs repeat running headers, footers, page numbers and legal notices on
+every page. ``BoilerplateFilter`` finds lines that recur on many pages
+(numbers in page numbers and short first or last lines are ignored, so
+"Page 3 of 40" matches "Page 4 of 40") and keeps only their first
+occurrence. ``ChunkDeduplicator`` then
+spots chunks that nearly repeat an earlier one with MinHash signatures
+over word shingles, bucketed by LSH bands, so ingest can skip embedding
+them and point them at the chunk they duplicate.
+"""
+import math
+import re
+import zlib
+from collections import Counter, namedtuple
+
+from app.config import (
+    BOILERPLATE_MIN_FRACTION,
+    BOILERPLATE_MIN_PAGES,
+    BOILERPLATE_WINDOW,
+    DEDUP_THRESHOLD,
+)
+from app.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+DedupStats = namedtuple(
+    "DedupStats", ["boilerplate_lines", "boilerplate_chars", "duplicate_chunks", "embeddings_saved"]
+)
+
+# Page edges (first and last lines) of at most this many words match regardless
+# of the numbers in them, like running headers with a chapter or date
+NUMBERED_LINE_WORDS = 6
+_DIGITS = re.compile(r"\d+")
+# "12", "- 12 -", "Page 12", "12 of 40", "Page 12 / 40"
+_PAGE_NUMBER = re.compile(r"^[\W_]*(?:page\s*)?\d+(?:\s*(?:of|/)\s*\d+)?[\W_]*$")
+# Mersenne prime for the MinHash permutations; hashes are reduced below it
+_PRIME = (1 << 31) - 1
+
+
+def normalize_line(line, edge=False):
+    """Comparison key of a line: lower-cased, whitespace collapsed, "" if blank.
+
+    Numbers are masked only in page numbers and in short ``edge`` lines, so
+    numbered headings such as "Section 12.3" keep distinct keys.
+    """
+    words = line.lower().split()
+    key = " ".join(words)
+    if _PAGE_NUMBER.match(key) or (edge and len(words) <= NUMBERED_LINE_WORDS):
+        key = _DIGITS.sub("#", key)
+    return key
+
+
+def page_line_keys(page_text):
+    """``(line, key)`` for each line of a page; its first and last non-blank lines are edges"""
+    lines = page_text.splitlines(keepends=True)
+    filled = [i for i, line in enumerate(lines) if line.strip()]
+    edges = {filled[0], filled[-1]} if filled else set()
+    return [(line, normalize_line(line, i in edges)) for i, line in enumerate(lines)]
+
+
+class BoilerplateFilter:
+    """Strips lines repeated across pages from a stream of page texts.
+
+    A line is boilerplate if it appears on at least ``min_pages`` pages and
+    ``min_fraction`` of the pages seen so far. The first ``window`` pages
+    are held back until the window is full (or the document ends); later
+    pages pass through as they arrive. Lines frequent within the window
+    stay boilerplate for the rest of the document, while any other line
+    must keep up with the growing page count, so a heading that merely
+    recurs through a long document is never stripped. The first
+    occurrence of each boilerplate line is kept so its text stays
+    searchable once.
+    """
+
+    def __init__(self, min_pages=BOILERPLATE_MIN_PAGES, min_fraction=BOILERPLATE_MIN_FRACTION,
+                 window=BOILERPLATE_WINDOW):
+        self.min_pages = min_pages
+        self.min_fraction = min_fraction
+        self.window = window
+        self.pages = 0
+        self.lines_removed = 0
+        self.chars_in = 0
+        self.chars_out = 0
+        self._counts = Counter()
+        self._kept = set()
+        self._pending = []
+        self._boilerplate = None
+
+    def feed(self, page_text):
+        """Add a page; returns the cleaned pages that are ready, in order"""
+        self.pages += 1
+        self.chars_in += len(page_text)
+        self._counts.update({key for _, key in page_line_keys(page_text)} - {""})
+        if self._boilerplate is not None:
+            return [self._clean(page_text)]
+        self._pending.append(page_text)
+        return self._release() if len(self._pending) >= self.window else []
+
+    def finish(self):
+        return self._release() if self._boilerplate is None else []
+
+    def _threshold(self):
+        return max(self.min_pages, math.ceil(self.min_fraction * self.pages))
+
+    def _release(self):
+        threshold = self._threshold()
+        self._boilerplate = {key for key, count in self._counts.items() if count >= threshold}
+        pages, self._pending = self._pending, []
+        return [self._clean(page) for page in pages]
+
+    def _clean(self, page_text):
+        kept = []
+        for line, key in page_line_keys(page_text):
+            if key and (key in self._boilerplate or self._counts[key] >= self._threshold()):
+                if key in self._kept:
+                    self.lines_removed += 1
+                    continue
+                self._kept.add(key)
+            kept.append(line)
+        text = "".join(kept)
+        self.chars_out += len(text)
+        return text
+
+
+class ChunkDeduplicator:
+    """Near-duplicate detection over a stream of chunks with MinHash and LSH.
+
+    ``add`` returns the ID of an earlier kept chunk whose estimated Jaccard
+    similarity (over ``shingle``-word shingles) reaches ``threshold``, or
+    ``None`` after registering the chunk as kept under the next ID. With
+    ``bands`` bands of ``num_perm / bands`` rows, pairs above ~0.7
+    similarity almost always share a bucket and are compared.
+    """
+
+    def __init__(self, threshold=DEDUP_THRESHOLD, num_perm=64, bands=16, shingle=5, seed=1):
+        rng = np.random.default_rng(seed)
+        self.threshold = threshold
+        self.shingle = shingle
+        self.rows = num_perm // bands
+        self._a = rng.integers(1, _PRIME, num_perm, dtype="uint64")
+        self._b = rng.integers(0, _PRIME, num_perm, dtype="uint64")
+        self._buckets = [{} for _ in range(bands)]
+        self._signatures = []
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def signature(self, text):
+        words = text.lower().split()
+        shingles = {" ".join(words[i:i + self.shingle]) for i in range(max(1, len(words) - self.shingle + 1))}
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype="uint64", count=len(shingles)
+        ) % _PRIME
+        # Both factors are below 2**31, so the products fit in uint64
+        return ((self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME).min(axis=1)
+
+    def add(self, text):
+        signature = self.signature(text)
+        keys = [
+            signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for band in range(len(self._buckets))
+        ]
+        best, best_similarity = None, self.threshold
+        for buckets, key in zip(self._buckets, keys):
+            for candidate in buckets.get(key, ()):
+                similarity = float(np.mean(self._signatures[candidate] == signature))
+                if similarity >= best_similarity:
+                    best, best_similarity = candidate, similarity
+        if best is not None:
+            return best
+
+        chunk_id = len(self._signatures)
+        self._signatures.append(signature)
+        for buckets, key in zip(self._buckets, keys):
+            buckets.setdefault(key, []).append(chunk_id)
+        return None
+
+
+def chunks_for_length(length, size, overlap):
+    """Number of chunks ``chunk_offsets`` cuts from ``length`` characters"""
+    return math.ceil(length / (size - overlap)) if length > 0 else 0
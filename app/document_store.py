@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from app.chunks import ChunkStore
+from app.config import DOCUMENT_STORE_DIR
+from app.dedup import DedupStats
+from app.embeddings import EmbeddingInfo
+from app.indexes import RerankedIndex, set_search_params
+from app.lazy import lazy_import
+from app.lexical import LexicalIndex
+
+faiss = lazy_import("faiss")
+np = lazy_import("numpy")
+
+INDEX_FILE = "index.faiss"
+TEXT_FILE = "text.txt"
+STARTS_FILE = "starts.npy"
+ENDS_FILE = "ends.npy"
+PAGES_FILE = "pages.npy"
+DUPLICATES_FILE = "duplicates.npy"
+VECTORS_FILE = "vectors.npy"
+META_FILE = "meta.json"
+FORMAT_VERSION = 2
+
+
+def document_hash(data):
+    """SHA-256 of the raw PDF bytes, used as the document's store key"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class DocumentStore:
+    """On-disk store of processed documents (FAISS index + chunks).
+
+    Each document lives in ``<root>/<sha256>/``. Chunks are stored in the
+    ``ChunkStore`` layout (document text plus offset and page arrays); the
+    arrays and the index are memory-mapped on load, as are the posting
+    arrays of the chunks' BM25 index and the rows of chunks dropped as
+    duplicates; ingest's ``DedupStats`` and the ``EmbeddingInfo`` of the
+    vectors go into ``meta.json``. A ``RerankedIndex`` also keeps its
+    exact float32 vectors here, memory-mapped for re-scoring.
+    """
+
+    def __init__(self, root=DOCUMENT_STORE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, doc_hash):
+        return os.path.join(self.root, doc_hash)
+
+    def exists(self, doc_hash):
+        meta_path = os.path.join(self.path_for(doc_hash), META_FILE)
+        if not os.path.exists(meta_path):
+            return False
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f).get("format") == FORMAT_VERSION
+
+    def save(self, doc_hash, chunks, index):
+        if not isinstance(chunks, ChunkStore):
+            chunks = ChunkStore.from_chunks(list(chunks))
+
+        # Write into a scratch directory and rename so readers never see
+        # a half-written document.
+        tmp_dir = tempfile.mkdtemp(dir=self.root, prefix=".tmp-")
+        try:
+            if isinstance(index, RerankedIndex):
+                np.save(os.path.join(tmp_dir, VECTORS_FILE), np.asarray(index.vectors, dtype="float32"))
+                index = index.index
+            faiss.write_index(index, os.path.join(tmp_dir, INDEX_FILE))
+            with open(os.path.join(tmp_dir, TEXT_FILE), "w", encoding="utf-8", newline="") as f:
+                f.write(chunks.text)
+            np.save(os.path.join(tmp_dir, STARTS_FILE), chunks.starts)
+            np.save(os.path.join(tmp_dir, ENDS_FILE), chunks.ends)
+            np.save(os.path.join(tmp_dir, PAGES_FILE), chunks.pages)
+            np.save(os.path.join(tmp_dir, DUPLICATES_FILE), chunks.duplicates)
+            chunks.lexical_index().save(tmp_dir)
+            with open(os.path.join(tmp_dir, META_FILE), "w", encoding="utf-8") as f:
+                json.dump({
+                    "format": FORMAT_VERSION,
+                    "chunks": len(chunks),
+                    "dim": index.d,
+                    "dedup": chunks.dedup._asdict() if chunks.dedup is not None else None,
+                    "embedding": chunks.embedding._asdict() if chunks.embedding is not None else None,
+                }, f)
+            target = self.path_for(doc_hash)
+            if os.path.exists(target):
+                shutil.rmtree(target)
+            os.replace(tmp_dir, target)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    def load(self, doc_hash):
+        """Return ``(chunks, index)`` for a stored document, or ``None``"""
+        if not self.exists(doc_hash):
+            return None
+        path = self.path_for(doc_hash)
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        dedup, embedding = meta.get("dedup"), meta.get("embedding")
+        duplicates_path = os.path.join(path, DUPLICATES_FILE)
+        index = faiss.read_index(
+            os.path.join(path, INDEX_FILE),
+            faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+        )
+        vectors_path = os.path.join(path, VECTORS_FILE)
+        if os.path.exists(vectors_path):
+            index = RerankedIndex(index, np.load(vectors_path, mmap_mode="r"))
+        set_search_params(index)
+        with open(os.path.join(path, TEXT_FILE), encoding="utf-8", newline="") as f:
+            text = f.read()
+        chunks = ChunkStore(
+            text,
+            np.load(os.path.join(path, STARTS_FILE), mmap_mode="r"),
+            np.load(os.path.join(path, ENDS_FILE), mmap_mode="r"),
+            np.load(os.path.join(path, PAGES_FILE), mmap_mode="r"),
+            # Documents saved before the lexical tier build theirs on first use
+            LexicalIndex.load(path),
+            np.load(duplicates_path, mmap_mode="r") if os.path.exists(duplicates_path) else None,
+            DedupStats(**dedup) if dedup else None,
+            EmbeddingInfo(**embedding) if embedding else None,
+        )
+        return chunks, index
+
+    def delete(self, doc_hash):
+        shutil.rmtree(self.path_for(doc_hash), ignore_errors=True)
@@ -0,0 +1,230 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from app.config import EMBED_CACHE_DTYPE, EMBED_MODEL
+from app.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+INDEX_FILE = "index.json"
+LOCK_FILE = "lock"
+VECTORS_FILES = {"float32": "vectors.f32", "float16": "vectors.f16"}
+MIN_GROWTH_ROWS = 1024
+
+
+def cache_key(text, model=EMBED_MODEL):
+    """Content address of a chunk: SHA-256 of the model name and the text"""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Durable embedding cache backed by a memory-mapped float32 matrix.
+
+    Each vector lives in one row of ``vectors.f32``; ``index.json`` maps
+    content keys to rows in least-recently-used order so the oldest rows
+    are recycled once ``max_entries`` is reached. With ``dtype="float16"``
+    rows are stored at half precision in ``vectors.f16`` instead.
+
+    Several processes (the app, its ingest workers, ``batch_qa``) may share
+    one directory. Every read and write holds a lock on the ``lock`` file
+    and first reloads ``index.json`` if another process replaced it, so
+    rows are never handed out twice.
+    """
+
+    def __init__(self, path, max_entries=100_000, model=EMBED_MODEL, dtype=EMBED_CACHE_DTYPE):
+        if dtype not in VECTORS_FILES:
+            raise ValueError(f"Unsupported embedding cache dtype: {dtype}")
+        self.path = os.path.join(path, model)
+        self.max_entries = max_entries
+        self.model = model
+        self.dtype = dtype
+        self._vectors_file = VECTORS_FILES[dtype]
+        self._itemsize = np.dtype(dtype).itemsize
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._slots = OrderedDict()
+        self._free_rows = []
+        self._rows_used = 0
+        self._dim = None
+        self._vectors = None
+        self._seen = None
+        os.makedirs(self.path, exist_ok=True)
+        with self._lock, self._file_lock():
+            self._load()
+
+    def __len__(self):
+        return len(self._slots)
+
+    def get_many(self, texts):
+        """Return cached vectors for ``texts``, with ``None`` for misses"""
+        results = []
+        with self._lock, self._file_lock():
+            self._refresh()
+            for text in texts:
+                key = cache_key(text, self.model)
+                row = self._slots.get(key)
+                if row is None:
+                    self.misses += 1
+                    results.append(None)
+                    continue
+                self._slots.move_to_end(key)
+                self.hits += 1
+                results.append(self._vectors[row].astype("float32").tolist())
+        return results
+
+    def put_many(self, texts, vectors):
+        """Store one vector per text, evicting least recently used rows"""
+        if not texts:
+            return
+        vectors = np.asarray(vectors, dtype="float32")
+        with self._lock, self._file_lock():
+            self._refresh()
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(
+                    f"Embedding dimension {vectors.shape[1]} does not match "
+                    f"cache dimension {self._dim}"
+                )
+            for text, vector in zip(texts, vectors):
+                key = cache_key(text, self.model)
+                row = self._slots.get(key)
+                if row is None:
+                    row = self._allocate_row()
+                self._slots[key] = row
+                self._slots.move_to_end(key)
+                self._vectors[row] = vector
+            self._vectors.flush()
+            self._save_index()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._slots),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        with self._lock, self._file_lock():
+            self._reset()
+            for name in (INDEX_FILE, *VECTORS_FILES.values()):
+                file_path = os.path.join(self.path, name)
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+
+    def _reset(self):
+        self._slots.clear()
+        self._free_rows = []
+        self._rows_used = 0
+        self._dim = None
+        self._vectors = None
+        self._seen = None
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock on the cache directory, across processes"""
+        with open(os.path.join(self.path, LOCK_FILE), "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _signature(self):
+        """Identity of the saved index; ``os.replace`` gives every save a new inode"""
+        try:
+            stat = os.stat(os.path.join(self.path, INDEX_FILE))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self):
+        """Reload the index if another process saved (or cleared) it since we last did"""
+        if self._signature() != self._seen:
+            self._reset()
+            self._load()
+
+    def _allocate_row(self):
+        if len(self._slots) >= self.max_entries:
+            _, row = self._slots.popitem(last=False)
+            return row
+        if self._free_rows:
+            return self._free_rows.pop()
+        if self._vectors is None or self._rows_used >= self._vectors.shape[0]:
+            self._grow()
+        row = self._rows_used
+        self._rows_used += 1
+        return row
+
+    def _grow(self):
+        current = 0 if self._vectors is None else self._vectors.shape[0]
+        # Rows written under a larger max_entries stay addressable
+        capacity = max(min(max(current * 2, MIN_GROWTH_ROWS), self.max_entries), self._rows_used + 1)
+        vectors_path = os.path.join(self.path, self._vectors_file)
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(vectors_path, "ab") as f:
+            f.truncate(capacity * self._dim * self._itemsize)
+        self._vectors = np.memmap(
+            vectors_path, dtype=self.dtype, mode="r+", shape=(capacity, self._dim)
+        )
+
+    def _load(self):
+        index_path = os.path.join(self.path, INDEX_FILE)
+        vectors_path = os.path.join(self.path, self._vectors_file)
+        self._seen = self._signature()
+        if not (self._seen and os.path.exists(vectors_path)):
+            return
+        with open(index_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("dtype", "float32") != self.dtype:
+            return  # written in another precision; start afresh
+        self._dim = meta["dim"]
+        capacity = os.path.getsize(vectors_path) // (self._dim * self._itemsize)
+        self._rows_used = min(meta["rows_used"], capacity)
+        self._vectors = np.memmap(
+            vectors_path, dtype=self.dtype, mode="r+", shape=(capacity, self._dim)
+        )
+        for key, row in meta["slots"]:
+            if row < self._rows_used:
+                self._slots[key] = row
+        while len(self._slots) > self.max_entries:
+            self._slots.popitem(last=False)
+        # Rows no entry points to (evicted under a smaller max_entries) are reused first
+        self._free_rows = sorted(set(range(self._rows_used)) - set(self._slots.values()), reverse=True)
+
+    def _save_index(self):
+        index_path = os.path.join(self.path, INDEX_FILE)
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "model": self.model,
+                "dtype": self.dtype,
+                "dim": self._dim,
+                "rows_used": self._rows_used,
+                "slots": list(self._slots.items()),
+            }, f)
+        os.replace(tmp_path, index_path)
+        self._seen = self._signature()
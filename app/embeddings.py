@@ -0,0 +1,171 @@
+"""Embedding backends: the Mistral API and a local CPU embedder.
+
+``EMBED_BACKEND`` picks where document and question vectors come from:
+
+* ``mistral`` (default): ``mistral-embed`` through ``MistralClient``.
+* ``local``: ``HashingEmbedder``, computed in-process with NumPy. It needs
+  no network or quota and is deterministic, at the cost of purely lexical
+  similarity; useful air-gapped and for benchmarks.
+* ``auto``: the API, but a document whose embedding batches hit rate
+  limits or take longer than ``EMBED_FALLBACK_SECONDS`` is embedded
+  locally instead, and so are documents ingested during the following
+  ``EMBED_FALLBACK_COOLDOWN`` seconds.
+
+Vectors from different backends are not comparable, so a document always
+uses one backend throughout; ``EmbeddingInfo`` records which one (with the
+model and dimension) next to its chunks, and questions are embedded with
+that backend when the document is searched.
+"""
+import logging
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+from app import metrics
+from app.batching import is_transient
+from app.config import (
+    EMBED_BACKEND,
+    EMBED_FALLBACK_COOLDOWN,
+    EMBED_FALLBACK_SECONDS,
+    EMBED_MODEL,
+    LOCAL_EMBED_DIM,
+)
+from app.lazy import lazy_import
+from app.lexical import tokenize
+
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+MISTRAL = "mistral"
+LOCAL = "local"
+AUTO = "auto"
+
+EmbeddingInfo = namedtuple("EmbeddingInfo", ["backend", "model", "dim"])
+
+FALLBACKS = metrics.REGISTRY.counter(
+    "mistralqna_embed_fallbacks_total", "Times document embedding switched to the local backend, by reason"
+)
+
+_local_embedders = {}
+_policy = None
+_lock = threading.Lock()
+
+
+class HashingEmbedder:
+    """Hashed term-frequency vectors over words and adjacent word pairs.
+
+    Index terms (as tokenized for BM25, so stopwords are dropped) and
+    bigrams are hashed into ``dim`` buckets with a hash-derived sign, term
+    counts are damped with ``log1p`` and rows are L2-normalized, so L2
+    distance ranks like cosine similarity. A batch is built with a single
+    ``bincount`` over all of its (row, bucket) pairs.
+    """
+
+    name = LOCAL
+
+    def __init__(self, dim=LOCAL_EMBED_DIM):
+        self.dim = dim
+        self.model = f"hashed-tf-{dim}"
+
+    def info(self):
+        return EmbeddingInfo(self.name, self.model, self.dim)
+
+    def embed(self, texts):
+        """One float32 row per text"""
+        rows, hashes = [], []
+        for row, text in enumerate(texts):
+            terms = tokenize(text)
+            features = terms + [f"{first} {second}" for first, second in zip(terms, terms[1:])]
+            rows.extend([row] * len(features))
+            hashes.extend(zlib.crc32(feature.encode("utf-8")) for feature in features)
+        hashes = np.asarray(hashes, dtype="int64")
+        # Low bits pick the bucket, the top bit of the 32-bit hash the sign
+        buckets = np.asarray(rows, dtype="int64") * self.dim + hashes % self.dim
+        signs = np.where(hashes & (1 << 31), -1.0, 1.0)
+        counts = np.bincount(buckets, weights=signs, minlength=len(texts) * self.dim)
+        vectors = (np.sign(counts) * np.log1p(np.abs(counts))).reshape(len(texts), self.dim)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return (vectors / np.maximum(norms, 1e-12)).astype("float32")
+
+
+def local_embedder(dim=LOCAL_EMBED_DIM):
+    """Shared ``HashingEmbedder`` of a given dimension"""
+    with _lock:
+        embedder = _local_embedders.get(dim)
+        if embedder is None:
+            embedder = _local_embedders[dim] = HashingEmbedder(dim)
+        return embedder
+
+
+def embedder_for(info):
+    """Local embedder that reproduces a document's vectors, or None for API backends"""
+    if info is None or info.backend != LOCAL:
+        return None
+    return local_embedder(info.dim)
+
+
+class FallbackPolicy:
+    """Decides when document embedding should leave the API for ``embedder``.
+
+    ``should_fall_back`` is true for transient API errors (rate limits,
+    5xx, network) that survived the client's retries, and for batches
+    slower than ``slow_seconds``. ``trip`` then keeps ``active`` true for
+    ``cooldown`` seconds, so the next documents start locally right away.
+    """
+
+    def __init__(self, embedder=None, slow_seconds=EMBED_FALLBACK_SECONDS, cooldown=EMBED_FALLBACK_COOLDOWN,
+                 clock=time.monotonic):
+        self.embedder = embedder or local_embedder()
+        self.slow_seconds = slow_seconds
+        self.cooldown = cooldown
+        self._clock = clock
+        self._until = None
+
+    def active(self):
+        return self._until is not None and self._clock() < self._until
+
+    def should_fall_back(self, error=None, seconds=None):
+        if error is not None:
+            return is_transient(error)
+        return seconds is not None and seconds > self.slow_seconds
+
+    def trip(self, reason):
+        self._until = self._clock() + self.cooldown
+        if metrics.enabled():
+            FALLBACKS.inc(reason=reason)
+        logger.warning("Embedding API %s; embedding documents locally for %.0fs", reason, self.cooldown)
+
+
+def fallback_policy():
+    """The process-wide ``FallbackPolicy`` used in ``auto`` mode"""
+    global _policy
+    embedder = local_embedder()
+    with _lock:
+        if _policy is None:
+            _policy = FallbackPolicy(embedder)
+        return _policy
+
+
+def query_backend(mode=EMBED_BACKEND):
+    """Backend questions are embedded with by default"""
+    return LOCAL if mode == LOCAL else MISTRAL
+
+
+def query_embed_fn(client, mode=EMBED_BACKEND):
+    """``embed(texts)`` for questions under ``mode``"""
+    return local_embedder().embed if mode == LOCAL else client.embed
+
+
+def document_embedding(client, mode=EMBED_BACKEND):
+    """``(embed_fn, EmbeddingInfo, fallback policy or None)`` for ingesting a document under ``mode``.
+
+    The dimension in the returned info is filled in by ingest.
+    """
+    if mode == LOCAL:
+        embedder = local_embedder()
+        return embedder.embed, embedder.info(), None
+    if mode not in (MISTRAL, AUTO):
+        raise ValueError(f"Unknown embedding backend: {mode}")
+    return client.embed, EmbeddingInfo(MISTRAL, EMBED_MODEL, None), fallback_policy() if mode == AUTO else None
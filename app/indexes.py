@@ -0,0 +1,212 @@
+import math
+
+from app.config import (
+    HNSW_EF_SEARCH,
+    HNSW_M,
+    INDEX_MEMORY_BUDGET_MB,
+    IVF_NPROBE,
+    RERANK_FACTOR,
+    VECTOR_STORAGE,
+)
+from app.lazy import lazy_import
+
+faiss = lazy_import("faiss")
+np = lazy_import("numpy")
+
+BACKENDS = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+# How vectors are encoded inside the index: exact float32, half precision,
+# 8-bit scalar quantization (per-dimension min/max) or product quantization.
+STORAGES = ("float32", "fp16", "sq8", "pq")
+# faiss.ScalarQuantizer attribute per scalar storage mode
+SQ_TYPES = {
+    "fp16": "QT_fp16",
+    "sq8": "QT_8bit",
+}
+
+# Below this many vectors an exact scan is already sub-millisecond and the
+# IVF variants cannot be trained reliably, so every request falls back to flat.
+MIN_ANN_VECTORS = 1_000
+# Up to this many vectors exact search stays cheap enough to prefer it.
+FLAT_MAX_VECTORS = 20_000
+# FAISS wants roughly this many training points per IVF centroid.
+TRAIN_POINTS_PER_CENTROID = 39
+
+
+def _sq_type(storage):
+    return getattr(faiss.ScalarQuantizer, SQ_TYPES[storage])
+
+
+def ivf_nlist(n):
+    """Number of IVF lists for ``n`` vectors (~4·sqrt(n), trainable)"""
+    return max(1, min(int(4 * math.sqrt(n)), n // TRAIN_POINTS_PER_CENTROID))
+
+
+def pq_subquantizers(dim):
+    """Largest divisor of ``dim`` that keeps at least 8 dimensions per code byte"""
+    for m in range(max(1, dim // 8), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def pq_nbits(n):
+    """Bits per PQ code, reduced on small corpora so codebooks can be trained"""
+    return max(4, min(8, int(math.log2(max(2, n // TRAIN_POINTS_PER_CENTROID)))))
+
+
+def code_bytes(storage, dim):
+    """Bytes one vector occupies in the given storage mode"""
+    if storage == "float32":
+        return dim * 4
+    if storage == "fp16":
+        return dim * 2
+    if storage == "sq8":
+        return dim
+    if storage == "pq":
+        return pq_subquantizers(dim)
+    raise ValueError(f"Unknown vector storage: {storage}")
+
+
+def estimate_memory(backend, n, dim, storage="float32"):
+    """Approximate resident bytes of an index with ``n`` vectors"""
+    vector_bytes = n * code_bytes(storage, dim)
+    if backend == "flat":
+        return vector_bytes
+    if backend == "hnsw":
+        # level-0 neighbour lists dominate the graph overhead
+        return vector_bytes + n * HNSW_M * 2 * 4
+    nlist = ivf_nlist(n)
+    centroids = nlist * dim * 4
+    if backend == "ivf_flat":
+        return vector_bytes + n * 8 + centroids
+    if backend == "ivf_pq":
+        codebooks = (1 << pq_nbits(n)) * dim * 4
+        return n * (pq_subquantizers(dim) + 8) + centroids + codebooks
+    raise ValueError(f"Unknown index backend: {backend}")
+
+
+def choose_backend(n, dim, memory_budget_mb=INDEX_MEMORY_BUDGET_MB, storage="float32"):
+    """Pick an index backend from corpus size and a memory budget"""
+    budget = memory_budget_mb * 1024 * 1024
+    if n < MIN_ANN_VECTORS:
+        return "flat"
+    if n <= FLAT_MAX_VECTORS and estimate_memory("flat", n, dim, storage) <= budget:
+        return "flat"
+    for backend in ("hnsw", "ivf_flat"):
+        if estimate_memory(backend, n, dim, storage) <= budget:
+            return backend
+    return "ivf_pq"
+
+
+def create_index(backend, vectors, storage="float32"):
+    """Build (and train, where needed) an L2 index over ``vectors``"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown index backend: {backend}")
+    if storage not in STORAGES:
+        raise ValueError(f"Unknown vector storage: {storage}")
+    n, dim = vectors.shape
+    if n < MIN_ANN_VECTORS:
+        backend = "flat"
+        if storage == "pq":
+            # Too few vectors to train PQ codebooks; 8-bit SQ is the next smallest
+            storage = "sq8"
+
+    if backend == "flat":
+        if storage == "float32":
+            index = faiss.IndexFlatL2(dim)
+        elif storage == "pq":
+            index = faiss.IndexPQ(dim, pq_subquantizers(dim), pq_nbits(n))
+        else:
+            index = faiss.IndexScalarQuantizer(dim, _sq_type(storage), faiss.METRIC_L2)
+    elif backend == "hnsw":
+        if storage == "float32":
+            index = faiss.IndexHNSWFlat(dim, HNSW_M)
+        elif storage == "pq":
+            index = faiss.IndexHNSWPQ(dim, pq_subquantizers(dim), HNSW_M, pq_nbits(n))
+        else:
+            index = faiss.IndexHNSWSQ(dim, _sq_type(storage), HNSW_M)
+    else:
+        nlist = ivf_nlist(n)
+        quantizer = faiss.IndexFlatL2(dim)
+        if backend == "ivf_pq" or storage == "pq":
+            index = faiss.IndexIVFPQ(
+                quantizer, dim, nlist, pq_subquantizers(dim), pq_nbits(n)
+            )
+        elif storage == "float32":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        else:
+            index = faiss.IndexIVFScalarQuantizer(
+                quantizer, dim, nlist, _sq_type(storage), faiss.METRIC_L2
+            )
+
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    set_search_params(index)
+    return index
+
+
+class RerankedIndex:
+    """Quantized index whose shortlist is re-scored with exact float32 vectors.
+
+    The quantized index returns ``factor * k`` candidates; their exact L2
+    distances are computed from ``vectors``, which may be a read-only
+    memmap so only the shortlisted rows are ever paged in.
+    """
+
+    def __init__(self, index, vectors, factor=RERANK_FACTOR):
+        self.index = index
+        self.vectors = vectors
+        self.factor = factor
+
+    @property
+    def ntotal(self):
+        return self.index.ntotal
+
+    @property
+    def d(self):
+        return self.index.d
+
+    def search(self, queries, k):
+        queries = np.atleast_2d(np.asarray(queries, dtype="float32"))
+        shortlist = min(self.index.ntotal, k * self.factor)
+        _, candidates = self.index.search(queries, shortlist)
+        distances = np.full((len(queries), k), np.inf, dtype="float32")
+        ids = np.full((len(queries), k), -1, dtype="int64")
+        for row, (query, row_ids) in enumerate(zip(queries, candidates)):
+            # Sorted row order keeps memmap reads sequential
+            row_ids = np.sort(row_ids[row_ids >= 0])
+            exact = ((np.asarray(self.vectors[row_ids], dtype="float32") - query) ** 2).sum(axis=1)
+            best = np.argsort(exact, kind="stable")[:k]
+            distances[row, :len(best)] = exact[best]
+            ids[row, :len(best)] = row_ids[best]
+        return distances, ids
+
+    def reconstruct_n(self, start, count):
+        return np.asarray(self.vectors[start:start + count], dtype="float32")
+
+
+def index_nbytes(index):
+    """Approximate resident bytes of a built index (memmapped re-rank vectors excluded)"""
+    if isinstance(index, RerankedIndex):
+        vectors = 0 if isinstance(index.vectors, np.memmap) else index.vectors.nbytes
+        return index_nbytes(index.index) + vectors
+    if isinstance(index, faiss.IndexHNSW):
+        storage = faiss.downcast_index(index.storage)
+        # level-0 neighbour lists dominate the graph overhead
+        return index.ntotal * (storage.code_size + HNSW_M * 2 * 4)
+    if isinstance(index, faiss.IndexIVF):
+        return index.ntotal * (index.code_size + 8) + index.nlist * index.d * 4
+    return index.ntotal * getattr(index, "code_size", index.d * 4)
+
+
+def set_search_params(index, nprobe=IVF_NPROBE, ef_search=HNSW_EF_SEARCH):
+    """Apply query-time tuning knobs; indexes without them are left alone"""
+    if isinstance(index, RerankedIndex):
+        set_search_params(index.index, nprobe, ef_search)
+        return index
+    if hasattr(index, "nprobe"):
+        index.nprobe = min(nprobe, index.nlist)
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = ef_search
+    return index
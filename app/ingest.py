@@ -0,0 +1,361 @@
+"""Streaming document ingestion: extraction, chunking, embedding and indexing overlap.
+
+A producer thread pulls page texts, strips repeated header/footer lines,
+cuts chunks as soon as their text is complete, drops near-duplicates of
+earlier chunks, adds the rest to the BM25 postings and groups them into
+embedding batches. A few worker threads embed batches concurrently, and
+the calling thread adds the vectors to a flat index in chunk order and
+reports progress. Bounded queues between the stages provide
+backpressure, so a slow embedding API pauses PDF extraction instead of
+buffering the whole document.
+
+Since the stages overlap, each is timed separately into the stage
+histogram: ``extract`` (waiting on pages), ``chunk`` (cleaning, cutting,
+deduplicating and postings), ``embed_chunks`` (first batch sent to last
+vectors back, plus any local re-embedding) and ``index_build``.
+"""
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from app import metrics
+from app.batching import estimate_tokens
+from app.chunks import ChunkStore
+from app.config import (
+    CHUNK_OVERLAP,
+    CHUNK_SIZE,
+    DEDUP_ENABLED,
+    EMBED_BATCH_SIZE,
+    EMBED_BATCH_TOKENS,
+    EMBED_CONCURRENCY,
+    INDEX_BACKEND,
+    INDEX_RERANK,
+    INGEST_QUEUE_BATCHES,
+    VECTOR_STORAGE,
+)
+from app.dedup import BoilerplateFilter, ChunkDeduplicator, DedupStats, chunks_for_length
+from app.indexes import choose_backend
+from app.lazy import lazy_import
+from app.lexical import LexicalBuilder
+from app.rag import build_index
+
+faiss = lazy_import("faiss")
+np = lazy_import("numpy")
+
+IngestProgress = namedtuple("IngestProgress", ["pages", "chunks", "embedded", "done"])
+
+_DONE = object()
+
+
+class StreamingChunker:
+    """Cuts the offsets ``chunk_offsets`` would produce while pages arrive.
+
+    Only the text not yet covered by an emitted chunk is buffered; the page
+    texts are kept to assemble the final ``ChunkStore``.
+    """
+
+    def __init__(self, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+        self.size = size
+        self.step = size - overlap
+        self.pages = []
+        self.page_starts = []
+        self.length = 0
+        self._next_start = 0
+        self._buffer = ""
+        self._buffer_start = 0
+
+    def feed(self, page_text):
+        """Add a page; returns the ``(start, end, text)`` chunks it completed"""
+        self.pages.append(page_text)
+        self.page_starts.append(self.length)
+        self.length += len(page_text)
+        self._buffer += page_text
+        chunks = []
+        while self._next_start + self.size <= self.length:
+            chunks.append(self._cut(self._next_start + self.size))
+        self._trim()
+        return chunks
+
+    def finish(self):
+        """Emit the trailing chunks that end at the end of the text"""
+        chunks = []
+        while self._next_start < self.length:
+            chunks.append(self._cut(min(self._next_start + self.size, self.length)))
+        return chunks
+
+    def chunk_store(self):
+        return ChunkStore.from_text(
+            "".join(self.pages), np.asarray(self.page_starts, dtype="int64"), self.size, self.size - self.step
+        )
+
+    def _cut(self, end):
+        start = self._next_start
+        text = self._buffer[start - self._buffer_start:end - self._buffer_start]
+        self._next_start += self.step
+        return start, end, text
+
+    def _trim(self):
+        drop = self._next_start - self._buffer_start
+        if drop > 0:
+            self._buffer = self._buffer[drop:]
+            self._buffer_start = self._next_start
+
+
+def _put(q, item, stop):
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _drop_duplicates(chunks, duplicates):
+    """``chunks`` without the duplicate positions, which move to ``duplicates``"""
+    rows = np.asarray(duplicates, dtype="int64").reshape(-1, 2)
+    positions, kept_ids = rows[:, 0], rows[:, 1]
+    keep = np.ones(len(chunks), dtype=bool)
+    keep[positions] = False
+    return ChunkStore(
+        chunks.text, chunks.starts[keep], chunks.ends[keep], chunks.pages[keep],
+        duplicates=np.column_stack(
+            [chunks.starts[positions], chunks.ends[positions], chunks.pages[positions], kept_ids]
+        ),
+    )
+
+
+def ingest(
+    pages,
+    embed_fn,
+    progress=None,
+    backend=INDEX_BACKEND,
+    storage=VECTOR_STORAGE,
+    rerank=INDEX_RERANK,
+    size=CHUNK_SIZE,
+    overlap=CHUNK_OVERLAP,
+    workers=EMBED_CONCURRENCY,
+    max_items=EMBED_BATCH_SIZE,
+    max_tokens=EMBED_BATCH_TOKENS,
+    queue_batches=INGEST_QUEUE_BATCHES,
+    dedup=DEDUP_ENABLED,
+    embedding=None,
+    fallback=None,
+):
+    """Chunk, embed and index an iterable of page texts; returns ``(chunks, index)``.
+
+    ``progress(IngestProgress)`` is called from the calling thread after
+    every indexed batch. Vectors go straight into a flat float32 index;
+    when the configuration asks for another backend or storage mode, the
+    final index is built from the collected vectors once all are known
+    (ANN training needs the whole set).
+
+    With ``dedup``, boilerplate lines and near-duplicate chunks are never
+    embedded; the returned chunks record each dropped duplicate and the
+    chunk standing in for it (``ChunkStore.duplicates``) plus ``DedupStats``.
+
+    ``embedding`` (an ``EmbeddingInfo``) describes ``embed_fn`` and is stored
+    as ``chunks.embedding`` with the index dimension. With a ``FallbackPolicy``
+    as ``fallback``, a rate-limited or slow API switches the rest of the
+    document to the local embedder, and batches the API already embedded
+    are redone locally at the end so the index holds a single vector space.
+    """
+    chunker = StreamingChunker(size, overlap)
+    boilerplate = BoilerplateFilter() if dedup else None
+    deduplicator = ChunkDeduplicator() if dedup else None
+    duplicates = []  # (position among all cut chunks, kept chunk ID)
+    lexical = LexicalBuilder()
+    batches = queue.Queue(maxsize=queue_batches)
+    results = queue.Queue()
+    stop = threading.Event()
+    switched = threading.Event()
+    switch_lock = threading.Lock()
+    if fallback is not None and fallback.active():
+        switched.set()
+    counts = {"pages": 0, "chunks": 0, "cut": 0}
+    # Producer time outside extraction, time it sat blocked on a full queue, index time
+    seconds = {"produce": 0.0, "blocked": 0.0, "index": 0.0}
+    embed_spans = []  # (start, end) of every embedding call
+
+    def produce():
+        batch, tokens, batch_start = [], 0, 0
+        try:
+            def flush():
+                nonlocal batch, tokens, batch_start
+                started = time.perf_counter()
+                queued = not batch or _put(batches, (batch_start, batch), stop)
+                seconds["blocked"] += time.perf_counter() - started
+                if not queued:
+                    return False
+                batch_start += len(batch)
+                batch, tokens = [], 0
+                return True
+
+            def add(chunks):
+                nonlocal tokens
+                for _, _, text in chunks:
+                    position = counts["cut"]
+                    counts["cut"] += 1
+                    kept_id = deduplicator.add(text) if deduplicator is not None else None
+                    if kept_id is not None:
+                        duplicates.append((position, kept_id))
+                        continue
+                    cost = estimate_tokens(text)
+                    if batch and (len(batch) >= max_items or tokens + cost > max_tokens):
+                        if not flush():
+                            return False
+                    batch.append(text)
+                    tokens += cost
+                    counts["chunks"] += 1
+                    # Postings are built here, while the batch waits for the API
+                    lexical.add(text)
+                return True
+
+            def feed(cleaned):
+                return all(add(chunker.feed(page)) for page in cleaned)
+
+            for page in metrics.timed_iter("extract", pages):
+                counts["pages"] += 1
+                started = time.perf_counter()
+                fed = not stop.is_set() and feed([page] if boilerplate is None else boilerplate.feed(page))
+                seconds["produce"] += time.perf_counter() - started
+                if not fed:
+                    return
+            started = time.perf_counter()
+            if (boilerplate is None or feed(boilerplate.finish())) and add(chunker.finish()):
+                flush()
+            seconds["produce"] += time.perf_counter() - started
+        except BaseException as e:
+            results.put(e)
+        finally:
+            for _ in range(workers):
+                _put(batches, _DONE, stop)
+
+    def switch(reason):
+        with switch_lock:
+            if not switched.is_set():
+                switched.set()
+                fallback.trip(reason)
+
+    def embed_batch(texts):
+        """``(vectors, embedded locally)`` for a batch"""
+        if switched.is_set():
+            return fallback.embedder.embed(texts), True
+        started = time.perf_counter()
+        try:
+            vectors = embed_fn(texts)
+        except Exception as e:
+            if fallback is None or not fallback.should_fall_back(error=e):
+                raise
+            switch("unavailable")
+            return fallback.embedder.embed(texts), True
+        if fallback is not None and fallback.should_fall_back(seconds=time.perf_counter() - started):
+            switch("slow")
+        return vectors, False
+
+    def embed():
+        while not stop.is_set():
+            try:
+                item = batches.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                results.put(_DONE)
+                return
+            start, texts = item
+            try:
+                started = time.perf_counter()
+                vectors, local = embed_batch(texts)
+                embed_spans.append((started, time.perf_counter()))
+                results.put((start, np.asarray(vectors, dtype="float32"), local))
+            except BaseException as e:
+                results.put(e)
+                return
+
+    threads = [threading.Thread(target=produce, daemon=True)]
+    threads += [threading.Thread(target=embed, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    index = None
+    parts = []
+    pending = {}
+    embedded = 0
+    finished = 0
+    try:
+        while finished < workers:
+            item = results.get()
+            if item is _DONE:
+                finished += 1
+                continue
+            if isinstance(item, BaseException):
+                raise item
+            start, vectors, local = item
+            pending[start] = (vectors, local)
+            # Batches finish out of order; index them in chunk order
+            while embedded in pending:
+                vectors, local = pending.pop(embedded)
+                parts.append((vectors, local))
+                # After a fallback the index is rebuilt from local vectors at the end
+                if not local:
+                    started = time.perf_counter()
+                    if index is None:
+                        index = faiss.IndexFlatL2(vectors.shape[1])
+                    index.add(vectors)
+                    seconds["index"] += time.perf_counter() - started
+                embedded += len(vectors)
+                if progress is not None:
+                    progress(IngestProgress(counts["pages"], counts["chunks"], embedded, False))
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    chunks = chunker.chunk_store()
+    if not len(chunks):
+        raise ValueError("No text could be extracted from the document")
+    if dedup:
+        chunks = _drop_duplicates(chunks, duplicates)
+        chunks.dedup = DedupStats(
+            boilerplate.lines_removed,
+            boilerplate.chars_in - boilerplate.chars_out,
+            len(duplicates),
+            len(duplicates)
+            + chunks_for_length(boilerplate.chars_in, size, overlap)
+            - chunks_for_length(boilerplate.chars_out, size, overlap),
+        )
+    if embedded != len(chunks):
+        raise RuntimeError(f"Embedded {embedded} of {len(chunks)} chunks")
+    chunks.lexical = lexical.build()
+
+    embed_seconds = max(end for _, end in embed_spans) - min(start for start, _ in embed_spans)
+    if any(local for _, local in parts):
+        started = time.perf_counter()
+        embedding = fallback.embedder.info()
+        redone, position = [], 0
+        for vectors, local in parts:
+            if not local:
+                texts = chunks[position:position + len(vectors)]
+                vectors = np.asarray(fallback.embedder.embed(texts), dtype="float32")
+            redone.append(vectors)
+            position += len(vectors)
+        vectors = np.concatenate(redone)
+        index = None
+        embed_seconds += time.perf_counter() - started
+    else:
+        vectors = np.concatenate([vectors for vectors, _ in parts])
+    if backend == "auto":
+        backend = choose_backend(len(vectors), vectors.shape[1], storage=storage)
+    if index is None or backend != "flat" or storage != "float32":
+        started = time.perf_counter()
+        index = build_index(vectors, backend, storage, rerank)
+        seconds["index"] += time.perf_counter() - started
+    metrics.STAGE_SECONDS.observe(seconds["produce"] - seconds["blocked"], stage="chunk")
+    metrics.STAGE_SECONDS.observe(embed_seconds, stage="embed_chunks")
+    metrics.STAGE_SECONDS.observe(seconds["index"], stage="index_build")
+    if embedding is not None:
+        chunks.embedding = embedding._replace(dim=int(vectors.shape[1]))
+    if progress is not None:
+        progress(IngestProgress(counts["pages"], len(chunks), embedded, True))
+    return chunks, index
@@ -0,0 +1,208 @@
+"""Background document ingestion in a local worker process pool.
+
+The web process only submits jobs and polls their status; extraction,
+embedding and index building run in spawned worker processes, which
+publish the finished document to the ``DocumentStore`` (an atomic rename),
+where any session can load it. Jobs for the same content hash are shared.
+
+Workers embed through the shared, process-safe ``EmbeddingCache`` and
+return the metrics they recorded, which are merged into the web process's
+registry when the job finishes.
+"""
+import multiprocessing
+import sys
+import threading
+import uuid
+from collections import OrderedDict, namedtuple
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from contextlib import contextmanager
+
+from app import metrics
+from app.config import (
+    DOCUMENT_STORE_DIR,
+    EMBED_CACHE_DIR,
+    EMBED_CACHE_MAX_ENTRIES,
+    INGEST_WORKERS,
+    MISTRAL_API_KEY,
+)
+
+JobStatus = namedtuple("JobStatus", ["job_id", "doc_hash", "name", "state", "progress", "error"])
+
+# Finished jobs remembered for status polling
+JOB_HISTORY = 256
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _cancel_key(job_id):
+    return f"cancel:{job_id}"
+
+
+@contextmanager
+def _without_main_script():
+    """Start processes without re-running the ``__main__`` script in them.
+
+    "spawn" children normally import the parent's main script first; under
+    Streamlit that is the app itself, whose module-level code must not run
+    in a worker. Workers only need ``app.*``.
+    """
+    main = sys.modules.get("__main__")
+    path = getattr(main, "__file__", None)
+    if path is None:
+        yield
+        return
+    del main.__file__
+    try:
+        yield
+    finally:
+        main.__file__ = path
+
+
+def run_ingest_job(job_id, doc_hash, data, store_root, shared):
+    """Worker-process entry point: ingest one PDF and save it to the store.
+
+    Returns the metric increments recorded while doing so.
+    """
+    from app.document_store import DocumentStore
+    from app.embedding_cache import EmbeddingCache
+    from app.embeddings import document_embedding
+    from app.ingest import ingest
+    from app.mistral_client import MistralClient
+    from app.pdf import iter_pages
+
+    if shared.get(_cancel_key(job_id)):
+        raise JobCancelled(job_id)
+    store = DocumentStore(store_root)
+    if store.exists(doc_hash):
+        return None
+    shared[job_id] = ("running", None)
+
+    def progress(update):
+        if shared.get(_cancel_key(job_id)):
+            raise JobCancelled(job_id)
+        shared[job_id] = ("running", tuple(update))
+
+    client = MistralClient(MISTRAL_API_KEY, cache=EmbeddingCache(EMBED_CACHE_DIR, EMBED_CACHE_MAX_ENTRIES))
+    with metrics.recorded() as changes:
+        with metrics.span("ingest"):
+            pages = (page.text for page in iter_pages(data))
+            embed_fn, embedding, fallback = document_embedding(client)
+            chunks, index = ingest(pages, embed_fn, progress, embedding=embedding, fallback=fallback)
+        metrics.record_dedup(chunks.dedup)
+        with metrics.span("store_save"):
+            store.save(doc_hash, chunks, index)
+    return changes
+
+
+class _Job:
+    __slots__ = ("job_id", "doc_hash", "name", "future", "waiters")
+
+    def __init__(self, job_id, doc_hash, name, future):
+        self.job_id = job_id
+        self.doc_hash = doc_hash
+        self.name = name
+        self.future = future
+        self.waiters = 1
+
+
+class IngestJobs:
+    """Job queue for document ingestion, shared by every session of the server.
+
+    ``submit`` returns a job ID (the running job's ID when the same content
+    is already being processed); ``status`` polls it; ``cancel`` withdraws
+    one waiter and stops the job once nobody is waiting for it.
+    """
+
+    def __init__(self, store_root=DOCUMENT_STORE_DIR, workers=INGEST_WORKERS, run=run_ingest_job):
+        self.store_root = store_root
+        self.workers = workers
+        self._run = run
+        # Processes start with the first job, not on the app's cold start
+        self._manager = None
+        self._shared = None
+        self._pool = None
+        self._jobs = OrderedDict()
+        self._active = {}
+        # Reentrant: Future.cancel() runs the done callback in the calling thread
+        self._lock = threading.RLock()
+
+    def submit(self, doc_hash, data, name=None):
+        with self._lock:
+            job_id = self._active.get(doc_hash)
+            if job_id is not None:
+                self._jobs[job_id].waiters += 1
+                return job_id
+            job_id = uuid.uuid4().hex
+            with _without_main_script():
+                if self._pool is None:
+                    self._start()
+                future = self._pool.submit(self._run, job_id, doc_hash, data, self.store_root, self._shared)
+            self._jobs[job_id] = _Job(job_id, doc_hash, name, future)
+            self._active[doc_hash] = job_id
+            self._prune()
+        future.add_done_callback(lambda future: self._finished(doc_hash, job_id, future))
+        return job_id
+
+    def status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        progress, error = None, None
+        future = job.future
+        if not future.done():
+            state, progress = self._shared.get(job_id, ("queued", None))
+            if self._shared.get(_cancel_key(job_id)):
+                state = "cancelling"
+        else:
+            try:
+                future.result()
+                state = "done"
+            except (CancelledError, JobCancelled):
+                state = "cancelled"
+            except Exception as e:
+                state, error = "failed", str(e) or type(e).__name__
+        return JobStatus(job_id, job.doc_hash, job.name, state, progress, error)
+
+    def cancel(self, job_id):
+        """Withdraw one waiter; returns True if the job itself was cancelled"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.future.done():
+                return False
+            job.waiters -= 1
+            if job.waiters > 0:
+                return False
+            if not job.future.cancel():
+                # Already handed to a worker: it stops at its next progress report
+                self._shared[_cancel_key(job_id)] = True
+            if self._active.get(job.doc_hash) == job_id:
+                del self._active[job.doc_hash]
+            return True
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._manager.shutdown()
+
+    def _start(self):
+        context = multiprocessing.get_context("spawn")
+        self._manager = context.Manager()
+        self._shared = self._manager.dict()
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+
+    def _finished(self, doc_hash, job_id, future):
+        with self._lock:
+            if self._active.get(doc_hash) == job_id:
+                del self._active[doc_hash]
+        if not future.cancelled() and future.exception() is None:
+            metrics.merge(future.result())
+        self._shared.pop(job_id, None)
+        self._shared.pop(_cancel_key(job_id), None)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.future.done()]
+        for job_id in finished[:max(0, len(self._jobs) - JOB_HISTORY)]:
+            del self._jobs[job_id]
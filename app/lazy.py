@@ -0,0 +1,202 @@
+"""Deferred imports of heavy dependencies and an import-time profiler.
+
+Streamlit executes ``main.py`` before the first paint, so everything it
+imports is on the cold-start path. Modules that need FAISS, NumPy, pypdf
+or the Mistral SDK bind them with ``lazy_import`` instead: the real import
+happens on first attribute access, i.e. when a document is processed or a
+question asked, and its cost is recorded in ``IMPORT_SECONDS``.
+
+``profile_imports()`` additionally times every module imported from then
+on (like ``python -X importtime``), for the ``IMPORT_PROFILE`` mode:
+
+    IMPORT_PROFILE=1 streamlit run main.py
+    python -m app.lazy main --top 20
+"""
+import argparse
+import importlib
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Dependencies kept off the first-render path
+HEAVY_MODULES = ("faiss", "numpy", "pypdf", "mistralai")
+
+# Module name -> seconds its deferred import took
+IMPORT_SECONDS = {}
+
+_profiler = None
+
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    started = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    seconds = time.perf_counter() - started
+                    IMPORT_SECONDS[self._name] = seconds
+                    logger.info("Deferred import of %s took %.3fs", self._name, seconds)
+                    self._module = module
+        return self._module
+
+
+def lazy_import(name):
+    """``name`` itself when already imported, otherwise a ``LazyModule``"""
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
+
+
+def is_loaded(name):
+    return name in sys.modules
+
+
+class _TimedLoader:
+    def __init__(self, loader, profiler):
+        self._loader = loader
+        self._profiler = profiler
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        with self._profiler.timing(module.__name__):
+            self._loader.exec_module(module)
+
+
+class ImportProfiler:
+    """Meta path hook that records self and cumulative import time per module"""
+
+    def __init__(self):
+        self.records = {}  # module name -> [self seconds, cumulative seconds]
+        self._stack = threading.local()
+        self._finding = threading.local()
+
+    def find_spec(self, name, path=None, target=None):
+        if getattr(self._finding, "active", False):
+            return None
+        self._finding.active = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(name, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._finding.active = False
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+    @contextmanager
+    def timing(self, name):
+        if not hasattr(self._stack, "frames"):
+            self._stack.frames = []
+        stack = self._stack.frames
+        # [start, seconds spent importing nested modules]
+        stack.append([time.perf_counter(), 0.0])
+        try:
+            yield
+        finally:
+            started, children = stack.pop()
+            cumulative = time.perf_counter() - started
+            self.records[name] = [cumulative - children, cumulative]
+            if stack:
+                stack[-1][1] += cumulative
+
+    def top(self, n=20):
+        """``(module, self_seconds, cumulative_seconds)`` rows, costliest cumulative first"""
+        rows = sorted(
+            ((name, own, cumulative) for name, (own, cumulative) in self.records.items()),
+            key=lambda row: row[2],
+            reverse=True,
+        )
+        return rows[:n]
+
+    def report(self, n=20):
+        total = sum(own for own, _ in self.records.values())
+        lines = [f"{len(self.records)} modules imported in {total:.3f}s",
+                 f"{'self s':>8}{'cumul. s':>10}  module"]
+        for name, own, cumulative in self.top(n):
+            lines.append(f"{own:>8.3f}{cumulative:>10.3f}  {name}")
+        return "\n".join(lines)
+
+
+def profile_imports():
+    """Start timing every subsequent import; returns the (single) profiler.
+
+    Also surfaces this module's log, so deferred imports report their cost.
+    """
+    global _profiler
+    if _profiler is None:
+        _profiler = ImportProfiler()
+        sys.meta_path.insert(0, _profiler)
+        if not logger.handlers:
+            logger.addHandler(logging.StreamHandler())
+            logger.setLevel(logging.INFO)
+    return _profiler
+
+
+def stop_profiling():
+    global _profiler
+    if _profiler is not None and _profiler in sys.meta_path:
+        sys.meta_path.remove(_profiler)
+    profiler, _profiler = _profiler, None
+    return profiler
+
+
+def log_import_profile(top=20):
+    """Log the profile of everything imported so far and stop profiling"""
+    profiler = stop_profiling()
+    if profiler is None:
+        return
+    deferred = ", ".join(
+        f"{name} {'loaded' if is_loaded(name) else 'deferred'}" for name in HEAVY_MODULES
+    )
+    logger.info("Import profile up to first render (%s)\n%s", deferred, profiler.report(top))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report per-module import cost of a module.")
+    parser.add_argument("modules", nargs="*", default=["main"], help="modules to import (default: main)")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    profiler = profile_imports()
+    started = time.perf_counter()
+    for name in args.modules:
+        importlib.import_module(name)
+    elapsed = time.perf_counter() - started
+    stop_profiling()
+    print(profiler.report(args.top))
+    print(f"import {' '.join(args.modules)}: {elapsed:.3f}s wall")
+    for name in HEAVY_MODULES:
+        print(f"  {name}: {'loaded' if is_loaded(name) else 'deferred'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""BM25 keyword retrieval over a document's chunks.
+
+The inverted index is stored CSR-style in flat NumPy arrays: for term id
+``t``, ``offsets[t]:offsets[t + 1]`` slices ``postings`` (chunk IDs in
+ascending order) and ``freqs`` (occurrences in that chunk), and
+``lengths`` holds every chunk's token count. Only the vocabulary is a
+Python dict. The arrays are saved next to the document and memory-mapped
+on load, like the FAISS index.
+
+Keyword-style questions (names, section numbers, a few distinctive terms)
+are often answered confidently by BM25 alone, which needs no query
+embedding; otherwise lexical and vector results are combined with
+reciprocal-rank fusion.
+"""
+import itertools
+import json
+import math
+import os
+import re
+from collections import Counter, namedtuple
+
+from app.config import BM25_B, BM25_K1, LEXICAL_CONFIDENCE_MARGIN, LEXICAL_MAX_QUERY_TERMS, RRF_K
+from app.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# Words, numbers and dotted/hyphenated compounds such as "3.2.1" or "covid-19"
+TOKEN_PATTERN = re.compile(r"\w+(?:[.\-]\w+)*")
+STOPWORDS = frozenset("""
+    a about an and are as at be by can could did do does for from has have how i if in into is it
+    its me my of on or our should that the their them there these they this those to was we were
+    what when where which who whom why will with would you your
+""".split())
+
+TERMS_FILE = "lexical_terms.json"
+OFFSETS_FILE = "lexical_offsets.npy"
+POSTINGS_FILE = "lexical_postings.npy"
+FREQS_FILE = "lexical_freqs.npy"
+LENGTHS_FILE = "lexical_lengths.npy"
+
+# Term counts are stored as uint16
+MAX_FREQ = 65_535
+
+LexicalMatches = namedtuple("LexicalMatches", ["ids", "scores", "coverage"])
+
+
+def tokenize(text):
+    """Lower-cased index terms of ``text``, stopwords removed"""
+    return [term for term in TOKEN_PATTERN.findall(text.lower()) if term not in STOPWORDS]
+
+
+def query_terms(question):
+    """Distinct terms of a question, in order"""
+    return list(dict.fromkeys(tokenize(question)))
+
+
+class LexicalBuilder:
+    """Collects chunks in order; ``build`` freezes them into a ``LexicalIndex``"""
+
+    def __init__(self):
+        self._postings = {}  # term -> ([chunk ids], [counts])
+        self._lengths = []
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def add(self, text):
+        chunk_id = len(self._lengths)
+        counts = Counter(tokenize(text))
+        self._lengths.append(sum(counts.values()))
+        for term, count in counts.items():
+            entry = self._postings.get(term)
+            if entry is None:
+                entry = self._postings[term] = ([], [])
+            entry[0].append(chunk_id)
+            entry[1].append(count)
+
+    def build(self):
+        terms = list(self._postings)
+        sizes = np.fromiter((len(self._postings[term][0]) for term in terms), dtype="int64", count=len(terms))
+        offsets = np.zeros(len(terms) + 1, dtype="int64")
+        np.cumsum(sizes, out=offsets[1:])
+        total = int(offsets[-1])
+        postings = np.fromiter(
+            itertools.chain.from_iterable(self._postings[term][0] for term in terms), dtype="int32", count=total
+        )
+        freqs = np.fromiter(
+            itertools.chain.from_iterable(self._postings[term][1] for term in terms), dtype="int64", count=total
+        )
+        return LexicalIndex(
+            terms, offsets, postings, np.minimum(freqs, MAX_FREQ).astype("uint16"),
+            np.asarray(self._lengths, dtype="int32"),
+        )
+
+
+class LexicalIndex:
+    """Read-only BM25 index over one document's chunks (see module docstring)"""
+
+    def __init__(self, terms, offsets, postings, freqs, lengths):
+        self.term_list = list(terms)
+        self.terms = {term: term_id for term_id, term in enumerate(self.term_list)}
+        self.offsets = offsets
+        self.postings = postings
+        self.freqs = freqs
+        self.lengths = lengths
+        self.avg_length = float(np.mean(lengths)) if len(lengths) else 0.0
+
+    @classmethod
+    def from_texts(cls, texts):
+        builder = LexicalBuilder()
+        for text in texts:
+            builder.add(text)
+        return builder.build()
+
+    def __len__(self):
+        return len(self.lengths)
+
+    @property
+    def nbytes(self):
+        """Approximate memory held: the posting arrays plus the vocabulary text"""
+        arrays = self.offsets.nbytes + self.postings.nbytes + self.freqs.nbytes + self.lengths.nbytes
+        return arrays + sum(len(term) for term in self.term_list)
+
+    def search(self, terms, k, k1=BM25_K1, b=BM25_B):
+        """Best ``k`` chunks for ``terms`` by BM25, with the fraction of terms each contains"""
+        n = len(self.lengths)
+        scores = np.zeros(n, dtype="float32")
+        matched = np.zeros(n, dtype="int32")
+        norm = None
+        for term in terms:
+            term_id = self.terms.get(term)
+            if term_id is None:
+                continue
+            start, end = int(self.offsets[term_id]), int(self.offsets[term_id + 1])
+            ids = self.postings[start:end]
+            tf = self.freqs[start:end].astype("float32")
+            if norm is None:
+                norm = k1 * (1 - b + b * self.lengths / max(self.avg_length, 1e-9))
+            idf = math.log(1 + (n - (end - start) + 0.5) / (end - start + 0.5))
+            # Chunk IDs are unique within a posting list, so fancy-index += is safe
+            scores[ids] += idf * tf * (k1 + 1) / (tf + norm[ids])
+            matched[ids] += 1
+        candidates = np.flatnonzero(matched)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return LexicalMatches(top, scores[top], matched[top] / max(1, len(terms)))
+
+    def save(self, path):
+        with open(os.path.join(path, TERMS_FILE), "w", encoding="utf-8") as f:
+            json.dump(self.term_list, f, ensure_ascii=False)
+        np.save(os.path.join(path, OFFSETS_FILE), self.offsets)
+        np.save(os.path.join(path, POSTINGS_FILE), self.postings)
+        np.save(os.path.join(path, FREQS_FILE), self.freqs)
+        np.save(os.path.join(path, LENGTHS_FILE), self.lengths)
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map an index saved in ``path``; ``None`` if there is none"""
+        terms_path = os.path.join(path, TERMS_FILE)
+        if not os.path.exists(terms_path):
+            return None
+        with open(terms_path, encoding="utf-8") as f:
+            terms = json.load(f)
+        return cls(
+            terms,
+            np.load(os.path.join(path, OFFSETS_FILE), mmap_mode="r"),
+            np.load(os.path.join(path, POSTINGS_FILE), mmap_mode="r"),
+            np.load(os.path.join(path, FREQS_FILE), mmap_mode="r"),
+            np.load(os.path.join(path, LENGTHS_FILE), mmap_mode="r"),
+        )
+
+
+def is_confident(terms, scores, coverage, margin=LEXICAL_CONFIDENCE_MARGIN, max_terms=LEXICAL_MAX_QUERY_TERMS):
+    """Whether the best lexical match can stand in for semantic search.
+
+    Only short, keyword-style queries qualify, and only when the best chunk
+    contains every query term and outscores the runner-up by ``margin``.
+    """
+    if not 0 < len(terms) <= max_terms or not len(scores) or coverage[0] < 1.0:
+        return False
+    return len(scores) == 1 or scores[0] >= margin * scores[1]
+
+
+def rrf_scores(rankings, k=RRF_K):
+    """Sum of ``1 / (k + rank)`` over several ranked lists, per key in first-seen order"""
+    fused = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank)
+    return fused
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Keys of several ranked lists, ordered by their ``rrf_scores``"""
+    fused = rrf_scores(rankings, k)
+    # sorted() is stable: ties keep the order of the first ranking
+    return sorted(fused, key=fused.get, reverse=True)
@@ -0,0 +1,137 @@
+import logging
+import threading
+from collections import namedtuple
+
+from app.batching import CHARS_PER_TOKEN
+from app.config import (
+    MEMORY_RELEVANCE_THRESHOLD,
+    MEMORY_TOKEN_BUDGET,
+    MEMORY_WINDOW_TURNS,
+)
+from app.lazy import lazy_import
+from app.prompts import build_summary_prompt, format_conversation
+
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+Turn = namedtuple("Turn", ["question", "answer", "embedding"])
+
+
+def _render(turn):
+    return format_conversation([
+        {"role": "user", "content": turn.question},
+        {"role": "assistant", "content": turn.answer},
+    ])
+
+
+class ConversationMemory:
+    """Conversation context for prompts, bounded by a token budget.
+
+    The latest ``window`` question/answer turns are kept verbatim; older
+    turns are folded into a rolling summary by ``summarize_fn`` (a prompt
+    -> text callable) on a background thread, so no request waits for it.
+    ``context`` returns the summary, the previous turn (for follow-ups) and
+    whichever other recent turns are similar enough to the new question,
+    trimmed to ``token_budget``.
+    """
+
+    def __init__(
+        self,
+        summarize_fn=None,
+        token_budget=MEMORY_TOKEN_BUDGET,
+        window=MEMORY_WINDOW_TURNS,
+        threshold=MEMORY_RELEVANCE_THRESHOLD,
+    ):
+        self.summarize_fn = summarize_fn
+        self.token_budget = token_budget
+        self.window = window
+        self.threshold = threshold
+        self.summary = ""
+        self.turns = []
+        self._lock = threading.Lock()
+        self._refresh = None
+
+    def __len__(self):
+        return len(self.turns)
+
+    def add_turn(self, question, answer, embedding=None):
+        """Remember a finished turn; schedules a summary refresh past the window"""
+        if embedding is not None:
+            embedding = np.asarray(embedding, dtype="float32")
+            embedding = embedding / (np.linalg.norm(embedding) or 1.0)
+        with self._lock:
+            self.turns.append(Turn(question, answer, embedding))
+            overflow = len(self.turns) > self.window
+        if overflow:
+            self.refresh_async()
+
+    def refresh(self):
+        """Fold the turns beyond the window into the summary"""
+        with self._lock:
+            old = self.turns[:len(self.turns) - self.window]
+            summary = self.summary
+        if not old or self.summarize_fn is None:
+            if old:
+                with self._lock:
+                    del self.turns[:len(old)]
+            return False
+        try:
+            conversation = "".join(_render(turn) for turn in old)
+            summary = self.summarize_fn(build_summary_prompt(summary, conversation)).strip()
+        except Exception:
+            # Keep the turns; the next overflow retries
+            logger.exception("Conversation summary refresh failed")
+            return False
+        with self._lock:
+            self.summary = summary
+            del self.turns[:len(old)]
+        return True
+
+    def refresh_async(self):
+        with self._lock:
+            if self._refresh is not None and self._refresh.is_alive():
+                return self._refresh
+            self._refresh = threading.Thread(target=self.refresh, daemon=True)
+            self._refresh.start()
+            return self._refresh
+
+    def context(self, question_embedding=None):
+        """Conversation text for the next prompt, within the token budget"""
+        with self._lock:
+            summary = self.summary
+            turns = list(self.turns[-self.window:])
+        if not turns and not summary:
+            return ""
+
+        budget = self.token_budget * CHARS_PER_TOKEN
+        parts = []
+        if summary:
+            summary = f"Summary of earlier conversation: {summary[:budget]}\n"
+            parts.append((-1, summary))
+            budget -= len(summary)
+
+        # The previous turn always comes first: follow-ups refer to it
+        candidates = [(float("inf"), len(turns) - 1)] if turns else []
+        if question_embedding is not None:
+            query = np.asarray(question_embedding, dtype="float32")
+            query = query / (np.linalg.norm(query) or 1.0)
+            for position, turn in enumerate(turns[:-1]):
+                if turn.embedding is None:
+                    continue
+                similarity = float(turn.embedding @ query)
+                if similarity >= self.threshold:
+                    candidates.append((similarity, position))
+        candidates.sort(reverse=True)
+
+        for rank, (_, position) in enumerate(candidates):
+            if budget <= 0:
+                break
+            text = _render(turns[position])
+            if len(text) > budget:
+                if rank > 0:
+                    continue
+                text = text[:budget].rstrip() + "…\n"
+            parts.append((position, text))
+            budget -= len(text)
+        return "".join(text for _, text in sorted(parts))
@@ -0,0 +1,300 @@
+"""Stage timings and API token counts in Prometheus text format.
+
+Collection is off unless ``METRICS_ENABLED`` is set; disabled spans return
+a shared no-op context manager, so instrumented code pays one branch.
+With ``METRICS_PORT`` set the app serves ``/metrics`` for scraping.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.config import METRICS_ENABLED
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_enabled = METRICS_ENABLED
+_NOOP = nullcontext()
+_DONE = object()
+
+
+def enabled():
+    return _enabled
+
+
+def set_enabled(flag):
+    global _enabled
+    _enabled = flag
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        if not _enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def add(self, key, value):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    @staticmethod
+    def difference(after, before):
+        return after - before
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        if not _enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            # [per-bucket counts..., overflow count, sum]
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def count(self, **labels):
+        series = self._series.get(_label_key(labels))
+        return sum(series[:-1]) if series else 0
+
+    def snapshot(self):
+        with self._lock:
+            return {key: list(series) for key, series in self._series.items()}
+
+    def add(self, key, value):
+        with self._lock:
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            for i, amount in enumerate(value):
+                series[i] += amount
+
+    @staticmethod
+    def difference(after, before):
+        return [a - b for a, b in zip(after, before)]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+            observed = sum(series[:-1])
+            lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {observed}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {observed}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help_text):
+        metric = Counter(name, help_text)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """Copy of every series, by metric name"""
+        return {metric.name: metric.snapshot() for metric in self._metrics}
+
+    def changes_since(self, before):
+        """Increments of every series since ``before`` (a ``snapshot``), as plain picklable data"""
+        changes = {}
+        for metric in self._metrics:
+            old = before.get(metric.name, {})
+            for key, value in metric.snapshot().items():
+                if key not in old:
+                    changes.setdefault(metric.name, {})[key] = value
+                elif value != old[key]:
+                    changes.setdefault(metric.name, {})[key] = metric.difference(value, old[key])
+        return changes
+
+    def merge(self, changes):
+        """Add increments recorded by another process's registry (see ``changes_since``)"""
+        by_name = {metric.name: metric for metric in self._metrics}
+        for name, series in changes.items():
+            metric = by_name.get(name)
+            if metric is None:
+                continue
+            for key, value in series.items():
+                metric.add(key, value)
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "mistralqna_stage_seconds", "Wall-clock time spent in each pipeline stage"
+)
+TOKENS = REGISTRY.counter(
+    "mistralqna_tokens_total", "Tokens reported by the Mistral API, by endpoint and kind"
+)
+REQUESTS = REGISTRY.counter(
+    "mistralqna_api_requests_total", "Mistral API requests, by endpoint"
+)
+EMBEDDINGS_SAVED = REGISTRY.counter(
+    "mistralqna_dedup_embeddings_saved_total", "Chunk embeddings skipped by boilerplate and duplicate removal"
+)
+
+
+class _Span:
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        STAGE_SECONDS.observe(time.perf_counter() - self.started, stage=self.stage)
+        return False
+
+
+def span(stage):
+    """Time a pipeline stage into ``mistralqna_stage_seconds``; no-op when disabled"""
+    return _Span(stage) if _enabled else _NOOP
+
+
+def timed_iter(stage, items):
+    """Yield from ``items``, timing the waits for each item as one ``stage`` observation.
+
+    Lets a streamed stage (PDF extraction feeding ingest) be measured
+    without materializing it first.
+    """
+    if not _enabled:
+        yield from items
+        return
+    waited = 0.0
+    iterator = iter(items)
+    while True:
+        started = time.perf_counter()
+        item = next(iterator, _DONE)
+        waited += time.perf_counter() - started
+        if item is _DONE:
+            break
+        yield item
+    STAGE_SECONDS.observe(waited, stage=stage)
+
+
+@contextmanager
+def recorded():
+    """Collect metrics inside the block, enabled or not, and yield their increments.
+
+    For worker processes, whose registry is never served: the yielded dict
+    is filled in on exit and can be returned to the parent for ``merge``.
+    """
+    global _enabled
+    was_enabled = _enabled
+    changes = {}
+    before = REGISTRY.snapshot()
+    _enabled = True
+    try:
+        yield changes
+    finally:
+        _enabled = was_enabled
+        changes.update(REGISTRY.changes_since(before))
+
+
+def merge(changes):
+    """Add a worker's increments (from ``recorded``) to this process's registry, when enabled"""
+    if _enabled and changes:
+        REGISTRY.merge(changes)
+
+
+def record_usage(endpoint, usage):
+    """Count a response's prompt/completion tokens (``usage`` may be None)"""
+    if not _enabled:
+        return
+    REQUESTS.inc(endpoint=endpoint)
+    if usage is None:
+        return
+    for kind in ("prompt", "completion"):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if isinstance(tokens, int):
+            TOKENS.inc(tokens, endpoint=endpoint, kind=kind)
+
+
+def record_dedup(stats):
+    """Count the embeddings a document's deduplication saved (``stats`` may be None)"""
+    if _enabled and stats is not None:
+        EMBEDDINGS_SAVED.inc(stats.embeddings_saved)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port, host="0.0.0.0"):
+    """Serve ``/metrics`` from a daemon thread; returns the server"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
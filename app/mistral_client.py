@@ -1,22 +1,103 @@
-from mistralai import Mistral
-from app.config import CHAT_MODEL, EMBED_MODEL
+import time
+
+from app import metrics
+from app.batching import BatchEmbedder
+from app.config import CHAT_MAX_TOKENS, CHAT_MODEL, EMBED_MODEL, MISTRAL_SERVER_URL
+from app.lazy import lazy_import
+
+mistralai = lazy_import("mistralai")
+
+
+def Mistral(**kwargs):
+    """SDK client; the SDK takes most of a second to import, so it loads on first use"""
+    return mistralai.Mistral(**kwargs)
+
+
+class ChatStream:
+    """Iterable of answer text deltas that records first-token and total latency"""
+
+    def __init__(self, events, started):
+        self._events = events
+        self._started = started
+        self.first_token_latency = None
+        self.total_latency = None
+        self.text = ""
+        self.usage = None
+
+    def __iter__(self):
+        for event in self._events:
+            # The final chunk carries the token usage for the whole response
+            self.usage = getattr(event.data, "usage", None) or self.usage
+            delta = event.data.choices[0].delta.content
+            if not isinstance(delta, str) or not delta:
+                continue
+            if self.first_token_latency is None:
+                self.first_token_latency = time.perf_counter() - self._started
+            self.text += delta
+            yield delta
+        self.total_latency = time.perf_counter() - self._started
+        if self.first_token_latency is None:
+            self.first_token_latency = self.total_latency
+        metrics.STAGE_SECONDS.observe(self.first_token_latency, stage="chat_first_token")
+        metrics.record_usage("chat", self.usage)
+
+    def latency(self):
+        return {
+            "first_token": self.first_token_latency,
+            "total": self.total_latency,
+        }
+
 
 class MistralClient:
-    def __init__(self, api_key):
-        self.client = Mistral(api_key=api_key)
+    def __init__(self, api_key, cache=None, server_url=MISTRAL_SERVER_URL):
+        self.client = Mistral(api_key=api_key, server_url=server_url)
+        self.cache = cache
+        self.batcher = BatchEmbedder(self._embed_batch)
 
     def embed(self, texts):
+        if self.cache is None:
+            return self._embed(texts)
+
+        embeddings = self.cache.get_many(texts)
+        missing = list(dict.fromkeys(
+            text for text, embedding in zip(texts, embeddings) if embedding is None
+        ))
+        if missing:
+            fresh = dict(zip(missing, self._embed(missing)))
+            self.cache.put_many(list(fresh), list(fresh.values()))
+            embeddings = [
+                fresh[text] if embedding is None else embedding
+                for text, embedding in zip(texts, embeddings)
+            ]
+        return embeddings
+
+    def _embed(self, texts):
+        return self.batcher.embed(texts)
+
+    def _embed_batch(self, texts):
         response = self.client.embeddings.create(
             model=EMBED_MODEL,
             inputs=texts
         )
+        metrics.record_usage("embeddings", getattr(response, "usage", None))
         return [e.embedding for e in response.data]
 
-    def chat(self, prompt):
+    def chat(self, prompt, max_tokens=CHAT_MAX_TOKENS):
         response = self.client.chat.complete(
             model=CHAT_MODEL,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.2,
-            max_tokens=500
+            max_tokens=max_tokens
         )
+        metrics.record_usage("chat", getattr(response, "usage", None))
         return response.choices[0].message.content
+
+    def chat_stream(self, prompt, max_tokens=CHAT_MAX_TOKENS):
+        started = time.perf_counter()
+        events = self.client.chat.stream(
+            model=CHAT_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.2,
+            max_tokens=max_tokens
+        )
+        return ChatStream(events, started)
@@ -0,0 +1,84 @@
+import io
+import logging
+import multiprocessing
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from app.config import PDF_PAGES_PER_TASK, PDF_PARALLEL_MIN_PAGES, PDF_SLOW_PAGE_SECONDS
+from app.lazy import lazy_import
+
+pypdf = lazy_import("pypdf")
+
+logger = logging.getLogger(__name__)
+
+PageText = namedtuple("PageText", ["number", "text", "seconds"])
+
+_worker_reader = None
+
+
+def pdf_bytes(file):
+    """Raw bytes of a path, bytes object or file-like (e.g. Streamlit upload)"""
+    if isinstance(file, (bytes, bytearray)):
+        return bytes(file)
+    if isinstance(file, str):
+        with open(file, "rb") as f:
+            return f.read()
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    file.seek(0)
+    return file.read()
+
+
+def _extract(reader, number):
+    started = time.perf_counter()
+    text = reader.pages[number].extract_text() or ""
+    seconds = time.perf_counter() - started
+    if seconds > PDF_SLOW_PAGE_SECONDS:
+        logger.warning("Slow PDF page %d: %.2fs to extract", number + 1, seconds)
+    return PageText(number, text, seconds)
+
+
+def _init_worker(data):
+    global _worker_reader
+    _worker_reader = pypdf.PdfReader(io.BytesIO(data))
+
+
+def _extract_range(start, end):
+    return [_extract(_worker_reader, number) for number in range(start, end)]
+
+
+def iter_pages(file, workers=0, pages_per_task=PDF_PAGES_PER_TASK):
+    """Yield a ``PageText`` per page, in page order, as pages are decoded.
+
+    With ``workers > 1`` and at least ``PDF_PARALLEL_MIN_PAGES`` pages, page
+    ranges are extracted in a process pool. Only ``2 * workers`` ranges are
+    in flight at once, so memory stays bounded by the consumer's pace.
+    """
+    data = pdf_bytes(file)
+    reader = pypdf.PdfReader(io.BytesIO(data))
+    n_pages = len(reader.pages)
+    if workers <= 1 or n_pages < PDF_PARALLEL_MIN_PAGES:
+        for number in range(n_pages):
+            yield _extract(reader, number)
+        return
+
+    ranges = [
+        (start, min(start + pages_per_task, n_pages))
+        for start in range(0, n_pages, pages_per_task)
+    ]
+    # "spawn" keeps workers independent of the threads in the web process
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(data,)
+    ) as pool:
+        pending = deque()
+        for start, end in ranges:
+            pending.append(pool.submit(_extract_range, start, end))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
@@ -0,0 +1,37 @@
+def format_conversation(messages):
+    """Render chat messages as 'User: ...' / 'Assistant: ...' lines"""
+    conversation_context = ""
+    for msg in messages:
+        if msg['role'] == 'user':
+            conversation_context += f"User: {msg['content']}\n"
+        elif msg['role'] == 'assistant':
+            conversation_context += f"Assistant: {msg['content']}\n"
+    return conversation_context
+
+
+def build_prompt(question, context, conversation_context=""):
+    """Grounded answering prompt over the retrieved context chunks"""
+    return f"""You are a helpful assistant answering questions about a document. 
+                    Use ONLY information from the provided context. If the answer is not in the context, say you don't know. Always give answers in paragraph form.
+
+                    Previous conversation context (for reference only):
+                    {conversation_context}
+
+                    Current context from document:
+                    {chr(10).join(context)}
+
+                    Question: {question}
+
+                    Answer based only on the document context above:"""
+
+
+def build_summary_prompt(summary, conversation):
+    """Prompt that folds older conversation turns into the running summary"""
+    return f"""Update the running summary of a conversation about a document.
+Keep facts, names and numbers the user may refer back to. Reply with the summary only, in at most 120 words.
+
+Current summary:
+{summary or "(none)"}
+
+New conversation turns:
+{conversation}"""
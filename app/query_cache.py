@@ -0,0 +1,56 @@
+import threading
+from collections import OrderedDict
+
+from app.config import QUERY_CACHE_MAX_ENTRIES
+
+
+def normalize_question(question):
+    """Case- and whitespace-insensitive form of a question, minus end punctuation"""
+    return " ".join(question.casefold().split()).rstrip("?!. ")
+
+
+class QueryEmbeddingCache:
+    """In-process LRU of normalized question text -> embedding vector"""
+
+    def __init__(self, max_entries=QUERY_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, question):
+        key = normalize_question(question)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, question, embedding):
+        key = normalize_question(question)
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def embed(self, questions, embed_fn):
+        """Embeddings for ``questions``, calling ``embed_fn`` once for the misses"""
+        embeddings = [self.get(question) for question in questions]
+        missing = [q for q, embedding in zip(questions, embeddings) if embedding is None]
+        if missing:
+            fresh = dict(zip(missing, embed_fn(missing)))
+            for question, embedding in fresh.items():
+                self.put(question, embedding)
+            embeddings = [
+                fresh[q] if embedding is None else embedding
+                for q, embedding in zip(questions, embeddings)
+            ]
+        return embeddings
@@ -1,21 +1,23 @@
-import numpy as np
-import faiss
-from app.config import CHUNK_SIZE, CHUNK_OVERLAP, TOP_K
+from app.config import TOP_K, INDEX_BACKEND, INDEX_RERANK, VECTOR_STORAGE
+from app.lazy import lazy_import
+from app.chunks import chunk_offsets
+from app.indexes import RerankedIndex, choose_backend, create_index
+
+np = lazy_import("numpy")
 
 def chunk_text(text):
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + CHUNK_SIZE
-        chunks.append(text[start:end])
-        start += CHUNK_SIZE - CHUNK_OVERLAP
-    return chunks
+    starts, ends = chunk_offsets(len(text))
+    return [text[start:end] for start, end in zip(starts, ends)]
 
 
-def build_index(embeddings):
+def build_index(embeddings, backend=INDEX_BACKEND, storage=VECTOR_STORAGE, rerank=INDEX_RERANK):
     dim = len(embeddings[0])
-    index = faiss.IndexFlatL2(dim)
-    index.add(np.array(embeddings).astype("float32"))
+    vectors = np.array(embeddings).astype("float32")
+    if backend == "auto":
+        backend = choose_backend(len(vectors), dim, storage=storage)
+    index = create_index(backend, vectors, storage)
+    if rerank and (storage != "float32" or backend == "ivf_pq"):
+        index = RerankedIndex(index, vectors)
     return index
 
 
@@ -0,0 +1,123 @@
+import threading
+import weakref
+from collections import OrderedDict
+
+from app.config import DOCUMENT_REGISTRY_MAX_MB
+from app.indexes import index_nbytes
+
+
+class DocumentHandle:
+    """A session's reference to a shared document; call ``release`` when done.
+
+    The chunks and index are shared with every other holder and must be
+    treated as read-only. A handle that is garbage collected without being
+    released (e.g. its session expired) releases itself.
+    """
+
+    def __init__(self, registry, doc_hash, chunks, index):
+        self.doc_hash = doc_hash
+        self.chunks = chunks
+        self.index = index
+        self._release = weakref.finalize(self, registry._release, doc_hash)
+
+    @property
+    def released(self):
+        return not self._release.alive
+
+    def release(self):
+        self._release()
+
+
+class _Entry:
+    __slots__ = ("chunks", "index", "nbytes", "refs")
+
+    def __init__(self, chunks, index):
+        self.chunks = chunks
+        self.index = index
+        self.nbytes = chunks.nbytes + index_nbytes(index)
+        self.refs = 0
+
+
+class DocumentRegistry:
+    """Process-wide cache of loaded documents keyed by content hash.
+
+    ``acquire`` hands out reference-counted handles, loading a document at
+    most once however many sessions ask for it concurrently. Documents no
+    session holds stay cached in LRU order while the total size is within
+    ``max_bytes`` and are dropped oldest-first beyond it; documents in use
+    are never evicted.
+    """
+
+    def __init__(self, max_bytes=DOCUMENT_REGISTRY_MAX_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, doc_hash):
+        return doc_hash in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def acquire(self, doc_hash, load):
+        """Handle for ``doc_hash``, calling ``load() -> (chunks, index)`` on a miss"""
+        while True:
+            with self._lock:
+                entry = self._entries.get(doc_hash)
+                if entry is not None:
+                    self.hits += 1
+                    return self._handle(doc_hash, entry)
+                loading = self._loading.get(doc_hash)
+                if loading is None:
+                    loading = self._loading[doc_hash] = threading.Event()
+                    break
+            # Another session is loading this document; wait and re-check
+            loading.wait()
+
+        try:
+            chunks, index = load()
+            entry = _Entry(chunks, index)
+            with self._lock:
+                self.misses += 1
+                self._entries[doc_hash] = entry
+                handle = self._handle(doc_hash, entry)
+                self._evict()
+            return handle
+        finally:
+            with self._lock:
+                self._loading.pop(doc_hash).set()
+
+    def _handle(self, doc_hash, entry):
+        entry.refs += 1
+        self._entries.move_to_end(doc_hash)
+        return DocumentHandle(self, doc_hash, entry.chunks, entry.index)
+
+    def _release(self, doc_hash):
+        with self._lock:
+            entry = self._entries.get(doc_hash)
+            if entry is not None:
+                entry.refs -= 1
+                self._evict()
+
+    def _evict(self):
+        total = sum(entry.nbytes for entry in self._entries.values())
+        for doc_hash in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            entry = self._entries[doc_hash]
+            if entry.refs == 0:
+                total -= entry.nbytes
+                del self._entries[doc_hash]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "documents": len(self._entries),
+                "in_use": sum(1 for entry in self._entries.values() if entry.refs),
+                "bytes": sum(entry.nbytes for entry in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
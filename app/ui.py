@@ -1,28 +1,38 @@
 import streamlit as st
-from pypdf import PdfReader
+from app.config import PDF_WORKERS
+from app.pdf import iter_pages
 
-def read_pdf(file):
-    reader = PdfReader(file)
-    return "".join(page.extract_text() or "" for page in reader.pages)
+def read_pdf(file, workers=PDF_WORKERS):
+    return "".join(page.text for page in iter_pages(file, workers))
 
 
-def render():
+def render(uploader_key=None):
     st.title("📄 Mistral Document Assistant")
     st.caption("Upload a document and ask grounded questions using Mistral AI")
 
     uploaded = st.file_uploader(
-        "Upload a PDF document",
+        "Upload PDF documents",
         type=["pdf"],
-        help="Upload a PDF to chat with its content"
+        accept_multiple_files=True,
+        key=uploader_key,
+        help="Upload one or more PDFs to chat with their content"
     )
 
     return uploaded   
 
-def show_sources(chunks):
+def show_sources(chunks, titles=None):
     with st.expander("📚 Retrieved context (sources)"):
         for i, chunk in enumerate(chunks):
-            st.markdown(f"**Chunk {i + 1}**")
-            st.write(chunk)
+            if isinstance(chunk, str):
+                st.markdown(f"**Chunk {i + 1}**")
+                st.write(chunk)
+            else:
+                title = (titles or {}).get(chunk.doc_id, chunk.doc_id[:12])
+                page = f" · page {chunk.page + 1}" if chunk.page is not None else ""
+                if chunk.also_pages:
+                    page += " (also on page " + ", ".join(str(p + 1) for p in chunk.also_pages) + ")"
+                st.markdown(f"**{title} · chunk {chunk.chunk_id + 1}{page}**")
+                st.write(chunk.text)
             st.divider()
 
 def show_status(message):
@@ -0,0 +1,113 @@
+# benchmarks/bench_index_backends.py
+"""Recall-vs-latency comparison of the index backends in app/indexes.py.
+
+Every backend is measured against the exact flat index on the same
+synthetic clustered corpus (mistral-embed sized vectors by default).
+
+    python -m benchmarks.bench_index_backends --vectors 50000 --json
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.config import TOP_K
+from app.indexes import BACKENDS, create_index, estimate_memory, set_search_params
+
+NPROBE_SWEEP = (1, 4, 16, 64)
+EF_SEARCH_SWEEP = (16, 64, 256)
+
+
+def synthetic_corpus(n, dim, n_queries, clusters=256, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim)).astype("float32")
+    vectors = centres[rng.integers(0, clusters, n)]
+    vectors += 0.3 * rng.normal(size=(n, dim)).astype("float32")
+    queries = centres[rng.integers(0, clusters, n_queries)]
+    queries += 0.3 * rng.normal(size=(n_queries, dim)).astype("float32")
+    return vectors, queries
+
+
+def recall_at_k(ids, truth):
+    k = truth.shape[1]
+    hits = sum(len(set(row[:k]) & set(expected)) for row, expected in zip(ids, truth))
+    return hits / truth.size
+
+
+def measure(index, queries, truth, k):
+    started = time.perf_counter()
+    for query in queries:
+        index.search(query[None, :], k)
+    per_query = (time.perf_counter() - started) / len(queries)
+
+    started = time.perf_counter()
+    _, ids = index.search(queries, k)
+    batch = time.perf_counter() - started
+    return {
+        "recall": recall_at_k(ids, truth),
+        "latency_ms": per_query * 1000,
+        "batch_qps": len(queries) / batch if batch else float("inf"),
+    }
+
+
+def run(n, dim, n_queries, k):
+    vectors, queries = synthetic_corpus(n, dim, n_queries)
+    results = []
+    truth = None
+    for backend in BACKENDS:
+        started = time.perf_counter()
+        index = create_index(backend, vectors)
+        build_seconds = time.perf_counter() - started
+        if truth is None:
+            _, truth = index.search(queries, k)
+
+        if hasattr(index, "nprobe"):
+            sweep = [("nprobe", value) for value in NPROBE_SWEEP]
+        elif hasattr(index, "hnsw"):
+            sweep = [("efSearch", value) for value in EF_SEARCH_SWEEP]
+        else:
+            sweep = [(None, None)]
+
+        for param, value in sweep:
+            if param == "nprobe":
+                set_search_params(index, nprobe=value)
+            elif param == "efSearch":
+                set_search_params(index, ef_search=value)
+            row = {
+                "backend": backend,
+                "param": param,
+                "value": value,
+                "build_s": build_seconds,
+                "memory_mb": estimate_memory(backend, n, dim) / 2**20,
+            }
+            row.update(measure(index, queries, truth, k))
+            results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=TOP_K)
+    parser.add_argument("--json", action="store_true", help="emit JSON lines")
+    args = parser.parse_args()
+
+    results = run(args.vectors, args.dim, args.queries, args.k)
+    if args.json:
+        for row in results:
+            print(json.dumps(row))
+        return
+
+    print(f"{args.vectors} vectors × {args.dim} dims, {args.queries} queries, recall@{args.k}")
+    print(f"{'backend':<10}{'param':<14}{'recall':>8}{'ms/query':>10}{'batch qps':>11}{'build s':>9}{'MB':>9}")
+    for row in results:
+        param = f"{row['param']}={row['value']}" if row["param"] else "-"
+        print(f"{row['backend']:<10}{param:<14}{row['recall']:>8.3f}{row['latency_ms']:>10.3f}"
+              f"{row['batch_qps']:>11.0f}{row['build_s']:>9.2f}{row['memory_mb']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# benchmarks/bench_pipeline.py
+"""End-to-end ingest and QA benchmark against the local stub Mistral API.
+
+For each document size a synthetic PDF is generated and pushed through
+extraction, chunking, embedding, index build, search and streamed QA,
+and once more through the overlapped ingestion pipeline for comparison.
+Results (seconds, throughput, latency percentiles, peak RSS) are printed
+as one JSON object per size so runs can be diffed across commits.
+
+    python -m benchmarks.bench_pipeline --pages 10 100 500 --output bench.jsonl
+"""
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from app.batching import TokenBucket
+from app.chunks import ChunkStore
+from app.config import PDF_WORKERS
+from app.corpus import Corpus
+from app.ingest import ingest
+from app.mistral_client import MistralClient
+from app.pdf import iter_pages
+from app.prompts import build_prompt
+from app.rag import build_index
+from benchmarks.stub_server import StubConfig, start_stub_server
+from benchmarks.synthetic_pdf import make_pdf
+
+QUESTIONS = [
+    "What does the security incident response section require?",
+    "Summarize the training schedule",
+    "Who is responsible for the budget review?",
+    "How are customer service requests handled?",
+]
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentiles(values):
+    values = np.asarray(values, dtype="float64")
+    return {"p50": float(np.percentile(values, 50)), "p95": float(np.percentile(values, 95))}
+
+
+class Timer:
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        yield
+        self.stages[name] = time.perf_counter() - started
+
+
+def run_size(pages, client, workers, n_queries, n_questions):
+    data = make_pdf(pages)
+    timer = Timer()
+
+    with timer.stage("extract_s"):
+        page_texts = list(iter_pages(data, workers))
+    with timer.stage("chunk_s"):
+        chunks = ChunkStore.from_pages(page.text for page in page_texts)
+    with timer.stage("embed_s"):
+        embeddings = client.embed(chunks)
+    with timer.stage("index_build_s"):
+        index = build_index(embeddings)
+    # The same work as one overlapped pipeline; approaches the slowest stage
+    with timer.stage("ingest_pipelined_s"):
+        ingest((page.text for page in iter_pages(data, workers)), client.embed)
+
+    rng = np.random.default_rng(0)
+    queries = np.asarray(embeddings, dtype="float32")[rng.integers(0, len(chunks), n_queries)]
+    corpus = Corpus()
+    corpus.add_index("bench", chunks, index)
+    with timer.stage("search_batch_s"):
+        corpus.retrieve_batch(queries)
+    with timer.stage("search_loop_s"):
+        for query in queries:
+            corpus.retrieve(query)
+
+    first_token, total = [], []
+    for i in range(n_questions):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        started = time.perf_counter()
+        context = [hit.text for hit in corpus.retrieve(client.embed([question])[0])]
+        chat_started = time.perf_counter()
+        stream = client.chat_stream(build_prompt(question, context))
+        for _ in stream:
+            pass
+        first_token.append(chat_started - started + stream.first_token_latency)
+        total.append(time.perf_counter() - started)
+
+    return {
+        "pages": pages,
+        "chunks": len(chunks),
+        "text_chars": len(chunks.text),
+        **timer.stages,
+        "slowest_page_s": max(page.seconds for page in page_texts),
+        "chunks_per_s": len(chunks) / timer.stages["embed_s"] if timer.stages["embed_s"] else None,
+        "search_qps": n_queries / timer.stages["search_batch_s"] if timer.stages["search_batch_s"] else None,
+        "qa_first_token_s": percentiles(first_token),
+        "qa_total_s": percentiles(total),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ingest and QA pipeline offline.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--workers", type=int, default=PDF_WORKERS, help="PDF extraction processes")
+    parser.add_argument("--queries", type=int, default=256, help="search queries per size")
+    parser.add_argument("--questions", type=int, default=8, help="end-to-end questions per size")
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--chat-latency", type=float, default=0.2)
+    parser.add_argument("--token-latency", type=float, default=0.005)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--embed-rps", type=float, default=None,
+                        help="override EMBED_REQUESTS_PER_SECOND for the run")
+    parser.add_argument("--output", help="append JSON lines here instead of stdout")
+    args = parser.parse_args()
+
+    stub = StubConfig(args.embed_latency, args.chat_latency, args.token_latency, args.jitter)
+    server, url = start_stub_server(stub)
+    client = MistralClient("stub-key", server_url=url)
+    if args.embed_rps:
+        client.batcher.rate_limiter = TokenBucket(args.embed_rps)
+
+    meta = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "stub": {k: getattr(stub, k) for k in ("embed_latency", "chat_latency", "token_latency", "jitter")},
+    }
+    out = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for pages in args.pages:
+            result = dict(meta, **run_size(pages, client, args.workers, args.queries, args.questions))
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+    finally:
+        server.shutdown()
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
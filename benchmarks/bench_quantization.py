@@ -0,0 +1,82 @@
+# benchmarks/bench_quantization.py
+"""Recall@TOP_K and memory of each vector storage mode, with and without re-ranking.
+
+Every mode is compared with exact float32 search over the same vectors:
+the synthetic clustered corpus from bench_index_backends by default, or
+real embeddings saved with ``np.save`` (the last ``--queries`` rows are
+held out as queries).
+
+    python -m benchmarks.bench_quantization --vectors 20000
+    python -m benchmarks.bench_quantization --embeddings embeddings.npy --backend hnsw
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.config import TOP_K
+from app.indexes import BACKENDS, STORAGES, RerankedIndex, create_index, index_nbytes
+from benchmarks.bench_index_backends import recall_at_k, synthetic_corpus
+
+
+def run(vectors, queries, k, backend="flat", rerank_factors=(4, 16)):
+    truth = create_index("flat", vectors).search(queries, k)[1]
+    results = []
+    for storage in STORAGES:
+        started = time.perf_counter()
+        index = create_index(backend, vectors, storage)
+        build_seconds = time.perf_counter() - started
+        for factor in (0,) + tuple(rerank_factors if storage != "float32" else ()):
+            searched = RerankedIndex(index, vectors, factor) if factor else index
+            started = time.perf_counter()
+            _, ids = searched.search(queries, k)
+            elapsed = time.perf_counter() - started
+            results.append({
+                "backend": backend,
+                "storage": storage,
+                "rerank_factor": factor,
+                "recall": recall_at_k(ids, truth),
+                "memory_mb": index_nbytes(index) / 2**20,
+                "ms_per_query": elapsed / len(queries) * 1000,
+                "build_s": build_seconds,
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=TOP_K)
+    parser.add_argument("--backend", choices=BACKENDS, default="flat")
+    parser.add_argument("--rerank-factors", type=int, nargs="*", default=[4, 16],
+                        help="shortlist sizes (x k) to re-rank exactly")
+    parser.add_argument("--embeddings", help=".npy file of real embeddings to measure instead")
+    parser.add_argument("--json", action="store_true", help="emit JSON lines")
+    args = parser.parse_args()
+
+    if args.embeddings:
+        data = np.load(args.embeddings).astype("float32")
+        vectors, queries = data[:-args.queries], data[-args.queries:]
+    else:
+        vectors, queries = synthetic_corpus(args.vectors, args.dim, args.queries)
+
+    results = run(vectors, queries, args.k, args.backend, args.rerank_factors)
+    if args.json:
+        for row in results:
+            print(json.dumps(row))
+        return
+
+    print(f"{len(vectors)} vectors × {vectors.shape[1]} dims, {len(queries)} queries, "
+          f"recall@{args.k} vs exact float32 ({args.backend})")
+    print(f"{'storage':<9}{'rerank':<8}{'recall':>8}{'MB':>9}{'ms/query':>10}{'build s':>9}")
+    for row in results:
+        rerank = f"{row['rerank_factor']}×k" if row["rerank_factor"] else "-"
+        print(f"{row['storage']:<9}{rerank:<8}{row['recall']:>8.3f}"
+              f"{row['memory_mb']:>9.1f}{row['ms_per_query']:>10.3f}{row['build_s']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
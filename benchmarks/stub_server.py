@@ -0,0 +1,172 @@
+# benchmarks/stub_server.py
+"""Local stand-in for the Mistral embeddings and chat endpoints.
+
+Responses follow the public API schema closely enough for the official
+SDK to parse them. Every request sleeps for a configurable latency plus
+uniform jitter, so benchmarks run offline with realistic timing.
+
+    python -m benchmarks.stub_server --port 8765 --chat-latency 0.3
+    MISTRAL_SERVER_URL=http://127.0.0.1:8765 MISTRAL_API_KEY=stub streamlit run main.py
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+DEFAULT_DIM = 1024
+STUB_ANSWER = (
+    "According to the retrieved context, the document describes the requested "
+    "topic in detail and the relevant section answers the question directly."
+)
+
+
+def stub_embedding(text, dim=DEFAULT_DIM):
+    """Deterministic unit vector derived from the text's hash"""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim).astype("float32")
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class StubConfig:
+    def __init__(self, embed_latency=0.05, chat_latency=0.2, token_latency=0.01,
+                 jitter=0.02, dim=DEFAULT_DIM, answer=STUB_ANSWER):
+        self.embed_latency = embed_latency
+        self.chat_latency = chat_latency
+        self.token_latency = token_latency
+        self.jitter = jitter
+        self.dim = dim
+        self.answer = answer
+        self.requests = {"embeddings": 0, "chat": 0}
+
+    def delay(self, base):
+        time.sleep(max(0.0, base + random.uniform(-self.jitter, self.jitter)))
+
+
+def _usage(prompt_tokens, completion_tokens=0):
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = StubConfig()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.endswith("/embeddings"):
+            self.config.requests["embeddings"] += 1
+            self._embeddings(body)
+        elif self.path.endswith("/chat/completions"):
+            self.config.requests["chat"] += 1
+            self._chat(body)
+        else:
+            self._send_json({"message": f"Unknown path {self.path}"}, status=404)
+
+    def _embeddings(self, body):
+        inputs = body.get("inputs") or body.get("input") or []
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        self.config.delay(self.config.embed_latency)
+        self._send_json({
+            "id": uuid.uuid4().hex,
+            "object": "list",
+            "model": body.get("model", "mistral-embed"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": stub_embedding(text, self.config.dim)}
+                for i, text in enumerate(inputs)
+            ],
+            "usage": _usage(sum(len(text) // 4 for text in inputs)),
+        })
+
+    def _chat(self, body):
+        prompt_tokens = sum(len(str(m.get("content", ""))) // 4 for m in body.get("messages", []))
+        words = self.config.answer.split(" ")
+        words = words[:body.get("max_tokens") or len(words)]
+        self.config.delay(self.config.chat_latency)
+        base = {
+            "id": uuid.uuid4().hex,
+            "model": body.get("model", "mistral-small-latest"),
+            "created": int(time.time()),
+        }
+        if not body.get("stream"):
+            time.sleep(self.config.token_latency * len(words))
+            self._send_json(dict(base, object="chat.completion", choices=[{
+                "index": 0,
+                "message": {"role": "assistant", "content": " ".join(words)},
+                "finish_reason": "stop",
+            }], usage=_usage(prompt_tokens, len(words))))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for i, word in enumerate(words):
+            last = i == len(words) - 1
+            chunk = dict(base, object="chat.completion.chunk", choices=[{
+                "index": 0,
+                "delta": {"role": "assistant", "content": word if i == 0 else " " + word},
+                "finish_reason": "stop" if last else None,
+            }])
+            if last:
+                chunk["usage"] = _usage(prompt_tokens, len(words))
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(self.config.token_latency)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+    def _send_json(self, payload, status=200):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_stub_server(config=None, host="127.0.0.1", port=0):
+    """Start the stub in a daemon thread; returns ``(server, base_url)``"""
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"config": config or StubConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in Mistral API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--chat-latency", type=float, default=0.2)
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM)
+    args = parser.parse_args()
+
+    config = StubConfig(args.embed_latency, args.chat_latency, args.token_latency,
+                        args.jitter, args.dim)
+    server, url = start_stub_server(config, args.host, args.port)
+    print(f"Stub Mistral API listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# benchmarks/synthetic_pdf.py
+"""Synthetic multi-page PDFs for benchmarks (requires reportlab from requirements-dev.txt).
+
+Pages carry a running header, numbered sections of pseudo-random prose
+and a page-number footer, like the manuals the app is used on.
+"""
+import random
+from io import BytesIO
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+VOCABULARY = (
+    "system process document policy review section data model request "
+    "employee report customer service quality safety training schedule "
+    "budget project result analysis method network storage account access "
+    "device support update release version security incident response team"
+).split()
+
+
+def sentence(rng, words=12):
+    text = " ".join(rng.choice(VOCABULARY) for _ in range(words))
+    return text.capitalize() + "."
+
+
+def make_pdf(pages, lines_per_page=45, seed=0, title="Synthetic Handbook"):
+    """Return the bytes of a ``pages``-page PDF with deterministic content"""
+    rng = random.Random(seed)
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    for page in range(pages):
+        pdf.setFont("Helvetica", 8)
+        pdf.drawString(50, height - 30, f"{title} - Internal Use Only")
+        pdf.setFont("Helvetica", 10)
+        y = height - 60
+        pdf.drawString(50, y, f"Section {page + 1}.{rng.randint(1, 9)}")
+        for _ in range(lines_per_page):
+            y -= 16
+            pdf.drawString(50, y, sentence(rng))
+        pdf.setFont("Helvetica", 8)
+        pdf.drawString(width / 2, 25, f"Page {page + 1} of {pages}")
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write a synthetic PDF.")
+    parser.add_argument("output")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    with open(args.output, "wb") as f:
+        f.write(make_pdf(args.pages, seed=args.seed))
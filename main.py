@@ -1,117 +1,439 @@
-from app.ui import render, read_pdf, show_sources
-from app.config import MISTRAL_API_KEY
+from app.config import IMPORT_PROFILE
+from app import lazy
+
+# Time every import below (and the deferred ones) when IMPORT_PROFILE is set
+if IMPORT_PROFILE:
+    lazy.profile_imports()
+
+from app.ui import render, show_sources
+from app.config import MISTRAL_API_KEY, EMBED_CACHE_DIR, EMBED_CACHE_MAX_ENTRIES, DOCUMENT_STORE_DIR, PDF_WORKERS, SUGGESTED_QUESTIONS, METRICS_PORT, INGEST_WORKERS, TOP_K_MAX
+from app import metrics
+from app.answer_cache import AnswerCache, scope_key
+from app.batching import estimate_tokens
+from app.budget import FULL, SHED, LatencyBudget, describe
+from app.context import pack_context
+from app.corpus import Corpus
+from app.document_store import DocumentStore, document_hash
+from app.embedding_cache import EmbeddingCache
+from app.embeddings import LOCAL, document_embedding, query_embed_fn
+from app.ingest import ingest
+from app.jobs import IngestJobs
+from app.memory import ConversationMemory
 from app.mistral_client import MistralClient
-from app.rag import chunk_text, build_index, retrieve
+from app.pdf import iter_pages
+from app.prompts import build_prompt
+from app.query_cache import QueryEmbeddingCache
+from app.registry import DocumentRegistry
 
 import streamlit as st
+import time
 import uuid
 from datetime import datetime
 
-if not MISTRAL_API_KEY:
-    raise RuntimeError("MISTRAL_API_KEY not set")
+@st.cache_resource(show_spinner=False)
+def get_client():
+    """Mistral client shared by every session, built on first use (not on first paint)"""
+    if not MISTRAL_API_KEY:
+        raise RuntimeError("MISTRAL_API_KEY not set")
+    return MistralClient(
+        MISTRAL_API_KEY,
+        cache=EmbeddingCache(EMBED_CACHE_DIR, EMBED_CACHE_MAX_ENTRIES)
+    )
+
+def summarize(prompt):
+    """Conversation summarizer for ConversationMemory"""
+    return get_client().chat(prompt)
+
+store = DocumentStore(DOCUMENT_STORE_DIR)
+
+@st.cache_resource(show_spinner=False)
+def get_answer_cache():
+    """Answer cache shared by every session in this server process"""
+    return AnswerCache()
+
+answer_cache = get_answer_cache()
+
+@st.cache_resource(show_spinner=False)
+def get_query_cache():
+    """Question embedding LRU shared by every session in this server process"""
+    return QueryEmbeddingCache()
 
-client = MistralClient(MISTRAL_API_KEY)
+query_cache = get_query_cache()
 
 @st.cache_resource(show_spinner=False)
-def process_document(uploaded_file):
-    """Process document once and cache results"""
+def get_registry():
+    """Loaded documents shared by every session, refcounted and size-bounded"""
+    return DocumentRegistry()
+
+registry = get_registry()
+
+@st.cache_resource(show_spinner=False)
+def get_budget():
+    """Latency budget shared by every session, so it sees the whole server's load"""
+    return LatencyBudget()
+
+budget = get_budget()
+
+@st.cache_resource(show_spinner=False)
+def get_jobs():
+    """Background ingestion worker pool shared by every session (None = in-process)"""
+    if INGEST_WORKERS > 0:
+        return IngestJobs(DOCUMENT_STORE_DIR, INGEST_WORKERS)
+
+jobs = get_jobs()
+
+@st.cache_resource(show_spinner=False)
+def start_metrics_exporter():
+    """Serve /metrics once per server process when METRICS_PORT is set"""
+    if METRICS_PORT and metrics.enabled():
+        return metrics.start_metrics_server(METRICS_PORT)
+
+start_metrics_exporter()
+
+def process_document(uploaded_file, doc_hash):
+    """Process document once and persist results under its content hash"""
+    with metrics.span("store_load"):
+        stored = store.load(doc_hash)
+    if stored is not None:
+        return stored
+
+    bar = st.progress(0.0, text="Processing document for the first time...")
+
+    def show_progress(progress):
+        if progress.done:
+            bar.progress(1.0, text=f"Indexed {progress.chunks} sections from {progress.pages} pages")
+            return
+        bar.progress(
+            progress.embedded / max(progress.chunks, 1),
+            text=f"Read {progress.pages} pages · embedded {progress.embedded} of {progress.chunks} sections so far"
+        )
+
     with st.spinner("Processing document for the first time..."):
-        text = read_pdf(uploaded_file)
-        chunks = chunk_text(text)
-        embeddings = client.embed(chunks)
-        index = build_index(embeddings)
-    return chunks, index
+        # Extraction, chunking, embedding and indexing run as one pipeline;
+        # ingest times each of those stages itself
+        with metrics.span("ingest"):
+            pages = (page.text for page in iter_pages(uploaded_file, PDF_WORKERS))
+            embed_fn, embedding, fallback = document_embedding(get_client())
+            chunks, index = ingest(pages, embed_fn, show_progress, embedding=embedding, fallback=fallback)
+        metrics.record_dedup(chunks.dedup)
+        with metrics.span("store_save"):
+            store.save(doc_hash, chunks, index)
+    # Serve the memory-mapped copy so shared memory stays page-cache backed
+    return store.load(doc_hash)
 
 # Initialize session state for chat
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
 if 'document_processed' not in st.session_state:
     st.session_state.document_processed = False
-if 'current_document' not in st.session_state:
-    st.session_state.current_document = None
+if 'corpus' not in st.session_state:
+    st.session_state.corpus = Corpus()
+if 'documents' not in st.session_state:
+    st.session_state.documents = {}  # document hash -> file name
+if 'uploads' not in st.session_state:
+    st.session_state.uploads = {}  # uploader file id -> document hash
+if 'uploader_version' not in st.session_state:
+    st.session_state.uploader_version = 0
+if 'suggestion_context' not in st.session_state:
+    st.session_state.suggestion_context = {}  # suggested question -> (embedding, hits)
+if 'handles' not in st.session_state:
+    st.session_state.handles = {}  # document hash -> shared registry handle
+if 'pending' not in st.session_state:
+    st.session_state.pending = {}  # uploader file id -> background job id
+if 'upload_errors' not in st.session_state:
+    st.session_state.upload_errors = {}  # uploader file id -> message (not retried)
+if 'memory' not in st.session_state:
+    st.session_state.memory = ConversationMemory(summarize)
 
-def add_message(role, content, sources=None):
+def add_message(role, content, sources=None, latency=None):
     """Add a message to chat history"""
     st.session_state.chat_history.append({
         'id': str(uuid.uuid4()),
         'role': role,
         'content': content,
         'sources': sources or [],
+        'latency': latency,
         'timestamp': datetime.now().strftime("%H:%M")
     })
 
+def format_latency(latency):
+    """Format first-token and total answer latency for display"""
+    text = f"first token {latency['first_token']:.2f}s · total {latency['total']:.2f}s"
+    if latency.get('cached'):
+        text += " · cached"
+    plan = latency.get('budget')
+    if plan is not None and plan.level != FULL:
+        text += f" · {describe(plan)}"
+    return text
+
+def loaded_message(name, chunks):
+    """Welcome message for a loaded document, noting deduplication savings and local indexing"""
+    message = f"I've loaded the document **'{name}'**. Ask me anything about it!"
+    stats = getattr(chunks, "dedup", None)
+    if stats is not None and stats.embeddings_saved:
+        message += (
+            f"\n\n_Skipped {stats.embeddings_saved} repeated sections "
+            f"({stats.boilerplate_lines} header/footer lines, {stats.duplicate_chunks} duplicate passages)._"
+        )
+    embedding = getattr(chunks, "embedding", None)
+    if embedding is not None and embedding.backend == LOCAL and st.session_state.corpus.backend != LOCAL:
+        message += "\n\n_The embeddings API was slow or rate-limited, so this document was indexed locally._"
+    return message
+
 def clear_chat():
     """Clear chat history but keep document"""
     st.session_state.chat_history = []
+    st.session_state.memory = ConversationMemory(summarize)
 
-def answer_question(question, chunks, index):
-    """Generate answer for a question"""
-    with st.spinner("🔍 Searching document..."):
-        q_embedding = client.embed([question])[0]
-        context = retrieve(q_embedding, index, chunks)
-    
-    with st.spinner("💭 Generating answer..."):
-        # Build prompt with conversation history for context
-        conversation_context = ""
-        if st.session_state.chat_history:
-            recent_messages = st.session_state.chat_history[-4:]  # Last 4 messages for context
-            for msg in recent_messages:
-                if msg['role'] == 'user':
-                    conversation_context += f"User: {msg['content']}\n"
-                elif msg['role'] == 'assistant':
-                    conversation_context += f"Assistant: {msg['content']}\n"
-        
-        prompt = f"""You are a helpful assistant answering questions about a document. 
-                    Use ONLY information from the provided context. If the answer is not in the context, say you don't know. Always give answers in paragraph form.
+def add_document(uploaded_file):
+    """Process an uploaded file and append it to the session corpus"""
+    doc_hash = document_hash(uploaded_file.getvalue())
+    if doc_hash not in st.session_state.handles:
+        handle = registry.acquire(doc_hash, lambda: process_document(uploaded_file, doc_hash))
+        st.session_state.handles[doc_hash] = handle
+        st.session_state.corpus.add_index(doc_hash, handle.chunks, handle.index)
+    st.session_state.uploads[uploaded_file.file_id] = doc_hash
+    st.session_state.documents[doc_hash] = uploaded_file.name
+    return st.session_state.handles[doc_hash].chunks
+
+def release_documents():
+    """Give every shared document handle of this session back to the registry"""
+    for handle in st.session_state.handles.values():
+        handle.release()
+    st.session_state.handles = {}
+
+def remove_upload(file_id):
+    """Drop a file removed from the uploader, keeping shared content alive"""
+    doc_hash = st.session_state.uploads.pop(file_id)
+    if doc_hash not in st.session_state.uploads.values():
+        st.session_state.corpus.remove_document(doc_hash)
+        st.session_state.documents.pop(doc_hash, None)
+        handle = st.session_state.handles.pop(doc_hash, None)
+        if handle is not None:
+            handle.release()
+
+def collect_jobs(current_files):
+    """Load documents whose background jobs have finished; returns how many were added"""
+    added = 0
+    for file_id, job_id in list(st.session_state.pending.items()):
+        status = jobs.status(job_id)
+        if status.state in ("queued", "running"):
+            continue
+        del st.session_state.pending[file_id]
+        if status.state == "done":
+            chunks = add_document(current_files[file_id])
+            metrics.record_dedup(chunks.dedup)
+            add_message('assistant', loaded_message(status.name, chunks))
+            added += 1
+        elif status.state == "failed":
+            st.session_state.upload_errors[file_id] = f"❌ Failed to process **{status.name}**: {status.error}"
+        else:
+            st.session_state.upload_errors[file_id] = f"Processing of **{status.name}** was cancelled"
+    return added
+
+@st.fragment(run_every=1.0)
+def show_jobs():
+    """Progress of this session's background jobs, polled every second"""
+    finished = False
+    for file_id, job_id in list(st.session_state.pending.items()):
+        status = jobs.status(job_id)
+        if status.state not in ("queued", "running"):
+            finished = True
+            continue
+        col1, col2 = st.columns([5, 1])
+        with col1:
+            if status.progress is None:
+                st.progress(0.0, text=f"⏳ {status.name}: {status.state}...")
+            else:
+                pages, chunks, embedded, _ = status.progress
+                st.progress(
+                    embedded / max(chunks, 1),
+                    text=f"⚙️ {status.name}: read {pages} pages · embedded {embedded} of {chunks} sections so far"
+                )
+        with col2:
+            if st.button("Cancel", key=f"cancel_{job_id}"):
+                jobs.cancel(job_id)
+                del st.session_state.pending[file_id]
+                st.session_state.upload_errors[file_id] = f"Processing of **{status.name}** was cancelled"
+                finished = True
+    if finished:
+        st.rerun()
+
+def prepare_suggestions():
+    """Embed the suggested questions and precompute their retrieval results"""
+    corpus = st.session_state.corpus
+    if not len(corpus):
+        st.session_state.suggestion_context = {}
+        return
+    embed_fn = query_embed_fn(get_client())
+    embeddings = query_cache.embed(SUGGESTED_QUESTIONS, embed_fn)
+    # One batched search: the same fused ranking a typed question gets,
+    # including documents embedded by a local fallback
+    results = corpus.search_batch(SUGGESTED_QUESTIONS, embed_fn, embeddings, k=TOP_K_MAX)
+    st.session_state.suggestion_context = {
+        question: (embedding, hits) for question, (hits, embedding) in zip(SUGGESTED_QUESTIONS, results)
+    }
 
-                    Previous conversation context (for reference only):
-                    {conversation_context}
+def embed_question(question):
+    """Embed a question the query embedding cache does not have yet"""
+    with metrics.span("embed_query"):
+        embedding = query_embed_fn(get_client())([question])[0]
+    query_cache.put(question, embedding)
+    return embedding
 
-                    Current context from document:
-                    {chr(10).join(context)}
+def document_names():
+    """Comma-separated names of the loaded documents"""
+    return ", ".join(st.session_state.documents.values())
 
-                    Question: {question}
+def busy_answer(passages):
+    """Answer shown instead of a generated one when the server sheds load"""
+    quoted = "\n\n".join("> " + passage.text.strip().replace("\n", "\n> ") for passage in passages)
+    return (
+        "⚠️ Many questions are being answered right now, so here are the most relevant "
+        f"passages instead of a generated answer:\n\n{quoted}"
+    )
 
-                    Answer based only on the document context above:"""
-                            
-        answer = client.chat(prompt)
+def answer_question(question, corpus, placeholder):
+    """Generate answer for a question, streaming it into the placeholder"""
+    started = time.perf_counter()
+    # Counted as in flight until the answer is complete; overload sheds instead of queueing
+    with budget.request() as level:
+        with st.spinner("🔍 Searching documents..."):
+            # Suggested questions were embedded and retrieved at document load
+            q_embedding, hits = st.session_state.suggestion_context.get(question, (None, None))
+            if hits is None and level == SHED:
+                # BM25 only: no embedding call for a request that will not reach the chat model
+                hits, q_embedding = corpus.search(question, embed_question, k=TOP_K_MAX, mode="lexical")
+            elif hits is None:
+                # Keyword-style questions the BM25 tier answers confidently are
+                # never embedded; the others fuse BM25 and vector results
+                hits, q_embedding = corpus.search(question, embed_question, query_cache.get(question), k=TOP_K_MAX)
+            # Summary plus the recent turns relevant to this question, within budget
+            conversation_context = st.session_state.memory.context(q_embedding)
+            # Follow-ups depend on the conversation, so it is part of the cache scope
+            scope = scope_key(corpus.documents, conversation_context)
+            cached = None
+            if q_embedding is not None:
+                with metrics.span("answer_cache_lookup"):
+                    cached = answer_cache.lookup(scope, q_embedding)
+        
+        # Repeat (or near-duplicate) questions reuse the stored answer
+        if cached is not None:
+            placeholder.markdown(cached.answer)
+            elapsed = time.perf_counter() - started
+            st.session_state.memory.add_turn(question, cached.answer, q_embedding)
+            return cached.answer, cached.sources, {'first_token': elapsed, 'total': elapsed, 'cached': True}
+        
+        # Retrieval depth, context size and answer length for the time left
+        plan = budget.plan(
+            hits, time.perf_counter() - started, level, estimate_tokens(question + conversation_context)
+        )
+        hits = hits[:plan.k]
+        
+        # Overlapping neighbours merge into one passage within the token budget
+        passages = pack_context(hits, corpus.chunks, plan.context_tokens)
+        if plan.level == SHED:
+            answer = busy_answer(passages)
+            placeholder.markdown(answer)
+            elapsed = time.perf_counter() - started
+            return answer, hits, {'first_token': elapsed, 'total': elapsed, 'budget': plan}
+        
+        prompt = build_prompt(question, [passage.text for passage in passages], conversation_context)
+        
+        with metrics.span("chat"):
+            stream = get_client().chat_stream(prompt, plan.max_tokens)
+            for _ in stream:
+                placeholder.markdown(stream.text + "▌")
+        answer = stream.text
+        placeholder.markdown(answer)
+        completion_tokens = getattr(stream.usage, "completion_tokens", None)
+        if not isinstance(completion_tokens, int):
+            completion_tokens = estimate_tokens(answer)
+        budget.observe(stream.first_token_latency, stream.total_latency, completion_tokens)
+        # Answers cut short under load or time pressure are not served again later
+        if q_embedding is not None and plan.level == FULL:
+            answer_cache.store(scope, q_embedding, answer, hits)
+        st.session_state.memory.add_turn(question, answer, q_embedding)
     
-    return answer, context
+    return answer, hits, {**stream.latency(), 'budget': plan}
 
 def main():
     # Get UI components
-    uploaded = render()
+    uploaded_files = render(f"uploader_{st.session_state.uploader_version}")
+    if not MISTRAL_API_KEY:
+        st.error("❌ MISTRAL_API_KEY is not set. Add it to the environment or a `.env` file and restart the app.")
+        return
+    current_files = {f.file_id: f for f in uploaded_files or []}
     
-    # Document processing (only once)
-    if uploaded and not st.session_state.document_processed:
+    # Files removed from the uploader leave the corpus
+    removed = [file_id for file_id in st.session_state.uploads if file_id not in current_files]
+    for file_id in removed:
+        remove_upload(file_id)
+    for file_id in [file_id for file_id in st.session_state.pending if file_id not in current_files]:
+        jobs.cancel(st.session_state.pending.pop(file_id))
+    for file_id in [file_id for file_id in st.session_state.upload_errors if file_id not in current_files]:
+        del st.session_state.upload_errors[file_id]
+    if removed:
+        st.session_state.document_processed = bool(st.session_state.documents)
+        prepare_suggestions()
+    
+    # Documents finished by the background workers join the corpus
+    if st.session_state.pending and collect_jobs(current_files):
+        st.session_state.document_processed = True
+        prepare_suggestions()
+    for message in st.session_state.upload_errors.values():
+        st.warning(message + " — remove the file and upload it again to retry.")
+    
+    # Document processing (only once per uploaded file)
+    new_files = [
+        f for file_id, f in current_files.items()
+        if file_id not in st.session_state.uploads
+        and file_id not in st.session_state.pending
+        and file_id not in st.session_state.upload_errors
+    ]
+    if new_files:
         with st.container():
-            st.subheader("📄 Processing Document")
+            st.subheader("📄 Processing Documents")
             
             try:
-                # Process document with caching
-                chunks, index = process_document(uploaded)
-                
-                # Store in session state
-                st.session_state.chunks = chunks
-                st.session_state.index = index
-                st.session_state.document_processed = True
-                st.session_state.current_document = uploaded.name
+                # Clear any previous chat when starting from an empty corpus
+                if not st.session_state.document_processed:
+                    clear_chat()
                 
-                # Clear any previous chat
-                clear_chat()
+                loaded = 0
+                for uploaded in new_files:
+                    doc_hash = document_hash(uploaded.getvalue())
+                    if jobs is not None and doc_hash not in registry and not store.exists(doc_hash):
+                        # New content is processed by the background workers
+                        st.session_state.pending[uploaded.file_id] = jobs.submit(
+                            doc_hash, uploaded.getvalue(), uploaded.name
+                        )
+                        continue
+                    
+                    # Process document (or load it from the document store)
+                    chunks = add_document(uploaded)
+                    loaded += 1
+                    
+                    # Add welcome message
+                    add_message('assistant', loaded_message(uploaded.name, chunks))
                 
-                # Add welcome message
-                add_message('assistant', f"I've loaded the document **'{uploaded.name}'**. Ask me anything about it!")
+                if not loaded:
+                    st.rerun()
+                st.session_state.document_processed = True
+                prepare_suggestions()
                 
                 st.success(f"✅ Document loaded successfully!")
                 
                 # Show document stats
                 with st.expander("📊 Document Details", expanded=False):
-                    col1, col2 = st.columns(2)
+                    col1, col2, col3 = st.columns(3)
                     with col1:
-                        st.metric("Total Sections", len(chunks))
+                        st.metric("Total Sections", len(st.session_state.corpus))
                     with col2:
-                        st.metric("Processing Status", "Ready")
+                        st.metric("Documents", len(st.session_state.documents))
+                    with col3:
+                        cache_stats = get_client().cache.stats()
+                        st.metric("Embedding Cache Hit Rate", f"{cache_stats['hit_rate']:.0%}")
                     st.caption(f"*Document processed and ready for questions*")
                 
                 st.rerun()
@@ -120,13 +442,17 @@ def main():
                 st.error(f"❌ Failed to process document: {str(e)}")
                 return
     
+    if st.session_state.pending:
+        show_jobs()
+    
     # Main chat interface
     if st.session_state.document_processed:
         # Sidebar with controls
         with st.sidebar:
             st.header("💬 Chat Controls")
             
-            st.subheader(f"📄 {st.session_state.current_document}")
+            for name in st.session_state.documents.values():
+                st.subheader(f"📄 {name}")
             
             # Chat management
             if st.button("🗑️ Clear Chat", use_container_width=True, type="secondary"):
@@ -135,11 +461,18 @@ def main():
                 st.rerun()
             
             if st.button("🔄 New Document", use_container_width=True):
-                for key in ['document_processed', 'chunks', 'index', 'current_document']:
-                    if key in st.session_state:
-                        del st.session_state[key]
-                st.cache_resource.clear()
-                st.session_state.chat_history = []
+                st.session_state.corpus = Corpus()
+                release_documents()
+                for job_id in st.session_state.pending.values():
+                    jobs.cancel(job_id)
+                st.session_state.pending = {}
+                st.session_state.upload_errors = {}
+                st.session_state.documents = {}
+                st.session_state.uploads = {}
+                st.session_state.document_processed = False
+                st.session_state.suggestion_context = {}
+                st.session_state.uploader_version += 1
+                clear_chat()
                 st.rerun()
             
             st.divider()
@@ -150,24 +483,26 @@ def main():
             assistant_msgs = sum(1 for msg in st.session_state.chat_history if msg['role'] == 'assistant')
             st.caption(f"👤 User: {user_msgs} messages")
             st.caption(f"🤖 Assistant: {assistant_msgs} messages")
+            st.caption(f"⚡ Answer cache hit rate: {answer_cache.stats()['hit_rate']:.0%}")
+            registry_stats = registry.stats()
+            st.caption(f"📚 Shared documents in memory: {registry_stats['documents']} ({registry_stats['bytes'] / 2**20:.1f} MB)")
+            budget_stats = budget.snapshot()
+            st.caption(
+                f"⏱️ Answers in flight: {budget_stats['inflight']} · first token ≈{budget_stats['first_token_seconds']:.2f}s · "
+                f"{budget_stats['tokens_per_second']:.0f} tokens/s"
+            )
             
             st.divider()
             
             # Suggested questions
             st.caption("**💡 Try asking:**")
-            suggestions = [
-                "Summarize the main points",
-                "What are the key findings?",
-                "Explain the methodology",
-                "List the recommendations"
-            ]
-            for suggestion in suggestions:
+            for suggestion in SUGGESTED_QUESTIONS:
                 if st.button(suggestion, use_container_width=True, type="secondary"):
                     st.session_state.suggested_question = suggestion
                     st.rerun()
         
         # Main chat area
-        st.subheader(f"💬 Chat about: **{st.session_state.current_document}**")
+        st.subheader(f"💬 Chat about: **{document_names()}**")
         
         # Display chat history
         chat_container = st.container()
@@ -177,13 +512,16 @@ def main():
                     # Display message content
                     st.markdown(message['content'])
                     
-                    # Show timestamp
-                    st.caption(f"*{message['timestamp']}*")
+                    # Show timestamp (and answer latency when recorded)
+                    if message.get('latency'):
+                        st.caption(f"*{message['timestamp']} · {format_latency(message['latency'])}*")
+                    else:
+                        st.caption(f"*{message['timestamp']}*")
                     
                     # Show sources for assistant messages if available
                     if message['role'] == 'assistant' and message.get('sources'):
                         with st.expander("📚 View sources", expanded=False):
-                            show_sources(message['sources'])
+                            show_sources(message['sources'], st.session_state.documents)
         
         # Chat input at bottom
         st.divider()
@@ -219,26 +557,23 @@ def main():
                 # Show initial thinking indicator
                 message_placeholder.markdown("💭 Thinking...")
                 
-                # Generate answer
-                answer, sources = answer_question(
+                # Stream the answer into the placeholder
+                answer, sources, latency = answer_question(
                     question, 
-                    st.session_state.chunks, 
-                    st.session_state.index
+                    st.session_state.corpus,
+                    message_placeholder
                 )
                 
-                # Update with actual answer
-                message_placeholder.markdown(answer)
-                
                 # Add timestamp
-                st.caption(f"*{datetime.now().strftime('%H:%M')}*")
+                st.caption(f"*{datetime.now().strftime('%H:%M')} · {format_latency(latency)}*")
                 
                 # Show sources
                 with st.expander("📚 View sources", expanded=False):
-                    show_sources(sources)
+                    show_sources(sources, st.session_state.documents)
                     st.caption(f"*Retrieved {len(sources)} relevant sections*")
             
             # Add assistant message to history
-            add_message('assistant', answer, sources)
+            add_message('assistant', answer, sources, latency)
             
             # Scroll to bottom (using JavaScript via components)
             st.rerun()
@@ -257,4 +592,6 @@ def main():
             st.info("👆 Use the sidebar to upload a PDF document")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
+    if IMPORT_PROFILE:
+        lazy.log_import_profile()
\ No newline at end of file
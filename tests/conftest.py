@@ -40,4 +40,23 @@ def mock_mistral_client():
     mock_client.embed.return_value = [[0.1, 0.2, 0.3]]
     mock_client.chat.return_value = "Mocked AI response"
     
-    return mock_client
\ No newline at end of file
+    return mock_client
+
+
+@pytest.fixture
+def make_pdf():
+    """Build an in-memory PDF whose page N reads 'Page N line M' (needs reportlab)"""
+    canvas_module = pytest.importorskip("reportlab.pdfgen.canvas")
+    from io import BytesIO
+
+    def _make_pdf(pages, lines=3):
+        buffer = BytesIO()
+        pdf = canvas_module.Canvas(buffer)
+        for page in range(pages):
+            for line in range(lines):
+                pdf.drawString(72, 720 - 20 * line, f"Page {page + 1} line {line + 1}")
+            pdf.showPage()
+        pdf.save()
+        return buffer.getvalue()
+
+    return _make_pdf
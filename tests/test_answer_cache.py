@@ -0,0 +1,76 @@
+# tests/test_answer_cache.py
+from app.answer_cache import AnswerCache, scope_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_scope_key_ignores_order():
+    assert scope_key(["a", "b"]) == scope_key(["b", "a"])
+    assert scope_key(["a"]) != scope_key(["a", "b"])
+
+
+def test_follow_up_is_not_shared_across_conversations():
+    """Test that the same follow-up after different histories gets separate answers"""
+    from app.memory import ConversationMemory
+
+    first, second = ConversationMemory(), ConversationMemory()
+    first.add_turn("What is the refund policy?", "30 days.", [1.0, 0.0])
+    second.add_turn("Who signs off budgets?", "The CFO.", [0.0, 1.0])
+    follow_up = [0.5, 0.5]
+    cache = AnswerCache(threshold=0.95)
+    cache.store(scope_key(["doc"], first.context(follow_up)), follow_up, "More on refunds", [])
+
+    assert cache.lookup(scope_key(["doc"], second.context(follow_up)), follow_up) is None
+    assert cache.lookup(scope_key(["doc"], first.context(follow_up)), follow_up).answer == "More on refunds"
+    assert scope_key(["doc"]) == scope_key(["doc"], "")
+
+
+def test_similar_question_hits():
+    """Test that a near-identical embedding returns the stored answer"""
+    cache = AnswerCache(threshold=0.95)
+    cache.store("doc", [1.0, 0.0, 0.0], "Stored answer", ["source"])
+
+    cached = cache.lookup("doc", [0.99, 0.05, 0.0])
+    assert cached.answer == "Stored answer"
+    assert cached.sources == ["source"]
+    assert cached.similarity > 0.95
+    assert cache.stats()["hit_rate"] == 1.0
+
+
+def test_dissimilar_question_and_other_scope_miss():
+    cache = AnswerCache(threshold=0.95)
+    cache.store("doc", [1.0, 0.0], "Stored answer", [])
+
+    assert cache.lookup("doc", [0.0, 1.0]) is None
+    assert cache.lookup("other-doc", [1.0, 0.0]) is None
+    assert cache.stats()["misses"] == 2
+
+
+def test_entries_expire():
+    """Test that entries older than the TTL are dropped"""
+    clock = FakeClock()
+    cache = AnswerCache(ttl=60, clock=clock)
+    cache.store("doc", [1.0, 0.0], "Stored answer", [])
+
+    clock.now = 61
+    assert cache.lookup("doc", [1.0, 0.0]) is None
+    assert len(cache) == 0
+
+
+def test_lru_eviction():
+    """Test that the least recently used entry is evicted first"""
+    cache = AnswerCache(max_entries=2)
+    cache.store("doc", [1.0, 0.0, 0.0], "first", [])
+    cache.store("doc", [0.0, 1.0, 0.0], "second", [])
+    cache.lookup("doc", [1.0, 0.0, 0.0])
+    cache.store("doc", [0.0, 0.0, 1.0], "third", [])
+
+    assert cache.lookup("doc", [1.0, 0.0, 0.0]).answer == "first"
+    assert cache.lookup("doc", [0.0, 1.0, 0.0]) is None
+    assert len(cache) == 2
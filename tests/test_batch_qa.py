@@ -0,0 +1,119 @@
+# tests/test_batch_qa.py
+import json
+import subprocess
+import sys
+from unittest.mock import Mock
+
+import pytest
+
+from app.batch_qa import completed_ids, load_document, load_questions, run_batch
+from app.document_store import DocumentStore
+from app.rag import build_index
+
+
+def write_jsonl(path, records):
+    path.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+
+
+def read_jsonl(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def make_client():
+    client = Mock()
+    client.embed.side_effect = lambda texts: [[1.0, 0.0] for _ in texts]
+    client.chat.side_effect = lambda prompt: "Answer"
+    return client
+
+
+def test_module_does_not_import_streamlit():
+    """Test that the headless runner stays free of the UI stack"""
+    code = "import sys, app.batch_qa; assert 'streamlit' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_load_questions_defaults_ids(tmp_path):
+    path = tmp_path / "q.jsonl"
+    path.write_text('{"question": "First?"}\n\n{"id": "x", "question": "Second?"}\n')
+    assert load_questions(str(path)) == [
+        {"question": "First?", "id": 1},
+        {"id": "x", "question": "Second?"},
+    ]
+
+
+def test_run_batch_writes_answers(tmp_path):
+    """Test that every question gets an answer, sources and latency"""
+    output = tmp_path / "answers.jsonl"
+    questions = [{"id": i, "question": f"Question {i}?"} for i in range(5)]
+    index = build_index([[1.0, 0.0], [0.0, 1.0]])
+
+    client = make_client()
+    summary = run_batch(questions, client, ["chunk A", "chunk B"], index,
+                        str(output), concurrency=3, requests_per_second=1000)
+
+    results = read_jsonl(output)
+    assert summary == {"answered": 5, "failed": 0, "skipped": 0}
+    assert client.embed.call_count == 1  # the questions are embedded as one batch
+    assert sorted(r["id"] for r in results) == list(range(5))
+    assert results[0]["answer"] == "Answer"
+    assert results[0]["sources"][0] == "chunk A"
+    assert results[0]["latency"]["total"] >= 0
+
+
+def test_run_batch_resumes_and_retries_failures(tmp_path):
+    """Test that answered IDs are skipped and failed ones are retried"""
+    output = tmp_path / "answers.jsonl"
+    output.write_text(
+        json.dumps({"id": 0, "answer": "done"}) + "\n"
+        + json.dumps({"id": 1, "error": "boom"}) + "\n"
+        + '{"id": 2, "ans'  # torn line from an interrupted run
+    )
+    questions = [{"id": i, "question": f"Question {i}?"} for i in range(3)]
+    client = make_client()
+
+    summary = run_batch(questions, client, ["chunk"], build_index([[1.0, 0.0]]),
+                        str(output), requests_per_second=1000)
+
+    assert summary == {"answered": 2, "failed": 0, "skipped": 1}
+    assert client.chat.call_count == 2
+    assert completed_ids(str(output)) == {0, 1, 2}
+
+
+def test_run_batch_reports_invalid_records(tmp_path):
+    """Test that records without an id or question get an error line instead of aborting the run"""
+    output = tmp_path / "answers.jsonl"
+    questions = [{"id": 0, "question": "Question?"}, {"id": 1}, {"question": "No id?"}, {"id": 3, "question": " "}]
+    client = make_client()
+
+    summary = run_batch(questions, client, ["chunk"], build_index([[1.0, 0.0]]),
+                        str(output), requests_per_second=1000)
+
+    results = read_jsonl(output)
+    assert summary == {"answered": 1, "failed": 3, "skipped": 0}
+    assert client.chat.call_count == 1
+    assert sorted(r["error"] for r in results if "error" in r) == [
+        "record has no id", "record has no question", "record has no question",
+    ]
+
+
+def test_load_questions_rejects_non_objects(tmp_path):
+    path = tmp_path / "q.jsonl"
+    path.write_text('{"question": "First?"}\n["Second?"]\n')
+    with pytest.raises(ValueError, match=":2:"):
+        load_questions(str(path))
+
+
+def test_load_document_uses_store(tmp_path, make_pdf):
+    """Test that a processed PDF is stored and later loaded without embedding"""
+    pdf_path = tmp_path / "doc.pdf"
+    pdf_path.write_bytes(make_pdf(2))
+    store = DocumentStore(str(tmp_path / "store"))
+    client = make_client()
+
+    doc_hash, chunks, index = load_document(client, store, pdf=str(pdf_path))
+    assert "Page 1 line 1" in chunks[0]
+    assert client.embed.call_count == 1
+
+    _, stored_chunks, _ = load_document(client, store, doc_hash=doc_hash)
+    assert list(stored_chunks) == list(chunks)
+    assert client.embed.call_count == 1
@@ -0,0 +1,95 @@
+# tests/test_batching.py
+import pytest
+from unittest.mock import Mock
+from app.batching import BatchEmbedder, TokenBucket, make_batches, is_transient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TransientError(Exception):
+    status_code = 429
+
+
+def fake_embed(texts):
+    return [[float(len(text))] for text in texts]
+
+
+def test_make_batches_by_item_count():
+    """Test that batches never exceed the item limit"""
+    assert make_batches(["a"] * 5, max_items=2, max_tokens=1000) == [(0, 2), (2, 4), (4, 5)]
+
+
+def test_make_batches_by_token_budget():
+    """Test that batches stay within the token budget"""
+    texts = ["x" * 40, "x" * 40, "x" * 40]  # ~10 tokens each
+    assert make_batches(texts, max_items=100, max_tokens=20) == [(0, 2), (2, 3)]
+
+
+def test_make_batches_oversized_item():
+    """Test that a single oversized text still gets its own batch"""
+    assert make_batches(["x" * 400, "y"], max_items=10, max_tokens=10) == [(0, 1), (1, 2)]
+
+
+def test_make_batches_empty():
+    assert make_batches([]) == []
+
+
+def test_is_transient():
+    assert is_transient(TransientError())
+    assert is_transient(ConnectionError())
+    assert not is_transient(Exception("API Error"))
+
+    class Conflict(Exception):
+        status_code = 409
+
+    assert not is_transient(Conflict())
+
+
+def test_token_bucket_throttles():
+    """Test that acquiring past capacity waits for refill"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock, sleep=clock.sleep)
+    for _ in range(4):
+        bucket.acquire()
+    assert clock.now == pytest.approx(1.0)
+
+
+def test_embedder_preserves_order():
+    """Test that concurrent batches are reassembled in input order"""
+    texts = ["a" * n for n in range(1, 50)]
+    embedder = BatchEmbedder(fake_embed, max_items=4, workers=4,
+                             rate_limiter=TokenBucket(rate=1e9))
+    assert embedder.embed(texts) == [[float(n)] for n in range(1, 50)]
+
+
+def test_embedder_retries_transient_errors():
+    """Test that transient failures are retried with backoff"""
+    embed_fn = Mock(side_effect=[TransientError(), TransientError(), [[1.0]]])
+    sleep = Mock()
+    embedder = BatchEmbedder(embed_fn, rate_limiter=TokenBucket(rate=1e9), sleep=sleep)
+
+    assert embedder.embed(["a"]) == [[1.0]]
+    assert embed_fn.call_count == 3
+    assert sleep.call_count == 2
+
+
+def test_embedder_gives_up():
+    """Test that permanent errors and exhausted retries are raised"""
+    embedder = BatchEmbedder(Mock(side_effect=ValueError("bad input")),
+                             rate_limiter=TokenBucket(rate=1e9))
+    with pytest.raises(ValueError):
+        embedder.embed(["a"])
+
+    embedder = BatchEmbedder(Mock(side_effect=TransientError()), max_retries=2,
+                             rate_limiter=TokenBucket(rate=1e9), sleep=Mock())
+    with pytest.raises(TransientError):
+        embedder.embed(["a"])
@@ -0,0 +1,58 @@
+# tests/test_benchmarks.py
+import pytest
+from app.mistral_client import MistralClient
+from benchmarks.stub_server import StubConfig, start_stub_server, stub_embedding
+
+
+@pytest.fixture
+def stub_client():
+    """MistralClient talking to a zero-latency local stub API"""
+    config = StubConfig(embed_latency=0, chat_latency=0, token_latency=0, jitter=0, dim=8)
+    server, url = start_stub_server(config)
+    yield MistralClient("stub-key", server_url=url), config
+    server.shutdown()
+
+
+def test_stub_embeddings_are_deterministic(stub_client):
+    client, config = stub_client
+    embeddings = client.embed(["alpha", "beta"])
+
+    assert len(embeddings) == 2 and len(embeddings[0]) == 8
+    assert embeddings[0] == pytest.approx(stub_embedding("alpha", 8))
+    assert config.requests["embeddings"] == 1
+
+
+def test_stub_chat_and_stream(stub_client):
+    """Test that the SDK parses both blocking and streamed stub completions"""
+    client, config = stub_client
+    answer = client.chat("Question?")
+    stream = client.chat_stream("Question?")
+
+    assert "".join(stream) == answer == config.answer
+    assert stream.latency()["total"] >= stream.latency()["first_token"]
+
+
+def test_pipeline_benchmark_smoke(stub_client):
+    pytest.importorskip("reportlab")
+    from benchmarks.bench_pipeline import run_size
+
+    client, _ = stub_client
+    result = run_size(3, client, workers=0, n_queries=4, n_questions=2)
+
+    assert result["pages"] == 3 and result["chunks"] > 0
+    for key in ("extract_s", "chunk_s", "embed_s", "index_build_s", "ingest_pipelined_s", "search_batch_s", "peak_rss_mb"):
+        assert result[key] >= 0
+    assert result["qa_total_s"]["p50"] >= result["qa_first_token_s"]["p50"]
+
+
+def test_quantization_benchmark_smoke():
+    import numpy as np
+    from benchmarks.bench_quantization import run
+
+    vectors = np.random.default_rng(0).standard_normal((300, 16)).astype("float32")
+    rows = run(vectors, vectors[:10] + 0.01, k=2, rerank_factors=(8,))
+
+    by_mode = {(row["storage"], row["rerank_factor"]): row for row in rows}
+    assert by_mode[("float32", 0)]["recall"] == 1.0
+    assert by_mode[("sq8", 8)]["recall"] == 1.0
+    assert by_mode[("fp16", 0)]["memory_mb"] < by_mode[("float32", 0)]["memory_mb"]
@@ -0,0 +1,93 @@
+# tests/test_budget.py
+from app.budget import FULL, MIN_DECODE_SECONDS, REDUCED, SHED, LatencyBudget, describe
+from app.corpus import Hit
+
+
+def vector_hits(*distances):
+    return [Hit("doc", i, f"chunk {i}", distance) for i, distance in enumerate(distances)]
+
+
+def make_budget(**kwargs):
+    options = dict(target_seconds=8, token_budget=0, max_inflight=4, k=2, k_max=5, context_tokens=1500,
+                   min_context_tokens=400, max_tokens=500, min_max_tokens=150, gap=0.25)
+    options.update(kwargs)
+    return LatencyBudget(**options)
+
+
+def test_depth_stops_at_relevance_gap():
+    budget = make_budget()
+    assert budget.depth(vector_hits(0.40, 0.45, 0.48, 0.90, 0.91)) == 3
+    assert budget.depth(vector_hits(0.40, 0.95)) == 1
+    assert budget.depth([Hit("doc", i, "t", None, None, score) for i, score in enumerate([9.0, 8.0, 2.0])]) == 2
+    # Distances and scores are not comparable, so an unfused mix keeps the default k
+    mixed = vector_hits(0.4, 0.41, 0.42) + [Hit("doc", 9, "t", None, None, 3.0)]
+    assert budget.depth(mixed) == 2
+    assert budget.depth([]) == 0
+
+
+def test_depth_of_fused_hits_follows_fusion_scores():
+    """Test that hybrid results go past k while hits stay as well supported as the best"""
+    budget = make_budget()
+    both, single = 2 / 61, 1 / 62  # found by both tiers / by one of them
+    fused = [Hit("doc", i, "t", 0.4, fused=score) for i, score in enumerate([both, 2 / 63, 2 / 65, single, single])]
+    assert budget.depth(fused) == 3
+    assert budget.depth([hit._replace(fused=score) for hit, score in zip(fused, [both, single, single])]) == 2
+    assert budget.depth(fused[:1]) == 1
+
+
+def test_plan_uses_full_budget_when_time_allows():
+    budget = make_budget()
+    plan = budget.plan(vector_hits(0.4, 0.42, 0.44), elapsed=0.2)
+
+    assert plan.level == FULL and plan.reason == "ok"
+    assert (plan.k, plan.context_tokens, plan.max_tokens) == (3, 1500, 500)
+    assert plan.predicted_seconds == budget.predict(500)
+
+
+def test_slow_chat_shrinks_answer_and_context():
+    budget = make_budget()
+    for _ in range(30):
+        budget.observe(first_token_seconds=2.0, total_seconds=12.0, completion_tokens=201)  # 20 tokens/s
+
+    plan = budget.plan(vector_hits(0.4), elapsed=1.0)
+    assert plan.level == REDUCED and plan.reason == "latency"
+    assert 150 <= plan.max_tokens < 500 and 400 <= plan.context_tokens < 1500
+    assert budget.plan(vector_hits(0.4), elapsed=20.0)[1:4] == (1, 400, 150)
+
+
+def test_single_chunk_answers_keep_decode_estimate_positive():
+    """Test that answers arriving all at once cannot drive the decode estimate to zero"""
+    budget = make_budget()
+    for _ in range(500):
+        budget.observe(first_token_seconds=0.5, total_seconds=0.5, completion_tokens=300)
+
+    assert budget.decode.value >= MIN_DECODE_SECONDS
+    assert budget.snapshot()["tokens_per_second"] <= 1 / MIN_DECODE_SECONDS
+    assert budget.plan(vector_hits(0.4), elapsed=0.2).max_tokens == 500
+
+
+def test_token_budget_trims_context_before_answer():
+    budget = make_budget(token_budget=1200)
+    plan = budget.plan(vector_hits(0.4), prompt_tokens=80)
+
+    assert plan.reason == "tokens"
+    assert plan.max_tokens == 500 and plan.context_tokens == 1200 - 80 - 120 - 500
+
+
+def test_load_reduces_then_sheds():
+    budget = make_budget(max_inflight=2)
+    with budget.request() as first, budget.request() as second, budget.request() as third:
+        assert (first, second, third) == (FULL, REDUCED, SHED)
+        assert budget.snapshot()["inflight"] == 3
+        shed = budget.plan(vector_hits(0.4, 0.41, 0.42), level=third)
+    assert budget.snapshot()["inflight"] == 0
+    assert shed.level == SHED and shed.max_tokens == 0 and "busy" in describe(shed)
+
+    reduced = make_budget().plan(vector_hits(0.4, 0.41, 0.42), level=REDUCED)
+    assert reduced.k == 2 and reduced.max_tokens == 250 and reduced.reason == "load"
+    assert budget.snapshot()["last_plan"]["level"] == SHED
+
+
+def test_zero_target_keeps_configured_settings():
+    plan = make_budget(target_seconds=0).plan(vector_hits(0.4, 0.41, 0.42, 0.43), elapsed=30.0)
+    assert (plan.level, plan.k, plan.context_tokens, plan.max_tokens) == (FULL, 2, 1500, 500)
@@ -0,0 +1,43 @@
+# tests/test_chunks.py
+from app.chunks import ChunkStore, chunk_offsets
+from app.rag import chunk_text
+
+
+def test_offsets_match_chunk_text(sample_long_text):
+    """Test that offset chunking reproduces chunk_text exactly"""
+    store = ChunkStore.from_text(sample_long_text)
+    assert list(store) == chunk_text(sample_long_text)
+    assert len(store) == len(chunk_text(sample_long_text))
+
+
+def test_chunk_offsets_small_and_empty():
+    starts, ends = chunk_offsets(5, size=10, overlap=2)
+    assert starts.tolist() == [0] and ends.tolist() == [5]
+    assert len(ChunkStore.from_text("")) == 0
+
+
+def test_indexing_and_slicing():
+    store = ChunkStore.from_text("abcdefghij", size=4, overlap=1)
+    assert store[0] == "abcd"
+    assert store[-1] == "j"
+    assert store[1:3] == ["defg", "ghij"]
+
+
+def test_pages_follow_chunk_starts():
+    """Test that each chunk records the page it starts on"""
+    store = ChunkStore.from_pages(["x" * 10, "y" * 10, "z" * 10], size=8, overlap=2)
+    assert [store.page(i) for i in range(len(store))] == [0, 0, 1, 1, 2]
+    assert store[2] == "yyyyyyyy"
+
+
+def test_text_is_stored_once():
+    """Test that memory stays close to the raw text size despite overlap"""
+    text = "word " * 20_000
+    store = ChunkStore.from_text(text)
+    materialized = sum(len(chunk) for chunk in chunk_text(text))
+    assert store.nbytes < 1.1 * len(text) < materialized
+
+
+def test_from_chunks():
+    store = ChunkStore.from_chunks(["one", "two", "three"])
+    assert list(store) == ["one", "two", "three"]
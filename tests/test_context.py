@@ -0,0 +1,46 @@
+# tests/test_context.py
+from app.chunks import ChunkStore
+from app.context import pack_context
+from app.corpus import Hit
+
+
+def make_store():
+    # 10-char chunks overlapping by 4: [0,10) [6,16) [12,22) [18,28) [24,30)
+    return ChunkStore.from_text("abcdefghijklmnopqrstuvwxyz0123", size=10, overlap=4)
+
+
+def hits_for(store, chunk_ids, doc_id="doc"):
+    return [Hit(doc_id, i, store[i], float(rank)) for rank, i in enumerate(chunk_ids)]
+
+
+def test_overlapping_chunks_merge_into_one_passage():
+    """Test that overlapping neighbours are sent once as contiguous text"""
+    store = make_store()
+    passages = pack_context(hits_for(store, [1, 0]), lambda _: store)
+
+    assert len(passages) == 1
+    assert passages[0].text == store.text[0:16]
+    assert passages[0].chunk_ids == [0, 1]
+
+
+def test_passages_follow_relevance_order():
+    store = make_store()
+    passages = pack_context(hits_for(store, [4, 0, 4]), lambda _: store)
+
+    assert [p.text for p in passages] == [store[4], store[0]]
+
+
+def test_token_budget_limits_new_text():
+    """Test that hits whose new text overflows the budget are skipped"""
+    store = make_store()
+    # 4-token budget = 16 characters: chunk 0 (10) + chunk 1 (6 new) fit, chunk 3 does not
+    passages = pack_context(hits_for(store, [0, 3, 1]), lambda _: store, token_budget=4)
+
+    assert [p.text for p in passages] == [store.text[0:16]]
+
+
+def test_plain_chunks_are_deduplicated():
+    hits = [Hit("a", 0, "same text", 0.0), Hit("b", 3, "same text", 0.1), Hit("b", 4, "other", 0.2)]
+    passages = pack_context(hits, lambda _: ["unused"])
+
+    assert [p.text for p in passages] == ["same text", "other"]
@@ -0,0 +1,171 @@
+# tests/test_corpus.py
+from app.corpus import Corpus, Hit
+
+
+def attach(corpus, doc_id, chunks, embeddings):
+    from app.rag import build_index
+
+    corpus.add_index(doc_id, chunks, build_index(embeddings, "flat", "float32"))
+
+
+def make_corpus():
+    corpus = Corpus()
+    attach(corpus, "doc-a", ["apples", "avocados"], [[1.0, 0.0], [0.9, 0.1]])
+    attach(corpus, "doc-b", ["bananas", "blueberries"], [[0.0, 1.0], [0.1, 0.9]])
+    return corpus
+
+
+def test_retrieve_across_documents():
+    """Test that hits carry document and chunk IDs alongside the text"""
+    corpus = make_corpus()
+    hits = corpus.retrieve([1.0, 0.0], k=2)
+
+    assert [hit.text for hit in hits] == ["apples", "avocados"]
+    assert hits[0] == Hit("doc-a", 0, "apples", 0.0)
+    assert corpus.retrieve([0.0, 1.0], k=1)[0].doc_id == "doc-b"
+    assert len(corpus) == 4
+
+
+def test_remove_document_hides_it_immediately():
+    corpus = make_corpus()
+
+    assert corpus.remove_document("doc-a")
+    assert not corpus.remove_document("doc-a")
+    assert "doc-a" not in corpus and corpus.chunks("doc-a") is None
+    assert {hit.doc_id for hit in corpus.retrieve([1.0, 0.0], k=4)} == {"doc-b"}
+    assert corpus.retrieve_lexical("apples").hits == []
+    assert len(corpus) == 2
+
+
+def test_readding_document_replaces_it():
+    corpus = make_corpus()
+    assert corpus.retrieve_lexical("apples").hits  # builds the old BM25 index
+    attach(corpus, "doc-a", ["apricots"], [[1.0, 0.0]])
+
+    assert len(corpus) == 3
+    assert corpus.retrieve([1.0, 0.0], k=1)[0].text == "apricots"
+    assert corpus.retrieve_lexical("apples").hits == []
+
+
+def test_attached_ann_index_is_searched_in_place():
+    """Test that a document's own (quantized) index is searched as is"""
+    import numpy as np
+    from app.indexes import create_index
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(3000, 32)).astype("float32")
+    index = create_index("ivf_pq", vectors)
+    corpus = Corpus()
+    corpus.add_index("doc", [f"chunk {i}" for i in range(3000)], index)
+
+    distances, ids = index.search(vectors[:1], 5)
+    hits = corpus.retrieve(vectors[0], k=5)
+    assert [hit.chunk_id for hit in hits] == ids[0].tolist()
+    assert np.allclose([hit.distance for hit in hits], distances[0])
+
+
+def test_empty_corpus():
+    assert Corpus().retrieve([1.0, 0.0]) == []
+
+
+def test_retrieve_batch_across_documents():
+    corpus = make_corpus()
+    hits = corpus.retrieve_batch([[1.0, 0.0], [0.0, 1.0]], k=1)
+    assert [[hit.text for hit in row] for row in hits] == [["apples"], ["bananas"]]
+    assert Corpus().retrieve_batch([[1.0, 0.0]]) == [[]]
+
+
+def test_confident_keyword_search_skips_embedding():
+    """Test that a keyword query answered by BM25 never calls the embedder"""
+    from unittest.mock import Mock
+
+    corpus = make_corpus()
+    embed = Mock(return_value=[0.0, 1.0])
+    hits, embedding = corpus.search("blueberries", embed, k=1, mode="hybrid")
+
+    assert [hit.text for hit in hits] == ["blueberries"] and hits[0].score > 0
+    assert embedding is None and not embed.called
+
+
+def test_hybrid_search_fuses_both_tiers():
+    from unittest.mock import Mock
+
+    corpus = make_corpus()
+    embed = Mock(return_value=[1.0, 0.0])
+    hits, embedding = corpus.search("tell me about fruit like bananas and apples", embed, k=3)
+
+    embed.assert_called_once()
+    assert embedding == [1.0, 0.0]
+    assert {"apples", "bananas"} <= {hit.text for hit in hits}
+    assert all(hit.fused for hit in hits) and hits[0].fused >= hits[-1].fused
+    semantic, _ = corpus.search("bananas", embed, k=1, mode="semantic")
+    assert semantic[0].text == "apples" and embed.call_count == 2
+    lexical = corpus.retrieve_lexical("blueberries")
+    assert lexical.confident and lexical.hits[0].doc_id == "doc-b"
+
+
+def test_lexical_confidence_is_not_decided_across_documents():
+    """Test that a rare term in one document does not outrank the same term in another by IDF alone"""
+    corpus = Corpus()
+    attach(corpus, "doc-a", ["invoice totals", "shipping", "returns", "warranty", "pricing", "support"],
+           [[1.0, 0.0]] * 6)
+    attach(corpus, "doc-b", ["invoice approved", "invoice rejected"], [[0.0, 1.0]] * 2)
+
+    lexical = corpus.retrieve_lexical("invoice", k=3)
+    assert not lexical.confident
+    assert {hit.doc_id for hit in lexical.hits} == {"doc-a", "doc-b"}
+    assert all(0 < hit.score <= 1.0 for hit in lexical.hits)
+    assert corpus.retrieve_lexical("warranty").confident
+
+
+def test_search_queries_locally_embedded_documents_with_their_backend():
+    """Test that a document indexed by the local fallback is searched with local question vectors"""
+    from app.chunks import ChunkStore
+    from app.embeddings import HashingEmbedder
+    from app.rag import build_index
+
+    local = HashingEmbedder(dim=64)
+    local_texts = ["Refunds take up to 14 days.", "Alice approved the security review."]
+    local_chunks = ChunkStore.from_chunks(local_texts)
+    local_chunks.embedding = local.info()
+    corpus = Corpus(backend="mistral")
+    corpus.add_index("api-doc", ["apples and oranges"], build_index([[1.0, 0.0]], "flat", "float32"))
+    corpus.add_index("local-doc", local_chunks, build_index(local.embed(local_texts), "flat", "float32"))
+
+    asked = []
+
+    def embed_fn(question):
+        asked.append(question)
+        return [1.0, 0.0]
+
+    hits, embedding = corpus.search("how long do refunds take", embed_fn, k=3, mode="semantic")
+    assert asked == ["how long do refunds take"] and embedding == [1.0, 0.0]
+    assert {(hit.doc_id, hit.chunk_id) for hit in hits} == {("api-doc", 0), ("local-doc", 0), ("local-doc", 1)}
+    assert [hit.chunk_id for hit in hits if hit.doc_id == "local-doc"] == [0, 1]
+    assert corpus.retrieve([1.0, 0.0], k=5)[0].doc_id == "api-doc" and len(corpus.retrieve([1.0, 0.0], k=5)) == 1
+
+
+def test_search_batch_matches_search_with_one_embedding_call():
+    """Test that a batch embeds once and returns what per-question searches would"""
+    from unittest.mock import Mock
+
+    from app.chunks import ChunkStore
+    from app.embeddings import HashingEmbedder
+    from app.rag import build_index
+
+    local = HashingEmbedder(dim=64)
+    local_texts = ["Refunds take up to 14 days.", "Bananas ripen in a week."]
+    local_chunks = ChunkStore.from_chunks(local_texts)
+    local_chunks.embedding = local.info()
+    corpus = make_corpus()
+    corpus.add_index("local-doc", local_chunks, build_index(local.embed(local_texts), "flat", "float32"))
+    questions = ["blueberries", "how long do refunds take", "fruit like apples"]
+    vectors = {"how long do refunds take": [1.0, 0.0], "fruit like apples": [0.9, 0.1]}
+    embed_many = Mock(side_effect=lambda texts: [vectors[text] for text in texts])
+
+    results = corpus.search_batch(questions, embed_many, k=3)
+
+    embed_many.assert_called_once_with(["how long do refunds take", "fruit like apples"])
+    assert results == [corpus.search(question, lambda text: vectors[text], k=3) for question in questions]
+    assert results[0][1] is None and results[1][1] == [1.0, 0.0]
+    assert "local-doc" in {hit.doc_id for hit in results[1][0]}
@@ -0,0 +1,90 @@
+# tests/test_dedup.py
+import pytest
+
+from app.chunks import chunk_offsets
+from app.dedup import BoilerplateFilter, ChunkDeduplicator, chunks_for_length, normalize_line
+
+
+def body(n):
+    return f"Section {n} explains how invoice number {n * 17} was reconciled against ledger entry {n * 3}.\n"
+
+
+def page(n):
+    return f"ACME Handbook - Confidential\n{body(n)}Page {n + 1} of 12\n"
+
+
+def run(filter_, pages):
+    cleaned = []
+    for text in pages:
+        cleaned.extend(filter_.feed(text))
+    return cleaned + filter_.finish()
+
+
+def test_normalize_line_ignores_numbers_only_in_short_lines():
+    assert normalize_line("  Page 3 of 12 ") == normalize_line("page 10 of 12") == "page # of #"
+    assert normalize_line(body(1)) != normalize_line(body(2))
+    assert normalize_line("   ") == ""
+
+
+def test_numbered_headings_keep_their_numbers():
+    """Test that only page numbers and short page edges have their digits masked"""
+    assert normalize_line("Section 6.8") != normalize_line("Section 12.3")
+    assert normalize_line("- 7 -") == "- # -" and normalize_line("12") == "#"
+    assert normalize_line("Page 4 / 40") == "page # / #"
+    assert normalize_line("Chapter 3 - Results", edge=True) == "chapter # - results"
+
+    pages = [f"Handbook - Internal Use Only\nSection {n + 1}.{n % 9 + 1}\n{body(n)}Page {n + 1} of 30\n"
+             for n in range(30)]
+    cleaned = run(BoilerplateFilter(min_pages=3, min_fraction=0.5, window=10), pages)
+    assert all(f"Section {n + 1}.{n % 9 + 1}\n" in text for n, text in enumerate(cleaned))
+    assert sum(text.count("Internal Use Only") for text in cleaned) == 1
+
+
+def test_boilerplate_filter_keeps_first_occurrence_only():
+    filter_ = BoilerplateFilter(min_pages=3, min_fraction=0.5, window=4)
+    cleaned = run(filter_, [page(n) for n in range(12)])
+
+    assert len(cleaned) == 12
+    assert cleaned[0] == page(0)
+    assert cleaned[1:] == [body(n) for n in range(1, 12)]
+    assert filter_.lines_removed == 22
+    assert filter_.chars_in - filter_.chars_out == sum(len(page(n)) - len(body(n)) for n in range(1, 12))
+
+
+def test_boilerplate_filter_releases_pages_once_window_is_full():
+    filter_ = BoilerplateFilter(window=3)
+    assert filter_.feed(page(0)) == [] and filter_.feed(page(1)) == []
+    assert len(filter_.feed(page(2))) == 3
+    assert filter_.feed(page(3)) == [body(3)]
+    assert filter_.finish() == []
+
+
+def test_recurring_heading_in_long_document_is_kept():
+    """A heading on a few pages of many is body text, however often it recurs"""
+    pages = [page(n) + ("Summary\nTable 2: results\n" if n % 20 == 5 else "") for n in range(200)]
+    cleaned = run(BoilerplateFilter(min_pages=3, min_fraction=0.5, window=10), pages)
+
+    assert sum(text.count("Summary\n") for text in cleaned) == 10
+    assert sum(text.count("Table 2: results\n") for text in cleaned) == 10
+    assert sum(text.count("ACME Handbook") for text in cleaned) == 1
+
+
+def test_short_documents_are_left_alone():
+    pages = [page(0), page(1)]
+    assert run(BoilerplateFilter(min_pages=3), pages) == pages
+
+
+def test_near_duplicates_map_to_first_kept_chunk():
+    words = [f"w{i}" for i in range(120)]
+    dedup = ChunkDeduplicator(threshold=0.9)
+
+    assert dedup.add(" ".join(words)) is None
+    assert dedup.add(" ".join(f"other{i}" for i in range(120))) is None
+    assert dedup.add(" ".join(words[:119] + ["changed"])) == 0
+    assert dedup.add(" ".join(words[:60])) is None  # half the text is not a duplicate
+    assert len(dedup) == 3
+
+
+@pytest.mark.parametrize("length", [0, 1, 799, 800, 801, 5000])
+def test_chunks_for_length_matches_chunker(length):
+    assert chunks_for_length(length, 1000, 200) == len(chunk_offsets(length, 1000, 200)[0])
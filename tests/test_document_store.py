@@ -0,0 +1,112 @@
+# tests/test_document_store.py
+from app.document_store import DocumentStore, document_hash
+from app.rag import build_index, retrieve
+
+
+def test_document_hash_is_content_based():
+    """Test that identical bytes map to the same key"""
+    assert document_hash(b"%PDF-1.4 a") == document_hash(b"%PDF-1.4 a")
+    assert document_hash(b"%PDF-1.4 a") != document_hash(b"%PDF-1.4 b")
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    """Test that chunks and index survive a save/load cycle"""
+    store = DocumentStore(str(tmp_path))
+    chunks = ["First chunk", "Second chunk — ünïcode", "Third chunk"]
+    index = build_index([[1.0, 0.0], [0.0, 1.0], [0.5, 0.5]])
+
+    store.save("abc", chunks, index)
+    loaded_chunks, loaded_index = store.load("abc")
+
+    assert list(loaded_chunks) == chunks
+    assert loaded_index.ntotal == 3
+    assert retrieve([0.9, 0.1], loaded_index, loaded_chunks)[0] == "First chunk"
+
+
+def test_load_missing_document(tmp_path):
+    """Test that unknown hashes return None"""
+    store = DocumentStore(str(tmp_path))
+    assert store.load("missing") is None
+    assert not store.exists("missing")
+
+
+def test_save_overwrites_and_delete(tmp_path):
+    """Test that re-saving replaces a document and delete removes it"""
+    store = DocumentStore(str(tmp_path))
+    store.save("abc", ["old"], build_index([[1.0, 0.0]]))
+    store.save("abc", ["new", "chunks"], build_index([[1.0, 0.0], [0.0, 1.0]]))
+    assert list(store.load("abc")[0]) == ["new", "chunks"]
+
+    store.delete("abc")
+    assert store.load("abc") is None
+
+
+def test_chunk_store_roundtrip_keeps_pages(tmp_path):
+    """Test that overlapping chunks and page numbers are stored once and restored"""
+    from app.chunks import ChunkStore
+
+    store = DocumentStore(str(tmp_path))
+    chunks = ChunkStore.from_pages(["a" * 900, "b" * 900], size=1000, overlap=200)
+    store.save("abc", chunks, build_index([[float(i), 0.0] for i in range(len(chunks))]))
+
+    loaded, _ = store.load("abc")
+    assert loaded.text == chunks.text
+    assert list(loaded) == list(chunks)
+    assert [loaded.page(i) for i in range(len(loaded))] == [0, 0, 1]
+
+
+def test_lexical_index_is_saved_with_chunks(tmp_path):
+    """Test that the BM25 postings are stored and memory-mapped on load"""
+    import numpy as np
+
+    store = DocumentStore(str(tmp_path))
+    store.save("abc", ["red apples", "yellow bananas"], build_index([[1.0, 0.0], [0.0, 1.0]]))
+
+    chunks, _ = store.load("abc")
+    assert isinstance(chunks.lexical.postings, np.memmap)
+    assert chunks.lexical_index().search(["bananas"], 1).ids.tolist() == [1]
+
+
+def test_duplicates_and_dedup_stats_roundtrip(tmp_path):
+    """Test that dropped-duplicate rows and dedup counts survive a save/load cycle"""
+    from app.chunks import ChunkStore
+    from app.dedup import DedupStats
+
+    store = DocumentStore(str(tmp_path))
+    stats = DedupStats(4, 120, 1, 2)
+    chunks = ChunkStore("one two", [0, 4], [3, 7], [0, 1], duplicates=[[8, 11, 2, 0]], dedup=stats)
+    store.save("abc", chunks, build_index([[1.0, 0.0], [0.0, 1.0]]))
+
+    loaded, _ = store.load("abc")
+    assert loaded.duplicate_pages(0) == [2] and loaded.duplicate_pages(1) == []
+    assert loaded.dedup == stats
+
+
+def test_embedding_backend_is_recorded(tmp_path):
+    """Test that the backend, model and dimension of the vectors are stored with the chunks"""
+    from app.chunks import ChunkStore
+    from app.embeddings import EmbeddingInfo
+
+    store = DocumentStore(str(tmp_path))
+    chunks = ChunkStore.from_chunks(["one", "two"])
+    chunks.embedding = EmbeddingInfo("local", "hashed-tf-2", 2)
+    store.save("abc", chunks, build_index([[1.0, 0.0], [0.0, 1.0]]))
+
+    assert store.load("abc")[0].embedding == EmbeddingInfo("local", "hashed-tf-2", 2)
+    store.save("old", ["one"], build_index([[1.0, 0.0]]))
+    assert store.load("old")[0].embedding is None
+
+
+def test_reranked_index_keeps_vectors_memory_mapped(tmp_path):
+    """Test that exact re-rank vectors are saved beside a quantized index"""
+    import numpy as np
+    from app.indexes import RerankedIndex
+
+    store = DocumentStore(str(tmp_path))
+    vectors = [[float(i), float(i % 3)] for i in range(10)]
+    store.save("abc", [f"chunk {i}" for i in range(10)], build_index(vectors, "flat", "sq8", rerank=True))
+
+    chunks, index = store.load("abc")
+    assert isinstance(index, RerankedIndex)
+    assert isinstance(index.vectors, np.memmap)
+    assert retrieve([7.1, 1.0], index, chunks)[0] == "chunk 7"
@@ -0,0 +1,121 @@
+# tests/test_embedding_cache.py
+import pytest
+from unittest.mock import Mock, patch
+from app.embedding_cache import EmbeddingCache, cache_key
+from app.mistral_client import MistralClient
+
+
+def test_cache_key_depends_on_model():
+    """Test that the same text gets different keys per embedding model"""
+    assert cache_key("hello", "model-a") != cache_key("hello", "model-b")
+    assert cache_key("hello", "model-a") == cache_key("hello", "model-a")
+
+
+def test_put_and_get(tmp_path):
+    """Test that stored vectors are returned and misses are None"""
+    cache = EmbeddingCache(str(tmp_path))
+    cache.put_many(["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+
+    assert cache.get_many(["b", "c", "a"]) == [[3.0, 4.0], None, [1.0, 2.0]]
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_persists_across_instances(tmp_path):
+    """Test that vectors survive reopening the cache directory"""
+    EmbeddingCache(str(tmp_path)).put_many(["chunk"], [[0.5, 0.25, 0.125]])
+
+    reopened = EmbeddingCache(str(tmp_path))
+    assert reopened.get_many(["chunk"]) == [[0.5, 0.25, 0.125]]
+
+
+def test_float16_storage(tmp_path):
+    """Test that half-precision rows round-trip and reopen in the same dtype"""
+    EmbeddingCache(str(tmp_path), dtype="float16").put_many(["chunk"], [[0.5, 0.1, 3.0]])
+
+    reopened = EmbeddingCache(str(tmp_path), dtype="float16")
+    assert reopened.get_many(["chunk"])[0] == pytest.approx([0.5, 0.1, 3.0], rel=1e-3)
+    assert EmbeddingCache(str(tmp_path)).get_many(["chunk"]) == [None]
+    with pytest.raises(ValueError):
+        EmbeddingCache(str(tmp_path), dtype="int8")
+
+
+def test_evicts_least_recently_used(tmp_path):
+    """Test that the cache never holds more than max_entries vectors"""
+    cache = EmbeddingCache(str(tmp_path), max_entries=2)
+    cache.put_many(["a", "b"], [[1.0], [2.0]])
+    cache.get_many(["a"])
+    cache.put_many(["c"], [[3.0]])
+
+    assert len(cache) == 2
+    assert cache.get_many(["a", "b", "c"]) == [[1.0], None, [3.0]]
+
+
+def test_reopening_with_other_limits_reclaims_rows(tmp_path):
+    """Test that rows left over from a larger max_entries are reused, never overrun"""
+    EmbeddingCache(str(tmp_path), max_entries=3).put_many(["a", "b", "c"], [[1.0], [2.0], [3.0]])
+    EmbeddingCache(str(tmp_path), max_entries=2).put_many(["d"], [[4.0]])
+
+    cache = EmbeddingCache(str(tmp_path), max_entries=10)
+    keys = [f"k{i}" for i in range(8)]
+    cache.put_many(keys, [[float(i)] for i in range(8)])
+
+    assert len(cache) == 10 and cache._rows_used == 10
+    assert cache.get_many(keys) == [[float(i)] for i in range(8)]
+    assert EmbeddingCache(str(tmp_path), max_entries=10).get_many(["d"]) == [[4.0]]
+
+
+def fill_cache(path, prefix):
+    cache = EmbeddingCache(path)
+    for start in range(0, 200, 20):
+        keys = [f"{prefix}{i}" for i in range(start, start + 20)]
+        cache.put_many(keys, [[float(i), float(len(prefix))] for i in range(start, start + 20)])
+    return cache.stats()["entries"]
+
+
+def test_instances_sharing_a_directory_never_reuse_rows(tmp_path):
+    """Test that caches in separate processes (or instances) see each other's rows"""
+    from concurrent.futures import ProcessPoolExecutor
+
+    first, second = EmbeddingCache(str(tmp_path)), EmbeddingCache(str(tmp_path))
+    first.put_many(["a"], [[1.0, 0.0]])
+    second.put_many(["b"], [[2.0, 0.0]])
+    assert first.get_many(["a", "b"]) == second.get_many(["a", "b"]) == [[1.0, 0.0], [2.0, 0.0]]
+
+    with ProcessPoolExecutor(2) as pool:
+        list(pool.map(fill_cache, [str(tmp_path)] * 2, ["x", "yy"]))
+    merged = EmbeddingCache(str(tmp_path))
+    assert merged.get_many([f"x{i}" for i in range(200)]) == [[float(i), 1.0] for i in range(200)]
+    assert merged.get_many([f"yy{i}" for i in range(200)]) == [[float(i), 2.0] for i in range(200)]
+    assert len(merged) == 402
+
+
+def test_dimension_mismatch(tmp_path):
+    """Test that vectors of a different width are rejected"""
+    cache = EmbeddingCache(str(tmp_path))
+    cache.put_many(["a"], [[1.0, 2.0]])
+    with pytest.raises(ValueError):
+        cache.put_many(["b"], [[1.0, 2.0, 3.0]])
+
+
+@patch('app.mistral_client.Mistral')
+def test_client_only_embeds_misses(mock_mistral_class, tmp_path):
+    """Test that cached chunks skip the embeddings API"""
+    def create(model, inputs):
+        response = Mock()
+        response.data = [Mock(embedding=[float(len(text)), 1.0]) for text in inputs]
+        return response
+
+    mock_instance = Mock()
+    mock_instance.embeddings.create = Mock(side_effect=create)
+    mock_mistral_class.return_value = mock_instance
+
+    client = MistralClient("test_key", cache=EmbeddingCache(str(tmp_path)))
+    first = client.embed(["aa", "bbb", "aa"])
+    second = client.embed(["bbb", "aa"])
+
+    assert first == [[2.0, 1.0], [3.0, 1.0], [2.0, 1.0]]
+    assert second == [[3.0, 1.0], [2.0, 1.0]]
+    mock_instance.embeddings.create.assert_called_once_with(
+        model="mistral-embed", inputs=["aa", "bbb"]
+    )
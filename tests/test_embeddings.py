@@ -0,0 +1,74 @@
+# tests/test_embeddings.py
+import numpy as np
+import pytest
+
+from app.embeddings import (
+    LOCAL,
+    MISTRAL,
+    EmbeddingInfo,
+    FallbackPolicy,
+    HashingEmbedder,
+    document_embedding,
+    embedder_for,
+)
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    embedder = HashingEmbedder(dim=256)
+    texts = ["Refunds are issued within 14 days.", "Refunds are issued within 14 days.", ""]
+    vectors = embedder.embed(texts)
+
+    assert vectors.shape == (3, 256) and vectors.dtype == np.float32
+    assert np.array_equal(vectors[0], vectors[1])
+    assert np.isclose(np.linalg.norm(vectors[0]), 1.0)
+    assert not vectors[2].any()
+    assert np.array_equal(HashingEmbedder(dim=256).embed(texts[:1]), vectors[:1])
+
+
+def test_hashing_embedder_ranks_overlapping_text_closer():
+    embedder = HashingEmbedder(dim=512)
+    query, related, unrelated = embedder.embed([
+        "how long do refunds take",
+        "Refunds take up to 14 days to reach your account.",
+        "The security review was approved by Alice in March.",
+    ])
+    assert np.linalg.norm(query - related) < np.linalg.norm(query - unrelated)
+
+
+def test_fallback_policy_trips_on_rate_limits_and_slow_batches():
+    now = [100.0]
+    policy = FallbackPolicy(HashingEmbedder(dim=8), slow_seconds=5, cooldown=60, clock=lambda: now[0])
+
+    assert policy.should_fall_back(error=RateLimited())
+    assert not policy.should_fall_back(error=ValueError("bad request"))
+    assert policy.should_fall_back(seconds=6) and not policy.should_fall_back(seconds=1)
+    assert not policy.active()
+    policy.trip("slow")
+    assert policy.active()
+    now[0] += 61
+    assert not policy.active()
+
+
+def test_document_embedding_follows_mode():
+    class Client:
+        def embed(self, texts):
+            return [[0.0]] * len(texts)
+
+    client = Client()
+    embed_fn, info, fallback = document_embedding(client, "mistral")
+    assert embed_fn == client.embed and info.backend == MISTRAL and fallback is None
+    assert document_embedding(client, "auto")[2] is not None
+    embed_fn, info, fallback = document_embedding(None, "local")
+    assert info.backend == LOCAL and fallback is None and len(embed_fn(["text"])[0]) == info.dim
+    with pytest.raises(ValueError):
+        document_embedding(client, "openai")
+
+
+def test_embedder_for_reproduces_recorded_local_dimension():
+    assert embedder_for(EmbeddingInfo(LOCAL, "hashed-tf-64", 64)).dim == 64
+    assert embedder_for(EmbeddingInfo(MISTRAL, "mistral-embed", 1024)) is None
+    assert embedder_for(None) is None
@@ -0,0 +1,102 @@
+# tests/test_indexes.py
+import numpy as np
+import pytest
+from app.indexes import (
+    BACKENDS, STORAGES, RerankedIndex, choose_backend, create_index, estimate_memory,
+    index_nbytes, ivf_nlist, pq_subquantizers, set_search_params,
+)
+from app.rag import build_index
+
+
+@pytest.fixture
+def clustered_vectors():
+    """2,000 vectors drawn around 20 well-separated centres"""
+    rng = np.random.default_rng(0)
+    centres = rng.normal(size=(20, 16)) * 10
+    points = centres[rng.integers(0, 20, 2000)] + rng.normal(size=(2000, 16))
+    return points.astype("float32")
+
+
+def test_choose_backend_small_corpus_is_flat():
+    assert choose_backend(500, 1024) == "flat"
+    assert choose_backend(10_000, 1024, memory_budget_mb=512) == "flat"
+
+
+def test_choose_backend_large_corpus():
+    """Test that large corpora move to ANN backends as the budget shrinks"""
+    assert choose_backend(200_000, 1024, memory_budget_mb=4096) == "hnsw"
+    assert choose_backend(200_000, 1024, memory_budget_mb=800) == "ivf_flat"
+    assert choose_backend(200_000, 1024, memory_budget_mb=64) == "ivf_pq"
+
+
+def test_memory_estimates_are_ordered():
+    n, dim = 100_000, 1024
+    assert estimate_memory("ivf_pq", n, dim) < estimate_memory("flat", n, dim)
+    assert estimate_memory("flat", n, dim) < estimate_memory("hnsw", n, dim)
+    with pytest.raises(ValueError):
+        estimate_memory("annoy", n, dim)
+
+
+def test_ivf_and_pq_parameters():
+    assert ivf_nlist(10) == 1
+    assert ivf_nlist(100_000) == int(4 * 100_000 ** 0.5)
+    assert pq_subquantizers(1024) == 128
+    assert pq_subquantizers(1000) == 125
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backends_find_nearest_neighbour(backend, clustered_vectors):
+    """Test that every backend returns the query vector itself first"""
+    index = create_index(backend, clustered_vectors)
+    assert index.ntotal == len(clustered_vectors)
+
+    set_search_params(index, nprobe=64, ef_search=128)
+    _, ids = index.search(clustered_vectors[:50], 1)
+    hit_rate = np.mean(ids[:, 0] == np.arange(50))
+    assert hit_rate >= (0.6 if backend == "ivf_pq" else 0.95)
+
+
+def test_tiny_corpus_falls_back_to_flat():
+    index = create_index("ivf_pq", np.eye(4, dtype="float32"))
+    assert index.ntotal == 4
+    assert not hasattr(index, "nprobe")
+
+
+def test_build_index_with_explicit_backend(clustered_vectors):
+    index = build_index(clustered_vectors.tolist(), backend="hnsw")
+    assert index.hnsw.efSearch > 0
+    with pytest.raises(ValueError):
+        build_index([[1.0, 0.0]], backend="annoy")
+
+
+@pytest.mark.parametrize("storage", STORAGES)
+def test_storage_modes_shrink_index(storage, clustered_vectors):
+    """Test that quantized storage keeps neighbours and uses fewer bytes"""
+    index = create_index("flat", clustered_vectors, storage)
+    _, ids = index.search(clustered_vectors[:50], 1)
+
+    # 2-byte PQ codes on 16 dimensions are coarse; the point is they still work
+    assert np.mean(ids[:, 0] == np.arange(50)) >= (0.4 if storage == "pq" else 0.95)
+    expected = {"float32": 64, "fp16": 32, "sq8": 16, "pq": 2}[storage]
+    assert index_nbytes(index) == len(clustered_vectors) * expected
+    with pytest.raises(ValueError):
+        create_index("flat", clustered_vectors, "int4")
+
+
+def test_rerank_restores_exact_order(clustered_vectors):
+    exact = create_index("flat", clustered_vectors)
+    quantized = create_index("ivf_flat", clustered_vectors, "pq")
+    reranked = RerankedIndex(quantized, clustered_vectors, factor=16)
+    set_search_params(reranked, nprobe=64)
+
+    exact_distances, exact_ids = exact.search(clustered_vectors[:20] + 0.1, 3)
+    distances, ids = reranked.search(clustered_vectors[:20] + 0.1, 3)
+
+    assert np.mean(ids == exact_ids) >= 0.95
+    assert np.allclose(distances[ids == exact_ids], exact_distances[ids == exact_ids], atol=1e-2)
+    assert quantized.nprobe == min(64, quantized.nlist)
+
+
+def test_build_index_rerank_only_wraps_quantized(clustered_vectors):
+    assert isinstance(build_index(clustered_vectors, "flat", "sq8", rerank=True), RerankedIndex)
+    assert not isinstance(build_index(clustered_vectors, "flat", "float32", rerank=True), RerankedIndex)
@@ -0,0 +1,150 @@
+# tests/test_ingest.py
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.chunks import ChunkStore
+from app.ingest import StreamingChunker, ingest
+from app.indexes import RerankedIndex
+
+
+def fake_embed(texts):
+    """Deterministic 4-dim vectors derived from the text"""
+    return [[float(len(t)), float(sum(map(ord, t)) % 97), float(t.count("a")), 1.0] for t in texts]
+
+
+PAGES = ["alpha " * 40, "", "bravo " * 25, "charlie " * 60, "delta"]
+
+
+@pytest.mark.parametrize("page_sizes", [PAGES, ["x" * 2500], ["short"]])
+def test_streaming_chunker_matches_batch_chunking(page_sizes):
+    """Test that chunks cut while pages stream equal the all-at-once result"""
+    chunker = StreamingChunker(size=100, overlap=20)
+    cut = []
+    for page in page_sizes:
+        cut.extend(chunker.feed(page))
+    cut.extend(chunker.finish())
+
+    expected = ChunkStore.from_pages(page_sizes, size=100, overlap=20)
+    assert [text for _, _, text in cut] == list(expected)
+    store = chunker.chunk_store()
+    assert list(store) == list(expected)
+    assert store.pages.tolist() == expected.pages.tolist()
+
+
+def test_ingest_builds_same_index_as_sequential():
+    progress = []
+    chunks, index = ingest(iter(PAGES), fake_embed, progress.append, backend="flat",
+                           storage="float32", size=100, overlap=20, workers=3, max_items=2,
+                           dedup=False)
+
+    expected = ChunkStore.from_pages(PAGES, size=100, overlap=20)
+    assert list(chunks) == list(expected)
+    assert index.ntotal == len(expected)
+    assert np.allclose(index.reconstruct_n(0, index.ntotal), fake_embed(list(expected)))
+    assert progress[-1].done and progress[-1].embedded == len(expected)
+    # The BM25 postings were built while streaming, one entry per chunk
+    assert len(chunks.lexical) == len(expected)
+    assert [p.embedded for p in progress] == sorted(p.embedded for p in progress)
+
+
+def test_embedding_overlaps_extraction():
+    """Test that the first batch is embedded before extraction has finished"""
+    extraction_done = threading.Event()
+    overlapped = []
+
+    def pages():
+        for _ in range(6):
+            time.sleep(0.02)
+            yield "word " * 100
+        extraction_done.set()
+
+    def embed(texts):
+        overlapped.append(not extraction_done.is_set())
+        return fake_embed(texts)
+
+    ingest(pages(), embed, backend="flat", storage="float32", size=100, overlap=0, max_items=4, dedup=False)
+    assert overlapped[0]
+
+
+def test_ingest_times_each_stage(monkeypatch):
+    """Test that overlapping stages are still timed separately"""
+    from app import metrics
+
+    monkeypatch.setattr(metrics, "_enabled", True)
+    stages = ["extract", "chunk", "embed_chunks", "index_build"]
+    before = [metrics.STAGE_SECONDS.count(stage=stage) for stage in stages]
+
+    ingest(iter(PAGES), fake_embed, backend="flat", storage="float32", size=100, overlap=20, max_items=2)
+    assert [metrics.STAGE_SECONDS.count(stage=stage) for stage in stages] == [n + 1 for n in before]
+
+
+def test_ingest_skips_duplicate_chunks():
+    """Test that a repeated page is embedded once and mapped to its first copy"""
+    bodies = [" ".join(f"topic{n}word{i}" for i in range(30)).ljust(200)[:200] for n in range(5)]
+    pages = bodies + [bodies[1], bodies[3]]
+    embedded = []
+
+    def embed(texts):
+        embedded.extend(texts)
+        return fake_embed(texts)
+
+    chunks, index = ingest(iter(pages), embed, backend="flat", storage="float32", size=200, overlap=0)
+
+    assert index.ntotal == len(chunks) == len(embedded) == 5
+    assert chunks.duplicates[:, 2].tolist() == [5, 6] and chunks.duplicates[:, 3].tolist() == [1, 3]
+    assert chunks.duplicate_pages(1) == [5] and chunks.duplicate_pages(0) == []
+    assert chunks.dedup.duplicate_chunks == chunks.dedup.embeddings_saved == 2
+
+
+def test_rate_limited_api_falls_back_to_local_embeddings():
+    """Test that a document the API stops embedding midway is indexed locally throughout"""
+    from app.embeddings import EmbeddingInfo, FallbackPolicy, HashingEmbedder
+
+    class RateLimited(Exception):
+        status_code = 429
+
+    calls = []
+
+    def flaky_embed(texts):
+        calls.append(len(texts))
+        if len(calls) > 1:
+            raise RateLimited()
+        return [[1.0] * 4 for _ in texts]
+
+    local = HashingEmbedder(dim=16)
+    policy = FallbackPolicy(local, cooldown=60)
+    pages = [" ".join(f"page{n}word{i}" for i in range(40)) for n in range(6)]
+    chunks, index = ingest(iter(pages), flaky_embed, backend="flat", storage="float32", size=100, overlap=0,
+                           workers=1, max_items=2, embedding=EmbeddingInfo("mistral", "mistral-embed", None),
+                           fallback=policy)
+
+    assert chunks.embedding == EmbeddingInfo("local", local.model, 16)
+    assert index.d == 16 and index.ntotal == len(chunks)
+    assert np.allclose(index.reconstruct_n(0, index.ntotal), local.embed(list(chunks)))
+    assert policy.active()
+
+    # While the policy is active, new documents skip the API entirely
+    calls.clear()
+    chunks, _ = ingest(iter(pages), flaky_embed, backend="flat", storage="float32", size=100, overlap=0,
+                       embedding=EmbeddingInfo("mistral", "mistral-embed", None), fallback=policy)
+    assert calls == [] and chunks.embedding.backend == "local"
+
+
+def test_ingest_errors_propagate():
+    def failing_embed(texts):
+        raise RuntimeError("embedding API down")
+
+    with pytest.raises(RuntimeError, match="embedding API down"):
+        ingest(iter(["text " * 500] * 20), failing_embed, backend="flat", storage="float32",
+               size=100, overlap=0, max_items=1, queue_batches=1)
+    with pytest.raises(ValueError):
+        ingest(iter(["", ""]), fake_embed)
+
+
+def test_quantized_config_builds_final_index():
+    _, index = ingest(iter(PAGES), fake_embed, backend="flat", storage="sq8", rerank=True,
+                      size=100, overlap=20)
+    assert isinstance(index, RerankedIndex)
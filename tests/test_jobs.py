@@ -0,0 +1,122 @@
+# tests/test_jobs.py
+import time
+
+import pytest
+
+from app.jobs import IngestJobs, JobCancelled, _cancel_key
+
+
+def sleeping_job(job_id, doc_hash, data, store_root, shared):
+    """Stand-in worker that reports progress until ``data`` seconds pass or it is cancelled"""
+    deadline = time.monotonic() + float(data)
+    while True:
+        if shared.get(_cancel_key(job_id)):
+            raise JobCancelled(job_id)
+        if time.monotonic() >= deadline:
+            return
+        shared[job_id] = ("running", None)
+        time.sleep(0.02)
+
+
+def failing_job(job_id, doc_hash, data, store_root, shared):
+    raise ValueError("not a PDF")
+
+
+def wait_for(jobs, job_id, states, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = jobs.status(job_id)
+        if status.state in states:
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"job stayed {status.state}")
+
+
+@pytest.fixture
+def make_jobs(tmp_path):
+    created = []
+
+    def _make_jobs(run=sleeping_job, workers=1):
+        jobs = IngestJobs(str(tmp_path), workers=workers, run=run)
+        created.append(jobs)
+        return jobs
+
+    yield _make_jobs
+    for jobs in created:
+        jobs.shutdown()
+
+
+def test_same_content_shares_one_job(make_jobs):
+    jobs = make_jobs()
+    job_id = jobs.submit("hash-a", b"0.3", name="a.pdf")
+    assert jobs.submit("hash-a", b"0.3") == job_id
+    status = wait_for(jobs, job_id, {"done"})
+    assert status.name == "a.pdf" and status.doc_hash == "hash-a" and status.error is None
+    # Once finished, the same content starts a fresh job
+    assert jobs.submit("hash-a", b"0") != job_id
+
+
+def test_cancel_queued_and_running_jobs(make_jobs):
+    jobs = make_jobs()
+    running = jobs.submit("hash-a", b"30")
+    queued = jobs.submit("hash-b", b"0")
+    wait_for(jobs, running, {"running"})
+
+    assert jobs.cancel(queued)
+    assert jobs.status(queued).state in ("cancelling", "cancelled")
+    assert jobs.cancel(running)
+    assert wait_for(jobs, running, {"cancelled", "done"}).state == "cancelled"
+    assert wait_for(jobs, queued, {"cancelled", "done"}).state == "cancelled"
+
+
+def test_cancel_waits_for_last_waiter(make_jobs):
+    jobs = make_jobs()
+    job_id = jobs.submit("hash-a", b"30")
+    jobs.submit("hash-a", b"30")
+    assert not jobs.cancel(job_id)
+    assert jobs.status(job_id).state in ("queued", "running")
+    assert jobs.cancel(job_id)
+    assert wait_for(jobs, job_id, {"cancelled", "done"}).state == "cancelled"
+
+
+def test_failures_are_reported(make_jobs):
+    jobs = make_jobs(run=failing_job)
+    job_id = jobs.submit("hash-a", b"")
+    status = wait_for(jobs, job_id, {"failed", "done"})
+    assert status.state == "failed" and status.error == "not a PDF"
+    with pytest.raises(KeyError):
+        jobs.status("unknown")
+
+
+def test_worker_ingests_into_store(make_jobs, make_pdf, tmp_path, monkeypatch):
+    """Test the real worker end to end against the local stub API"""
+    from app import metrics
+    from app.document_store import DocumentStore
+    from app.embedding_cache import EmbeddingCache
+    from benchmarks.stub_server import StubConfig, start_stub_server
+
+    server, url = start_stub_server(StubConfig(embed_latency=0, jitter=0, dim=8))
+    # Spawned workers read their configuration from the environment
+    monkeypatch.setenv("MISTRAL_SERVER_URL", url)
+    monkeypatch.setenv("MISTRAL_API_KEY", "stub-key")
+    monkeypatch.setenv("EMBED_CACHE_DIR", str(tmp_path / "embeddings"))
+    monkeypatch.setattr(metrics, "_enabled", True)
+    ingested = metrics.STAGE_SECONDS.count(stage="ingest")
+    try:
+        from app.jobs import run_ingest_job
+        jobs = make_jobs(run=run_ingest_job)
+        job_id = jobs.submit("hash-pdf", make_pdf(3), name="doc.pdf")
+        status = wait_for(jobs, job_id, {"done", "failed", "cancelled"}, timeout=60)
+    finally:
+        server.shutdown()
+
+    assert status.state == "done", status.error
+    chunks, index = DocumentStore(str(tmp_path)).load("hash-pdf")
+    assert index.ntotal == len(chunks) > 0
+    # The worker embedded through the shared cache and its metrics reached this process
+    assert len(EmbeddingCache(str(tmp_path / "embeddings"))) > 0
+    deadline = time.monotonic() + 5
+    while metrics.STAGE_SECONDS.count(stage="ingest") == ingested and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert metrics.STAGE_SECONDS.count(stage="ingest") == ingested + 1
+    assert metrics.REQUESTS.value(endpoint="embeddings") > 0
@@ -0,0 +1,58 @@
+# tests/test_lazy.py
+import os
+import subprocess
+import sys
+
+from app import lazy
+
+
+def test_lazy_module_imports_on_first_use(monkeypatch):
+    monkeypatch.delitem(sys.modules, "colorsys", raising=False)
+    module = lazy.lazy_import("colorsys")
+
+    assert isinstance(module, lazy.LazyModule)
+    assert not lazy.is_loaded("colorsys")
+    assert module.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    assert lazy.is_loaded("colorsys")
+    assert "colorsys" in lazy.IMPORT_SECONDS
+
+
+def test_already_imported_module_is_returned_directly():
+    assert lazy.lazy_import("os") is os
+
+
+def test_profiler_records_nested_imports(tmp_path, monkeypatch):
+    """Test self and cumulative time for a module importing another"""
+    (tmp_path / "outer_mod.py").write_text("import time\nimport inner_mod\ntime.sleep(0.01)\n")
+    (tmp_path / "inner_mod.py").write_text("import time\ntime.sleep(0.05)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for name in ("outer_mod", "inner_mod"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+
+    profiler = lazy.profile_imports()
+    try:
+        import outer_mod  # noqa: F401
+    finally:
+        assert lazy.stop_profiling() is profiler
+
+    outer_self, outer_cumulative = profiler.records["outer_mod"]
+    inner_self, inner_cumulative = profiler.records["inner_mod"]
+    assert inner_cumulative >= 0.05 and outer_cumulative >= inner_cumulative + 0.01
+    assert outer_self < inner_self
+    assert profiler.top(1)[0][0] == "outer_mod"
+    assert profiler not in sys.meta_path
+
+
+def test_app_imports_without_heavy_dependencies_or_api_key():
+    """Test that main.py loads without FAISS, NumPy, pypdf, the SDK or a key"""
+    env = {key: value for key, value in os.environ.items() if key != "MISTRAL_API_KEY"}
+    code = (
+        "import sys, main; "
+        "print(sorted(name for name in ('faiss', 'numpy', 'pypdf', 'mistralai') if name in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=os.path.dirname(os.path.dirname(__file__)),
+        env=env, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,80 @@
+# tests/test_lexical.py
+import numpy as np
+
+from app.chunks import ChunkStore
+from app.lexical import (
+    LexicalBuilder,
+    LexicalIndex,
+    is_confident,
+    query_terms,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+
+CHUNKS = [
+    "Section 3.2 covers the refund policy for annual plans.",
+    "The onboarding checklist lists every account step.",
+    "Refunds are issued within 14 days. The policy applies to all plans.",
+    "Alice Johnson approved the security review in March.",
+]
+
+
+def test_tokenize_keeps_section_numbers_and_drops_stopwords():
+    assert tokenize("What is in Section 3.2.1 of the COVID-19 plan?") == ["section", "3.2.1", "covid-19", "plan"]
+    assert query_terms("refund refund policy") == ["refund", "policy"]
+
+
+def test_bm25_ranks_rare_terms_first():
+    index = LexicalIndex.from_texts(CHUNKS)
+    matches = index.search(query_terms("Who is Alice Johnson?"), k=3)
+
+    assert matches.ids.tolist() == [3]
+    assert matches.coverage[0] == 1.0
+    policy = index.search(query_terms("refund policy"), k=3)
+    assert policy.ids.tolist()[0] == 0 and set(policy.ids.tolist()) == {0, 2}
+    assert np.all(np.diff(policy.scores) <= 0)
+
+
+def test_builder_matches_batch_build():
+    builder = LexicalBuilder()
+    for chunk in CHUNKS:
+        builder.add(chunk)
+    built, batch = builder.build(), LexicalIndex.from_texts(CHUNKS)
+
+    assert built.term_list == batch.term_list
+    assert built.postings.tolist() == batch.postings.tolist()
+    assert built.postings.dtype == np.int32 and built.freqs.dtype == np.uint16
+    assert len(built) == len(CHUNKS) and built.nbytes > 0
+
+
+def test_confidence_requires_short_fully_matched_clear_winner():
+    index = LexicalIndex.from_texts(CHUNKS)
+
+    def confident(question):
+        terms = query_terms(question)
+        matches = index.search(terms, k=5)
+        return is_confident(terms, matches.scores, matches.coverage)
+
+    assert confident("Alice Johnson")
+    assert confident("section 3.2")
+    assert not confident("plans")  # in two chunks, no clear winner
+    assert not confident("Alice Johnson onboarding")  # no chunk has every term
+    assert not confident("what?")
+    assert not confident("explain how the annual refund policy works for enterprise customers in europe")
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a", "d"]])
+    assert fused[0] == "a" and set(fused) == {"a", "b", "c", "d"}
+    assert fused.index("c") < fused.index("b")
+
+
+def test_save_and_load_memory_maps_postings(tmp_path):
+    chunks = ChunkStore.from_chunks(CHUNKS)
+    chunks.lexical_index().save(str(tmp_path))
+    loaded = LexicalIndex.load(str(tmp_path))
+
+    assert isinstance(loaded.postings, np.memmap)
+    terms = query_terms("refund policy")
+    assert loaded.search(terms, 2).ids.tolist() == chunks.lexical_index().search(terms, 2).ids.tolist()
+    assert LexicalIndex.load(str(tmp_path / "missing")) is None
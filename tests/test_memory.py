@@ -0,0 +1,55 @@
+# tests/test_memory.py
+from unittest.mock import Mock
+
+from app.memory import ConversationMemory
+
+
+def test_context_keeps_previous_and_relevant_turns():
+    """Test that only the last turn and similar older turns are included"""
+    memory = ConversationMemory(window=4, threshold=0.9)
+    memory.add_turn("What is the refund policy?", "30 days.", [1.0, 0.0])
+    memory.add_turn("Who signs off budgets?", "The CFO.", [0.0, 1.0])
+    memory.add_turn("Where is the office?", "Berlin.", [0.6, 0.8])
+
+    context = memory.context([1.0, 0.05])
+
+    assert "refund policy" in context
+    assert "Where is the office?" in context
+    assert "budgets" not in context
+    assert context.index("refund") < context.index("office")
+
+
+def test_context_respects_token_budget():
+    memory = ConversationMemory(token_budget=10, threshold=0.0)
+    memory.add_turn("First question", "a" * 500, [1.0, 0.0])
+    memory.add_turn("Second question", "b" * 500, [1.0, 0.0])
+
+    context = memory.context([1.0, 0.0])
+
+    assert len(context) <= 10 * 4 + 2
+    assert context.startswith("User: Second question")
+
+
+def test_old_turns_fold_into_summary_in_background():
+    """Test that turns beyond the window are summarized off the request path"""
+    summarize = Mock(return_value=" Refunds take 30 days. ")
+    memory = ConversationMemory(summarize, window=2)
+    memory.add_turn("Q1", "A1")
+    memory.add_turn("Q2", "A2")
+    memory.add_turn("Q3", "A3")
+    memory.refresh_async().join()
+
+    assert memory.summary == "Refunds take 30 days."
+    assert [turn.question for turn in memory.turns] == ["Q2", "Q3"]
+    assert "User: Q1" in summarize.call_args[0][0]
+    assert memory.context().startswith("Summary of earlier conversation: Refunds take 30 days.")
+
+
+def test_failed_summary_keeps_turns():
+    memory = ConversationMemory(Mock(side_effect=RuntimeError("down")), window=1)
+    memory.add_turn("Q1", "A1")
+    memory.add_turn("Q2", "A2")
+    memory.refresh_async().join()
+
+    assert memory.summary == ""
+    assert len(memory) == 2
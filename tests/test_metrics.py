@@ -0,0 +1,105 @@
+# tests/test_metrics.py
+import urllib.request
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app import metrics
+from app.mistral_client import MistralClient
+
+
+@pytest.fixture
+def enabled():
+    metrics.set_enabled(True)
+    yield
+    metrics.set_enabled(False)
+
+
+def test_span_is_noop_when_disabled():
+    metrics.set_enabled(False)
+    before = metrics.STAGE_SECONDS.count(stage="test_disabled")
+    with metrics.span("test_disabled"):
+        pass
+    assert metrics.STAGE_SECONDS.count(stage="test_disabled") == before
+
+
+def test_span_and_histogram_rendering(enabled):
+    histogram = metrics.Histogram("demo_seconds", "Demo", buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage="a")
+    histogram.observe(0.5, stage="a")
+    histogram.observe(5.0, stage="a")
+    text = "\n".join(histogram.render())
+
+    assert 'demo_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="a",le="1.0"} 2' in text
+    assert 'demo_seconds_bucket{stage="a",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{stage="a"} 3' in text
+
+    before = metrics.STAGE_SECONDS.count(stage="test_span")
+    with metrics.span("test_span"):
+        pass
+    assert metrics.STAGE_SECONDS.count(stage="test_span") == before + 1
+
+
+def test_timed_iter_records_one_observation_per_stream(enabled):
+    """Test that a streamed stage is timed without changing or buffering its items"""
+    before = metrics.STAGE_SECONDS.count(stage="test_stream")
+    items = metrics.timed_iter("test_stream", iter(["a", "b", "c"]))
+
+    assert next(items) == "a"
+    assert metrics.STAGE_SECONDS.count(stage="test_stream") == before
+    assert list(items) == ["b", "c"]
+    assert metrics.STAGE_SECONDS.count(stage="test_stream") == before + 1
+
+
+def test_worker_increments_merge_into_registry():
+    """Test that metrics recorded while disabled (as in a worker) can be merged elsewhere"""
+    metrics.set_enabled(False)
+    before = metrics.STAGE_SECONDS.count(stage="test_worker")
+    with metrics.recorded() as changes:
+        with metrics.span("test_worker"):
+            pass
+        metrics.REQUESTS.inc(endpoint="test_worker")
+    assert not metrics.enabled()
+    assert metrics.REQUESTS.value(endpoint="test_worker") == 1
+
+    metrics.merge(changes)  # disabled: ignored
+    assert metrics.STAGE_SECONDS.count(stage="test_worker") == before + 1
+    metrics.set_enabled(True)
+    try:
+        metrics.merge(changes)
+    finally:
+        metrics.set_enabled(False)
+    assert metrics.STAGE_SECONDS.count(stage="test_worker") == before + 2
+    assert metrics.REQUESTS.value(endpoint="test_worker") == 2
+
+
+@patch("app.mistral_client.Mistral")
+def test_client_records_token_usage(mock_mistral_class, enabled):
+    """Test that prompt and completion tokens from responses are counted"""
+    response = Mock()
+    response.choices = [Mock()]
+    response.choices[0].message.content = "Answer"
+    response.usage = SimpleNamespace(prompt_tokens=120, completion_tokens=30)
+    mock_mistral_class.return_value.chat.complete.return_value = response
+    before = metrics.TOKENS.value(endpoint="chat", kind="prompt")
+
+    MistralClient("test_key").chat("Question")
+
+    assert metrics.TOKENS.value(endpoint="chat", kind="prompt") == before + 120
+    assert metrics.TOKENS.value(endpoint="chat", kind="completion") >= 30
+
+
+def test_metrics_endpoint(enabled):
+    metrics.REQUESTS.inc(endpoint="test_endpoint")
+    server = metrics.start_metrics_server(0, host="127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url) as response:
+            body = response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+
+    assert "# TYPE mistralqna_stage_seconds histogram" in body
+    assert 'mistralqna_api_requests_total{endpoint="test_endpoint"}' in body
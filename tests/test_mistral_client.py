@@ -77,6 +77,35 @@ class TestMistralClient:
             max_tokens=500
         )
 
+    @patch('app.mistral_client.Mistral')
+    def test_chat_stream_method(self, mock_mistral_class):
+        """Test streaming chat yields deltas and records latency"""
+        def event(content):
+            mock_event = Mock()
+            mock_event.data.choices = [Mock()]
+            mock_event.data.choices[0].delta.content = content
+            return mock_event
+
+        mock_client_instance = Mock()
+        mock_client_instance.chat.stream = Mock(
+            return_value=iter([event("Hello"), event(None), event(", world")])
+        )
+        mock_mistral_class.return_value = mock_client_instance
+
+        client = MistralClient("test_key")
+        stream = client.chat_stream("Say hello")
+
+        assert list(stream) == ["Hello", ", world"]
+        assert stream.text == "Hello, world"
+        latency = stream.latency()
+        assert 0 <= latency["first_token"] <= latency["total"]
+        mock_client_instance.chat.stream.assert_called_once_with(
+            model="mistral-small-latest",
+            messages=[{"role": "user", "content": "Say hello"}],
+            temperature=0.2,
+            max_tokens=500
+        )
+
 
 def test_error_handling():
     """Test that errors are raised properly"""
@@ -0,0 +1,41 @@
+# tests/test_pdf.py
+from io import BytesIO
+from app.pdf import iter_pages, pdf_bytes
+
+
+def test_pdf_bytes_sources(tmp_path):
+    """Test that paths, bytes and file objects all yield the raw bytes"""
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(b"%PDF-data")
+
+    assert pdf_bytes(str(path)) == b"%PDF-data"
+    assert pdf_bytes(b"%PDF-data") == b"%PDF-data"
+    assert pdf_bytes(BytesIO(b"%PDF-data")) == b"%PDF-data"
+
+
+def test_iter_pages_in_order(make_pdf):
+    """Test that pages stream in order with timings"""
+    pages = list(iter_pages(make_pdf(3)))
+
+    assert [page.number for page in pages] == [0, 1, 2]
+    assert "Page 2 line 1" in pages[1].text
+    assert all(page.seconds >= 0 for page in pages)
+
+
+def test_iter_pages_process_pool_matches_sequential(make_pdf, monkeypatch):
+    """Test that the process-pool mode returns the same pages in order"""
+    monkeypatch.setattr("app.pdf.PDF_PARALLEL_MIN_PAGES", 1)
+    data = make_pdf(9)
+
+    sequential = [page.text for page in iter_pages(data)]
+    parallel = [page.text for page in iter_pages(data, workers=2, pages_per_task=2)]
+
+    assert parallel == sequential
+    assert "Page 9 line 3" in parallel[-1]
+
+
+def test_read_pdf_joins_pages(make_pdf):
+    from app.ui import read_pdf
+
+    text = read_pdf(BytesIO(make_pdf(2)))
+    assert text.index("Page 1 line 1") < text.index("Page 2 line 1")
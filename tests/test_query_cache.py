@@ -0,0 +1,32 @@
+# tests/test_query_cache.py
+from unittest.mock import Mock
+from app.query_cache import QueryEmbeddingCache, normalize_question
+
+
+def test_normalize_question():
+    assert normalize_question("  What is   RAG? ") == "what is rag"
+    assert normalize_question("What is RAG") == normalize_question("what is rag?!")
+
+
+def test_embed_only_calls_for_misses():
+    """Test that cached questions skip the embedding call"""
+    embed_fn = Mock(side_effect=lambda texts: [[float(len(t))] for t in texts])
+    cache = QueryEmbeddingCache()
+
+    assert cache.embed(["Hello?", "World"], embed_fn) == [[6.0], [5.0]]
+    assert cache.embed(["hello", "world", "New one"], embed_fn) == [[6.0], [5.0], [7.0]]
+    assert embed_fn.call_count == 2
+    embed_fn.assert_called_with(["New one"])
+    assert cache.hits == 2
+
+
+def test_lru_eviction():
+    cache = QueryEmbeddingCache(max_entries=2)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    cache.get("a")
+    cache.put("c", [3.0])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == [1.0]
+    assert len(cache) == 2
@@ -0,0 +1,93 @@
+# tests/test_registry.py
+import gc
+import threading
+import time
+
+import faiss
+import numpy as np
+
+from app.chunks import ChunkStore
+from app.corpus import Corpus
+from app.rag import build_index
+from app.registry import DocumentRegistry
+
+
+def make_document(n=4, dim=8, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n, dim)).astype("float32")
+    index = faiss.IndexFlatL2(dim)
+    index.add(vectors)
+    chunks = ChunkStore.from_chunks([f"chunk {seed}-{i}" for i in range(n)])
+    return chunks, index
+
+
+def test_sessions_share_one_loaded_copy():
+    """Test that concurrent acquires of one document load it once"""
+    registry = DocumentRegistry()
+    loads = []
+
+    def load():
+        loads.append(1)
+        time.sleep(0.05)
+        return make_document()
+
+    handles = []
+    threads = [threading.Thread(target=lambda: handles.append(registry.acquire("doc", load)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert len({id(handle.index) for handle in handles}) == 1
+    assert registry.stats()["hits"] == 4
+
+
+def test_unused_documents_evicted_lru_beyond_budget():
+    chunks, index = make_document()
+    size = chunks.nbytes + index.ntotal * index.d * 4
+    registry = DocumentRegistry(max_bytes=2 * size)
+
+    a = registry.acquire("a", make_document)
+    b = registry.acquire("b", make_document)
+    a.release()
+    b.release()
+    registry.acquire("c", make_document)
+
+    assert "a" not in registry
+    assert "b" in registry and "c" in registry
+
+
+def test_documents_in_use_are_never_evicted():
+    """Test that held documents survive even over budget"""
+    registry = DocumentRegistry(max_bytes=0)
+    handle = registry.acquire("a", make_document)
+
+    assert "a" in registry
+    handle.release()
+    handle.release()  # releasing twice is harmless
+    assert "a" not in registry
+
+
+def test_garbage_collected_handle_releases():
+    registry = DocumentRegistry(max_bytes=0)
+    registry.acquire("a", make_document)
+    gc.collect()
+
+    assert "a" not in registry
+
+
+def test_corpus_searches_attached_indexes():
+    """Test that attached documents merge by distance"""
+    chunks, index = make_document(seed=1)
+    query = index.reconstruct(2)
+    corpus = Corpus()
+    corpus.add_index("other", ["far away"], build_index([np.full(8, 100.0)], "flat", "float32"))
+    corpus.add_index("shared", chunks, index)
+
+    hits = corpus.retrieve(query, k=2)
+
+    assert hits[0].doc_id == "shared" and hits[0].chunk_id == 2
+    assert len(corpus) == 5
+    assert corpus.remove_document("shared")
+    assert [hit.doc_id for hit in corpus.retrieve(query)] == ["other"]